@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from ..services.response_cache import ResponseCache
+from .conditional import Validators
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def replay(cache: ResponseCache | None, key: str | None, request: Request) -> Response | None:
+    """Serve ``key`` from the cache, as a 304 when the client already holds it."""
+    if cache is None or key is None:
+        return None
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    header, _, body = entry.partition(b"\n")
+    meta = json.loads(header)
+    last_modified = meta["last_modified"]
+    validators = Validators(
+        etag=meta["etag"],
+        last_modified=datetime.fromisoformat(last_modified) if last_modified else None,
+    )
+    if validators.not_modified(request):
+        return validators.response_304()
+    return validators.apply(Response(content=body, media_type=JSON_MEDIA_TYPE))
+
+
+def remember(
+    cache: ResponseCache | None, key: str | None, payload: BaseModel, validators: Validators
+) -> Response:
+    """Render ``payload`` once, store it under ``key`` and return it with its validators."""
+    body = payload.model_dump_json().encode()
+    if cache is not None and key is not None:
+        last_modified = validators.last_modified
+        header = json.dumps(
+            {
+                "etag": validators.etag,
+                "last_modified": last_modified.isoformat() if last_modified else None,
+            }
+        )
+        cache.set(key, header.encode() + b"\n" + body)
+    return validators.apply(Response(content=body, media_type=JSON_MEDIA_TYPE))
+
+
+def cache_key(
+    cache: ResponseCache | None, namespace: str, variant: object, listing: bool = False
+) -> str | None:
+    # Computed once per request so a miss stores under the generation it read from.
+    return cache.key(namespace, str(variant), listing) if cache is not None else None
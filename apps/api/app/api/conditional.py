@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, TypeVar
+
+from fastapi import Request, Response, status
+
+ResponseT = TypeVar("ResponseT", bound=Response)
+
+
+@dataclass(frozen=True, slots=True)
+class Validators:
+    """ETag/Last-Modified pair derived from a version row instead of the rendered body."""
+
+    etag: str
+    last_modified: datetime | None
+    private: bool = False
+
+    @classmethod
+    def of(cls, version: Iterable[Any], *variant: Any, private: bool = False) -> Validators:
+        """Build validators from ``version`` (timestamps, counts, ids) and the representation
+        ``variant`` (query string, media type) that would otherwise share the same rows."""
+        parts = list(version)
+        stamps = [_as_utc(part) for part in parts if isinstance(part, datetime)]
+        digest = hashlib.blake2b(repr((parts, variant)).encode(), digest_size=12).hexdigest()
+        return cls(etag=f'W/"{digest}"', last_modified=max(stamps, default=None), private=private)
+
+    def headers(self) -> dict[str, str]:
+        # no-cache still lets clients store the body, but they must revalidate it every time.
+        headers = {"ETag": self.etag, "Cache-Control": "private, no-cache" if self.private else "no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def apply(self, response: ResponseT) -> ResponseT:
+        response.headers.update(self.headers())
+        return response
+
+    def not_modified(self, request: Request) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2); comparison is weak.
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or self.etag.removeprefix("W/") in tags
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None or self.last_modified is None:
+            return False
+        try:
+            since = _as_utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        return self.last_modified.replace(microsecond=0) <= since
+
+    def response_304(self) -> Response:
+        return self.apply(Response(status_code=status.HTTP_304_NOT_MODIFIED))
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive timestamps; they are stored in UTC.
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from typing import Any, TypeVar
+
+import anyio.from_thread
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+
+from ..schemas.base import BulkRejection, BulkResult
+from .streaming import NDJSON_MEDIA_TYPE
+
+CSV_MEDIA_TYPE = "text/csv"
+# Rows are validated and inserted this many at a time, one transaction per chunk.
+CHUNK_SIZE = 1000
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+Record = tuple[int, dict[str, Any] | None, str | None]
+
+
+def upload_format(request: Request) -> str:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in (CSV_MEDIA_TYPE, "application/csv"):
+        return CSV_MEDIA_TYPE
+    if content_type in (NDJSON_MEDIA_TYPE, "application/ndjson", "application/jsonl"):
+        return NDJSON_MEDIA_TYPE
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail=f"Upload {CSV_MEDIA_TYPE} or {NDJSON_MEDIA_TYPE}",
+    )
+
+
+def body_lines(request: Request) -> Iterator[str]:
+    """Lines of the request body, read from the event loop as the sync handler consumes them.
+
+    Only usable from a worker thread (sync route handlers run in one), so the upload is never
+    held in memory as a whole.
+    """
+    chunks = request.stream()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        try:
+            chunk = anyio.from_thread.run(chunks.__anext__)
+        except StopAsyncIteration:
+            break
+        pending += _decode(decoder, chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += _decode(decoder, b"", final=True)
+    if pending:
+        yield pending
+
+
+def _decode(decoder: codecs.IncrementalDecoder, chunk: bytes, final: bool = False) -> str:
+    try:
+        return decoder.decode(chunk, final)
+    except UnicodeDecodeError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Upload is not valid UTF-8"
+        ) from exc
+
+
+def read_records(lines: Iterable[str], media_type: str) -> Iterator[Record]:
+    """Yield ``(line, record, error)`` for every row of a CSV or NDJSON upload."""
+    if media_type == CSV_MEDIA_TYPE:
+        yield from _csv_records(lines)
+        return
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, "Invalid JSON"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, record, None
+
+
+def _csv_records(lines: Iterable[str]) -> Iterator[Record]:
+    consumed = 0
+
+    def counted() -> Iterator[str]:
+        nonlocal consumed
+        for line in lines:
+            consumed += 1
+            yield line
+
+    reader = csv.DictReader(counted())
+    try:
+        fieldnames = reader.fieldnames
+    except csv.Error as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid CSV header: {exc}"
+        ) from exc
+    if fieldnames is None:
+        return
+    names = [name.strip() for name in fieldnames]
+    # DictReader keeps only the last of two same-named columns, silently dropping the other.
+    if not all(names) or len(set(names)) != len(names):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid CSV header: column names must be unique and non-empty",
+        )
+    reader.fieldnames = names
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            # The reader resumes after the offending line, so only that row is rejected.
+            yield consumed, None, f"Invalid CSV: {exc}"
+            continue
+        if None in row:
+            yield reader.line_num, None, "Too many columns"
+            continue
+        # Empty cells fall back to the schema defaults; photos are "|" separated URLs.
+        record: dict[str, Any] = {key: value for key, value in row.items() if value}
+        if "photos" in record:
+            record["photos"] = [url.strip() for url in record["photos"].split("|") if url.strip()]
+        if record:
+            yield reader.line_num, record, None
+
+
+def ingest(
+    records: Iterable[Record],
+    schema: type[ModelT],
+    insert: Callable[[Sequence[ModelT]], int],
+    chunk_size: int = CHUNK_SIZE,
+) -> BulkResult:
+    """Validate ``records`` against ``schema`` and pass valid rows to ``insert`` in chunks."""
+    result = BulkResult()
+    chunk: list[ModelT] = []
+    for line, record, error in records:
+        if error is None:
+            try:
+                chunk.append(schema.model_validate(record))
+            except ValidationError as exc:
+                error = "; ".join(_describe(detail) for detail in exc.errors())
+        if error is not None:
+            result.rejected.append(BulkRejection(line=line, error=error))
+        if len(chunk) >= chunk_size:
+            result.inserted += insert(chunk)
+            chunk = []
+    if chunk:
+        result.inserted += insert(chunk)
+    return result
+
+
+def _describe(detail: Any) -> str:
+    location = ".".join(str(part) for part in detail["loc"])
+    return f"{location}: {detail['msg']}" if location else detail["msg"]
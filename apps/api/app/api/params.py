@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+
+from fastapi import HTTPException, status
+
+from ..services.spatial_index import BBox
+
+
+def parse_bbox(bbox: str | None) -> BBox | None:
+    if not bbox:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = map(float, bbox.split(","))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid bbox") from exc
+    # float() also parses "nan" and "inf", which no index or SQL comparison can use.
+    finite = all(map(math.isfinite, (min_lon, min_lat, max_lon, max_lat)))
+    if not finite or min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid bbox")
+    return (min_lon, min_lat, max_lon, max_lat)
+
+
+def parse_fields(fields: str | None, allowed: Iterable[str]) -> list[str] | None:
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+    # id is always returned so sparse rows can be matched to full ones later.
+    return list(dict.fromkeys(["id", *requested]))
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from ..core.database import SessionLocal
+from ..schemas.base import Page
+from ..schemas.trip import TripRead
+from ..services.response_cache import ResponseCache
+from .caching import cache_key, remember, replay
+from .conditional import Validators
+from .params import parse_bbox, parse_fields
+from .streaming import (
+    mapping_encoder,
+    model_encoder,
+    stream_media_type,
+    streaming_response,
+)
+
+# Request handling shared by the sync routers and the async read routes; the handlers only
+# differ in how they reach the database between these steps.
+
+T = TypeVar("T")
+
+
+async def off_loop(cache: ResponseCache | None, function: Callable[..., T], *args: Any) -> T:
+    """Call ``function`` (which touches ``cache``) without blocking the event loop on it."""
+    if cache is not None and cache.blocking:
+        return await run_in_threadpool(function, *args)
+    return function(*args)
+
+
+@contextmanager
+def invalid_cursor() -> Iterator[None]:
+    try:
+        yield
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+class ListingRead:
+    """A page, stream or cached copy of a public catalogue listing."""
+
+    def __init__(
+        self,
+        request: Request,
+        repository_class: type,
+        schema: type[BaseModel],
+        cache: ResponseCache | None,
+        bbox: str | None,
+        fields: str | None,
+        stream: bool,
+    ):
+        self.request = request
+        self.repository_class = repository_class
+        self.schema = schema
+        self.cache = cache
+        self.bbox = parse_bbox(bbox)
+        self.fields = parse_fields(fields, repository_class.FIELDS)
+        self.media_type = stream_media_type(request, stream)
+        self.key = None
+        if self.bbox is None and not self.media_type:
+            namespace = repository_class.CACHE_NAMESPACE
+            self.key = cache_key(cache, namespace, request.url.query, listing=True)
+        self.validators: Validators | None = None
+
+    def replay(self) -> Response | None:
+        return replay(self.cache, self.key, self.request)
+
+    def check(self, version: Iterable[Any]) -> Response | None:
+        """Derive the validators; a 304 when the client already holds ``version``."""
+        self.validators = Validators.of(version, self.request.url.query, self.media_type)
+        if self.validators.not_modified(self.request):
+            return self.validators.response_304()
+        return None
+
+    def stream(self, repository: Any) -> Response:
+        # Full-catalogue streams always run on a sync server-side cursor in the threadpool.
+        repository_class, index, guard = self.repository_class, repository.index, repository.guard
+        bbox, fields = self.bbox, self.fields
+        streamed = streaming_response(
+            SessionLocal,
+            lambda db: repository_class(db, index, guard=guard).stream(bbox, fields),
+            mapping_encoder if fields else model_encoder(self.schema),
+            self.media_type,
+        )
+        return self.validators.apply(streamed)
+
+    def respond(self, records: Sequence[Any], next_cursor: str | None) -> Response:
+        if self.fields:
+            # Sparse rows skip model validation; the envelope is encoded directly.
+            page = Page[dict[str, Any]](items=records, next_cursor=next_cursor)
+        else:
+            page = Page[self.schema](
+                items=[self.schema.model_validate(record) for record in records],
+                next_cursor=next_cursor,
+            )
+        return remember(self.cache, self.key, page, self.validators)
+
+
+class DetailRead:
+    """One catalogue row, served from the response cache or revalidated by its version."""
+
+    def __init__(
+        self,
+        request: Request,
+        repository_class: type,
+        schema: type[BaseModel],
+        cache: ResponseCache | None,
+        row_id: int,
+        missing: str,
+    ):
+        self.request = request
+        self.schema = schema
+        self.cache = cache
+        self.row_id = row_id
+        self.missing = missing
+        self.key = cache_key(cache, repository_class.CACHE_NAMESPACE, row_id)
+
+    def replay(self) -> Response | None:
+        return replay(self.cache, self.key, self.request)
+
+    def check(self, version: tuple[Any, ...] | None) -> Response | None:
+        if version is None:
+            return None
+        validators = Validators.of((self.row_id, *version))
+        if validators.not_modified(self.request):
+            return validators.response_304()
+        return None
+
+    def respond(self, row: Any) -> Response:
+        if not row:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=self.missing)
+        validators = Validators.of((self.row_id, row.updated_at, row.revision))
+        return remember(self.cache, self.key, self.schema.model_validate(row), validators)
+
+
+def private_check(
+    request: Request, response: Response, version: Iterable[Any], *variant: Any
+) -> Response | None:
+    """Set per-user validators on ``response``; a 304 when the client already holds them."""
+    validators = Validators.of(version, *variant, private=True)
+    if validators.not_modified(request):
+        return validators.response_304()
+    validators.apply(response)
+    return None
+
+
+def trip_page(trips: Sequence[Any], next_cursor: str | None) -> Page[TripRead]:
+    return Page[TripRead](
+        items=[TripRead.model_validate(trip) for trip in trips],
+        next_cursor=next_cursor,
+    )
+
+
+def own_trip(trip: Any, user_id: int) -> TripRead:
+    if not trip or trip.user_id != user_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    return TripRead.model_validate(trip)
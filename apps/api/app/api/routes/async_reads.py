@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+
+from ...dependencies import (
+    get_async_current_user,
+    get_async_poi_repository,
+    get_async_property_repository,
+    get_async_trip_repository,
+)
+from ...repositories.poi import (
+    AsyncPointOfInterestRepository,
+    PointOfInterestRepository,
+)
+from ...repositories.property import (
+    AsyncPartnerPropertyRepository,
+    PartnerPropertyRepository,
+)
+from ...repositories.trip import AsyncTripRepository
+from ...schemas.base import Page
+from ...schemas.poi import POIRead
+from ...schemas.property import PropertyRead
+from ...schemas.trip import TripRead
+from ...services.users import UserSnapshot
+from ..reads import (
+    DetailRead,
+    ListingRead,
+    invalid_cursor,
+    off_loop,
+    own_trip,
+    private_check,
+    trip_page,
+)
+
+# Native async handlers for the hot read paths, mounted ahead of the sync routers when
+# DATABASE_ASYNC is enabled. They share paths and contracts with the sync routes, which
+# remain the documented operations. Ids use the int convertor so that static siblings such as
+# /pois/nearby fall through to the sync routers. Response cache calls go through ``off_loop``,
+# so a network backend such as redis never blocks the event loop.
+router = APIRouter(include_in_schema=False)
+
+
+@router.get("/pois/", response_model=Page[POIRead])
+async def list_pois(
+    request: Request,
+    bbox: str | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(default=100, ge=1, le=500),
+    stream: bool = Query(default=False),
+    fields: str | None = Query(default=None),
+    repository: AsyncPointOfInterestRepository = Depends(get_async_poi_repository),
+):
+    cache = repository.cache
+    listing = await off_loop(
+        cache, ListingRead, request, PointOfInterestRepository, POIRead, cache, bbox, fields, stream
+    )
+    response = await off_loop(cache, listing.replay)
+    response = response or listing.check(await repository.version(listing.bbox))
+    if response is not None:
+        return response
+    if listing.media_type:
+        return listing.stream(repository)
+    with invalid_cursor():
+        records, next_cursor = await repository.page(listing.bbox, cursor, limit, listing.fields)
+    return await off_loop(cache, listing.respond, records, next_cursor)
+
+
+@router.get("/pois/{poi_id:int}", response_model=POIRead)
+async def get_poi(
+    poi_id: int,
+    request: Request,
+    repository: AsyncPointOfInterestRepository = Depends(get_async_poi_repository),
+):
+    cache = repository.cache
+    detail = await off_loop(
+        cache, DetailRead, request, PointOfInterestRepository, POIRead, cache, poi_id, "POI not found"
+    )
+    response = await off_loop(cache, detail.replay)
+    response = response or detail.check(await repository.row_version(poi_id))
+    if response is not None:
+        return response
+    return await off_loop(cache, detail.respond, await repository.get(poi_id))
+
+
+@router.get("/properties/", response_model=Page[PropertyRead])
+async def list_properties(
+    request: Request,
+    bbox: str | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(default=100, ge=1, le=500),
+    stream: bool = Query(default=False),
+    fields: str | None = Query(default=None),
+    repository: AsyncPartnerPropertyRepository = Depends(get_async_property_repository),
+):
+    cache = repository.cache
+    listing = await off_loop(
+        cache,
+        ListingRead,
+        request,
+        PartnerPropertyRepository,
+        PropertyRead,
+        cache,
+        bbox,
+        fields,
+        stream,
+    )
+    response = await off_loop(cache, listing.replay)
+    response = response or listing.check(await repository.version(listing.bbox))
+    if response is not None:
+        return response
+    if listing.media_type:
+        return listing.stream(repository)
+    with invalid_cursor():
+        records, next_cursor = await repository.page(listing.bbox, cursor, limit, listing.fields)
+    return await off_loop(cache, listing.respond, records, next_cursor)
+
+
+@router.get("/properties/{property_id:int}", response_model=PropertyRead)
+async def get_property(
+    property_id: int,
+    request: Request,
+    repository: AsyncPartnerPropertyRepository = Depends(get_async_property_repository),
+):
+    cache = repository.cache
+    detail = await off_loop(
+        cache,
+        DetailRead,
+        request,
+        PartnerPropertyRepository,
+        PropertyRead,
+        cache,
+        property_id,
+        "Property not found",
+    )
+    response = await off_loop(cache, detail.replay)
+    response = response or detail.check(await repository.row_version(property_id))
+    if response is not None:
+        return response
+    return await off_loop(cache, detail.respond, await repository.get(property_id))
+
+
+@router.get("/trips/", response_model=Page[TripRead])
+async def list_trips(
+    request: Request,
+    response: Response,
+    cursor: str | None = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=200),
+    current_user: UserSnapshot = Depends(get_async_current_user),
+    repository: AsyncTripRepository = Depends(get_async_trip_repository),
+):
+    version = await repository.version_for_user(current_user.id)
+    not_modified = private_check(request, response, version, request.url.query)
+    if not_modified is not None:
+        return not_modified
+    with invalid_cursor():
+        trips, next_cursor = await repository.page_for_user(current_user.id, cursor, limit)
+    return trip_page(trips, next_cursor)
+
+
+@router.get("/trips/{trip_id:int}", response_model=TripRead)
+async def get_trip(
+    trip_id: int,
+    request: Request,
+    response: Response,
+    current_user: UserSnapshot = Depends(get_async_current_user),
+    repository: AsyncTripRepository = Depends(get_async_trip_repository),
+):
+    version = await repository.version_of(current_user.id, trip_id)
+    if version[0]:
+        not_modified = private_check(request, response, version, trip_id)
+        if not_modified is not None:
+            return not_modified
+    return own_trip(await repository.get(trip_id), current_user.id)
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from dataclasses import asdict
+from datetime import datetime
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from pydantic import BaseModel, HttpUrl
 
+from ...core.database import SessionLocal
 from ...dependencies import get_current_user
-from ...models import User
+from ...services.booking_import import ExportError, booking_importer
+from ...services.users import UserSnapshot
 
 router = APIRouter(prefix="/import/booking/portability", tags=["booking.com"])
 
@@ -18,13 +23,38 @@ class PortabilityResponse(BaseModel):
     message: str
 
 
+class PortabilityStatus(PortabilityResponse):
+    state: str | None = None
+    bytes_read: int = 0
+    reservations: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    matched: int = 0
+    imported: int = 0
+    trip_id: int | None = None
+    error: str | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
 @router.post("/register", response_model=PortabilityResponse)
 def register_portability(
     payload: PortabilityRegistration,
-    current_user: User = Depends(get_current_user),
+    background_tasks: BackgroundTasks,
+    current_user: UserSnapshot = Depends(get_current_user),
 ) -> PortabilityResponse:
-    # Placeholder implementation. In production this would trigger an async fetch of the export
-    # referenced by the provided URL and parse candidate stays for the user to review.
+    try:
+        booking_importer.check_url(str(payload.url))
+    except ExportError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    try:
+        progress = booking_importer.start(current_user.id)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    # The export is downloaded, matched and stored after the response is sent.
+    background_tasks.add_task(
+        booking_importer.run, SessionLocal, current_user.id, str(payload.url), progress
+    )
     return PortabilityResponse(
         message=(
             "Booking.com portability import registered for "
@@ -33,11 +63,9 @@ def register_portability(
     )
 
 
-@router.get("/status", response_model=PortabilityResponse)
-def portability_status(current_user: User = Depends(get_current_user)) -> PortabilityResponse:
-    return PortabilityResponse(
-        message=(
-            "Portability import processing is not yet implemented. "
-            "Check back once the feature flag is enabled."
-        )
-    )
+@router.get("/status", response_model=PortabilityStatus)
+def portability_status(current_user: UserSnapshot = Depends(get_current_user)) -> PortabilityStatus:
+    progress = booking_importer.status(current_user.id)
+    if progress is None:
+        return PortabilityStatus(message="No Booking.com import has been registered.")
+    return PortabilityStatus(message=f"Booking.com import {progress.state}.", **asdict(progress))
@@ -1,36 +1,132 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 
-from ...dependencies import get_current_user, get_poi_repository
+from ...dependencies import (
+    get_current_user,
+    get_poi_repository,
+    get_property_repository,
+)
 from ...repositories.poi import PointOfInterestRepository
-from ...schemas.poi import POICreate, POIRead, POIUpdate
+from ...repositories.property import PartnerPropertyRepository
+from ...schemas.base import BulkResult, Page
+from ...schemas.poi import (
+    POICluster,
+    POICreate,
+    POIFacets,
+    POINearby,
+    POIRead,
+    POIUpdate,
+)
+from ...schemas.search import Suggestion
+from ..ingest import body_lines, ingest, read_records, upload_format
+from ..params import parse_bbox
+from ..reads import DetailRead, ListingRead, invalid_cursor
 
 router = APIRouter(prefix="/pois", tags=["points-of-interest"])
 
 
-@router.get("/", response_model=list[POIRead])
+@router.get("/", response_model=Page[POIRead])
 def list_pois(
+    request: Request,
     bbox: str | None = Query(default=None, description="minLon,minLat,maxLon,maxLat"),
+    cursor: str | None = Query(default=None, description="next_cursor from the previous page"),
+    limit: int = Query(default=100, ge=1, le=500),
+    stream: bool = Query(default=False, description="Stream every match instead of one page"),
+    fields: str | None = Query(default=None, description="Comma separated subset of fields"),
     repository: PointOfInterestRepository = Depends(get_poi_repository),
 ):
-    parsed_bbox = None
-    if bbox:
-        try:
-            min_lon, min_lat, max_lon, max_lat = map(float, bbox.split(","))
-            parsed_bbox = (min_lon, min_lat, max_lon, max_lat)
-        except ValueError as exc:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid bbox") from exc
-    records = repository.list(parsed_bbox)
-    return [POIRead.model_validate(poi) for poi in records]
+    listing = ListingRead(
+        request, PointOfInterestRepository, POIRead, repository.cache, bbox, fields, stream
+    )
+    response = listing.replay() or listing.check(repository.version(listing.bbox))
+    if response is not None:
+        return response
+    if listing.media_type:
+        return listing.stream(repository)
+    with invalid_cursor():
+        records, next_cursor = repository.page(listing.bbox, cursor, limit, listing.fields)
+    return listing.respond(records, next_cursor)
+
+
+@router.get("/nearby", response_model=list[POINearby])
+def nearby_pois(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(default=5000, gt=0, le=100_000),
+    k: int = Query(default=20, ge=1, le=200),
+    category: str | None = Query(default=None),
+    repository: PointOfInterestRepository = Depends(get_poi_repository),
+):
+    return [
+        POINearby(**POIRead.model_validate(poi).model_dump(), distance_m=round(distance, 1))
+        for poi, distance in repository.nearby(lon, lat, radius_m, k, category)
+    ]
+
+
+@router.get("/clusters", response_model=list[POICluster])
+def cluster_pois(
+    bbox: str = Query(..., description="minLon,minLat,maxLon,maxLat"),
+    zoom: int = Query(..., ge=0, le=22, description="Web map zoom level of the viewport"),
+    repository: PointOfInterestRepository = Depends(get_poi_repository),
+):
+    """Aggregate the viewport into clusters of about 64 px, with a category breakdown each."""
+    return [
+        POICluster(
+            latitude=round(cluster.latitude, 6),
+            longitude=round(cluster.longitude, 6),
+            count=cluster.count,
+            categories=cluster.tags,
+        )
+        for cluster in repository.clusters(parse_bbox(bbox), zoom)
+    ]
+
+
+@router.get("/facets", response_model=POIFacets)
+def poi_facets(
+    bbox: str | None = Query(default=None, description="minLon,minLat,maxLon,maxLat"),
+    repository: PointOfInterestRepository = Depends(get_poi_repository),
+):
+    """Published POIs per category, for the filter sheet."""
+    categories = repository.facets(parse_bbox(bbox))
+    return POIFacets(
+        total=sum(categories.values()),
+        categories=dict(sorted(categories.items(), key=lambda item: (-item[1], item[0]))),
+    )
+
+
+@router.get("/suggest", response_model=list[Suggestion])
+def suggest_names(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=50),
+    repository: PointOfInterestRepository = Depends(get_poi_repository),
+    properties: PartnerPropertyRepository = Depends(get_property_repository),
+):
+    """Published POI and stay names with a word starting with ``prefix``, for autocomplete."""
+    suggestions = [
+        Suggestion(kind="poi", id=row_id, name=name, popularity=popularity)
+        for row_id, name, popularity in repository.suggest(prefix, limit)
+    ] + [
+        Suggestion(kind="property", id=row_id, name=name, popularity=popularity)
+        for row_id, name, popularity in properties.suggest(prefix, limit)
+    ]
+    suggestions.sort(key=lambda suggestion: -suggestion.popularity)
+    return suggestions[:limit]
 
 
 @router.get("/{poi_id}", response_model=POIRead)
-def get_poi(poi_id: int, repository: PointOfInterestRepository = Depends(get_poi_repository)):
-    poi = repository.get(poi_id)
-    if not poi:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="POI not found")
-    return POIRead.model_validate(poi)
+def get_poi(
+    poi_id: int,
+    request: Request,
+    repository: PointOfInterestRepository = Depends(get_poi_repository),
+):
+    detail = DetailRead(
+        request, PointOfInterestRepository, POIRead, repository.cache, poi_id, "POI not found"
+    )
+    response = detail.replay() or detail.check(repository.row_version(poi_id))
+    if response is not None:
+        return response
+    return detail.respond(repository.get(poi_id))
 
 
 @router.post("/", response_model=POIRead, status_code=status.HTTP_201_CREATED)
@@ -43,6 +139,20 @@ def create_poi(
     return POIRead.model_validate(poi)
 
 
+@router.post("/bulk", response_model=BulkResult)
+def bulk_create_pois(
+    request: Request,
+    repository: PointOfInterestRepository = Depends(get_poi_repository),
+    _: object = Depends(get_current_user),
+):
+    """Insert rows from a streamed CSV (header row, "|" separated photos) or NDJSON upload.
+
+    Invalid rows are skipped and reported by line; valid ones are inserted in chunks.
+    """
+    media_type = upload_format(request)
+    return ingest(read_records(body_lines(request), media_type), POICreate, repository.bulk_create)
+
+
 @router.patch("/{poi_id}", response_model=POIRead)
 def update_poi(
     poi_id: int,
@@ -1,39 +1,77 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 
 from ...dependencies import get_current_user, get_property_repository
 from ...repositories.property import PartnerPropertyRepository
-from ...schemas.property import PropertyCreate, PropertyRead, PropertyUpdate
+from ...schemas.base import BulkResult, Page
+from ...schemas.property import (
+    PropertyCreate,
+    PropertyNearby,
+    PropertyRead,
+    PropertyUpdate,
+)
+from ..ingest import body_lines, ingest, read_records, upload_format
+from ..reads import DetailRead, ListingRead, invalid_cursor
 
 router = APIRouter(prefix="/properties", tags=["partner-properties"])
 
 
-@router.get("/", response_model=list[PropertyRead])
+@router.get("/", response_model=Page[PropertyRead])
 def list_properties(
+    request: Request,
     bbox: str | None = Query(default=None, description="minLon,minLat,maxLon,maxLat"),
+    cursor: str | None = Query(default=None, description="next_cursor from the previous page"),
+    limit: int = Query(default=100, ge=1, le=500),
+    stream: bool = Query(default=False, description="Stream every match instead of one page"),
+    fields: str | None = Query(default=None, description="Comma separated subset of fields"),
     repository: PartnerPropertyRepository = Depends(get_property_repository),
 ):
-    parsed_bbox = None
-    if bbox:
-        try:
-            min_lon, min_lat, max_lon, max_lat = map(float, bbox.split(","))
-            parsed_bbox = (min_lon, min_lat, max_lon, max_lat)
-        except ValueError as exc:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid bbox") from exc
-    records = repository.list(parsed_bbox)
-    return [PropertyRead.model_validate(prop) for prop in records]
+    listing = ListingRead(
+        request, PartnerPropertyRepository, PropertyRead, repository.cache, bbox, fields, stream
+    )
+    response = listing.replay() or listing.check(repository.version(listing.bbox))
+    if response is not None:
+        return response
+    if listing.media_type:
+        return listing.stream(repository)
+    with invalid_cursor():
+        records, next_cursor = repository.page(listing.bbox, cursor, limit, listing.fields)
+    return listing.respond(records, next_cursor)
+
+
+@router.get("/nearby", response_model=list[PropertyNearby])
+def nearby_properties(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(default=5000, gt=0, le=100_000),
+    k: int = Query(default=20, ge=1, le=200),
+    repository: PartnerPropertyRepository = Depends(get_property_repository),
+):
+    return [
+        PropertyNearby(**PropertyRead.model_validate(prop).model_dump(), distance_m=round(distance, 1))
+        for prop, distance in repository.nearby(lon, lat, radius_m, k)
+    ]
 
 
 @router.get("/{property_id}", response_model=PropertyRead)
 def get_property(
     property_id: int,
+    request: Request,
     repository: PartnerPropertyRepository = Depends(get_property_repository),
 ):
-    prop = repository.get(property_id)
-    if not prop:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Property not found")
-    return PropertyRead.model_validate(prop)
+    detail = DetailRead(
+        request,
+        PartnerPropertyRepository,
+        PropertyRead,
+        repository.cache,
+        property_id,
+        "Property not found",
+    )
+    response = detail.replay() or detail.check(repository.row_version(property_id))
+    if response is not None:
+        return response
+    return detail.respond(repository.get(property_id))
 
 
 @router.post("/", response_model=PropertyRead, status_code=status.HTTP_201_CREATED)
@@ -46,6 +84,21 @@ def create_property(
     return PropertyRead.model_validate(prop)
 
 
+
+@router.post("/bulk", response_model=BulkResult)
+def bulk_create_properties(
+    request: Request,
+    repository: PartnerPropertyRepository = Depends(get_property_repository),
+    _: object = Depends(get_current_user),
+):
+    """Insert rows from a streamed CSV (header row, "|" separated photos) or NDJSON upload.
+
+    Invalid rows are skipped and reported by line; valid ones are inserted in chunks.
+    """
+    media_type = upload_format(request)
+    return ingest(read_records(body_lines(request), media_type), PropertyCreate, repository.bulk_create)
+
+
 @router.patch("/{property_id}", response_model=PropertyRead)
 def update_property(
     property_id: int,
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import TypeVar
+
+from fastapi import APIRouter, Depends, Query
+
+from ...dependencies import get_poi_repository, get_property_repository
+from ...repositories.poi import PointOfInterestRepository
+from ...repositories.property import PartnerPropertyRepository
+from ...schemas.poi import POIRead
+from ...schemas.property import PropertyRead
+from ...schemas.search import SearchHit
+from ..params import parse_bbox
+
+router = APIRouter(tags=["search"])
+
+T = TypeVar("T")
+
+
+@router.get("/search", response_model=list[SearchHit])
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    bbox: str | None = Query(default=None, description="minLon,minLat,maxLon,maxLat"),
+    category: str | None = Query(default=None, description="Only POIs of this category"),
+    limit: int = Query(default=20, ge=1, le=100),
+    pois: PointOfInterestRepository = Depends(get_poi_repository),
+    properties: PartnerPropertyRepository = Depends(get_property_repository),
+):
+    """POIs and properties matching ``q``, most relevant first.
+
+    Each source scores against its own corpus, so scores are scaled by that source's best
+    hit before the lists are merged: 1.0 is the top match of its kind.
+    """
+    parsed_bbox = parse_bbox(bbox)
+    hits = [
+        SearchHit(kind="poi", score=score, poi=POIRead.model_validate(poi))
+        for poi, score in _normalised(pois.search(q, limit, parsed_bbox, category))
+    ]
+    if category is None:
+        hits += [
+            SearchHit(kind="property", score=score, property=PropertyRead.model_validate(prop))
+            for prop, score in _normalised(properties.search(q, limit, parsed_bbox))
+        ]
+    hits.sort(key=lambda hit: hit.score, reverse=True)
+    return hits[:limit]
+
+
+def _normalised(matches: list[tuple[T, float]]) -> list[tuple[T, float]]:
+    top = max((score for _, score in matches), default=0.0)
+    if top <= 0:
+        return [(row, 0.0) for row, _ in matches]
+    return [(row, round(score / top, 4)) for row, score in matches]
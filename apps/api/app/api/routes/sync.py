@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from ...dependencies import get_current_user, get_sync_repository
+from ...repositories.pagination import decode_cursor, encode_cursor
+from ...repositories.sync import SyncRepository
+from ...schemas.poi import POIRead
+from ...schemas.property import PropertyRead
+from ...schemas.sync import SyncChanges, SyncDeletion, SyncTrip, SyncTripStop
+from ...services.users import UserSnapshot
+
+router = APIRouter(tags=["sync"])
+
+
+@router.get("/sync", response_model=SyncChanges)
+def sync(
+    since: str | None = Query(default=None, description="token from the previous sync"),
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: SyncRepository = Depends(get_sync_repository),
+):
+    """Catalogue rows and the caller's trips changed since ``since``; everything without it."""
+    since_at = _parse_token(since) if since else None
+    # Taken before reading, so anything written meanwhile is at or after the next token.
+    token = encode_cursor([repository.token_time()])
+    return SyncChanges(
+        token=token,
+        pois=[POIRead.model_validate(poi) for poi in repository.pois(since_at)],
+        properties=[PropertyRead.model_validate(prop) for prop in repository.properties(since_at)],
+        trips=[SyncTrip.model_validate(trip) for trip in repository.trips(current_user.id, since_at)],
+        trip_stops=[
+            SyncTripStop.model_validate(stop)
+            for stop in repository.trip_stops(current_user.id, since_at)
+        ],
+        deleted=[
+            SyncDeletion(entity=tombstone.entity, id=tombstone.entity_id, deleted_at=tombstone.deleted_at)
+            for tombstone in repository.deletions(current_user.id, since_at)
+        ],
+    )
+
+
+def _parse_token(token: str) -> datetime:
+    try:
+        values = decode_cursor(token)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token") from exc
+    if len(values) != 1 or not isinstance(values[0], datetime):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token")
+    return values[0]
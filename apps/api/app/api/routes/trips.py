@@ -1,22 +1,31 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
 
 from ...dependencies import get_current_user, get_trip_repository
-from ...models import Trip, TripStop, User
+from ...models import Trip, TripStop
 from ...models.enums import TripStopStatus
 from ...repositories.trip import TripRepository
+from ...schemas.base import Page
 from ...schemas.trip import (
     BookingCreate,
     BookingRead,
     TripCreate,
+    TripDistances,
     TripRead,
+    TripStopBatch,
+    TripStopBatchResult,
+    TripStopChangeResult,
     TripStopCreate,
     TripStopRead,
     TripStopUpdate,
     TripUpdate,
 )
+from ...services.users import UserSnapshot
+from ..reads import invalid_cursor, own_trip, private_check, trip_page
 
 router = APIRouter(prefix="/trips", tags=["trips"])
 
@@ -29,19 +38,28 @@ class MarkStopPayload(BaseModel):
     status: TripStopStatus
 
 
-@router.get("/", response_model=list[TripRead])
+@router.get("/", response_model=Page[TripRead])
 def list_trips(
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    cursor: str | None = Query(default=None, description="next_cursor from the previous page"),
+    limit: int = Query(default=50, ge=1, le=200),
+    current_user: UserSnapshot = Depends(get_current_user),
     repository: TripRepository = Depends(get_trip_repository),
 ):
-    trips = repository.for_user(current_user.id)
-    return [TripRead.model_validate(trip) for trip in trips]
+    version = repository.version_for_user(current_user.id)
+    not_modified = private_check(request, response, version, request.url.query)
+    if not_modified is not None:
+        return not_modified
+    with invalid_cursor():
+        trips, next_cursor = repository.page_for_user(current_user.id, cursor, limit)
+    return trip_page(trips, next_cursor)
 
 
 @router.post("/", response_model=TripRead, status_code=status.HTTP_201_CREATED)
 def create_trip(
     payload: TripCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     repository: TripRepository = Depends(get_trip_repository),
 ):
     trip = repository.create(current_user.id, payload)
@@ -51,36 +69,43 @@ def create_trip(
 @router.get("/{trip_id}", response_model=TripRead)
 def get_trip(
     trip_id: int,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: UserSnapshot = Depends(get_current_user),
     repository: TripRepository = Depends(get_trip_repository),
 ):
-    trip = repository.get(trip_id)
-    if not trip or trip.user_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
-    return TripRead.model_validate(trip)
+    version = repository.version_of(current_user.id, trip_id)
+    if version[0]:
+        not_modified = private_check(request, response, version, trip_id)
+        if not_modified is not None:
+            return not_modified
+    return own_trip(repository.get(trip_id), current_user.id)
 
 
 @router.patch("/{trip_id}", response_model=TripRead)
 def update_trip(
     trip_id: int,
     payload: TripUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     repository: TripRepository = Depends(get_trip_repository),
 ):
     trip = repository.get(trip_id)
     if not trip or trip.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
-    updated = repository.update(trip, payload)
+    try:
+        updated = repository.update(trip, payload)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
     return TripRead.model_validate(updated)
 
 
 @router.delete("/{trip_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_trip(
     trip_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     repository: TripRepository = Depends(get_trip_repository),
 ):
-    trip = repository.get(trip_id)
+    trip = repository.get(trip_id, with_stops=False)
     if not trip or trip.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
     repository.delete(trip)
@@ -91,7 +116,7 @@ def delete_trip(
 def create_stop(
     trip_id: int,
     payload: TripStopCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     repository: TripRepository = Depends(get_trip_repository),
 ):
     trip = repository.get(trip_id)
@@ -106,7 +131,7 @@ def update_stop(
     trip_id: int,
     stop_id: int,
     payload: TripStopUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     repository: TripRepository = Depends(get_trip_repository),
 ):
     trip = repository.get(trip_id)
@@ -123,7 +148,7 @@ def update_stop(
 def delete_stop(
     trip_id: int,
     stop_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     repository: TripRepository = Depends(get_trip_repository),
 ):
     trip = repository.get(trip_id)
@@ -132,16 +157,43 @@ def delete_stop(
     stop = next((s for s in trip.stops if s.id == stop_id), None)
     if not stop:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stop not found")
-    trip.stops.remove(stop)
-    repository.remove_stop(stop)
+    repository.remove_stop(trip, stop)
     return None
 
 
+@router.post("/{trip_id}/stops/batch", response_model=TripStopBatchResult)
+def batch_update_stops(
+    trip_id: int,
+    payload: TripStopBatch,
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: TripRepository = Depends(get_trip_repository),
+):
+    """Apply queued stop changes (status, fields, sort) in one transaction.
+
+    Each operation gets its own result; failed ones are skipped without blocking the rest.
+    """
+    trip = repository.get(trip_id, with_stops=False)
+    if not trip or trip.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    errors, stops = repository.apply_stop_changes(trip_id, payload.operations)
+    return TripStopBatchResult(
+        results=[
+            TripStopChangeResult(
+                stop_id=change.stop_id,
+                ok=error is None,
+                detail=error,
+                stop=TripStopRead.model_validate(stops[change.stop_id]) if error is None else None,
+            )
+            for change, error in zip(payload.operations, errors)
+        ]
+    )
+
+
 @router.post("/{trip_id}/stops/reorder", response_model=TripRead)
 def reorder_stops(
     trip_id: int,
     payload: ReorderPayload,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     repository: TripRepository = Depends(get_trip_repository),
 ):
     trip = repository.get(trip_id)
@@ -151,30 +203,67 @@ def reorder_stops(
     return TripRead.model_validate(updated)
 
 
+@router.get("/{trip_id}/distances", response_model=TripDistances)
+def trip_distances(
+    trip_id: int,
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: TripRepository = Depends(get_trip_repository),
+):
+    trip = repository.get(trip_id)
+    if not trip or trip.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    stops = sorted(trip.stops, key=lambda stop: (stop.day_index, stop.sort))
+    matrix = [
+        [None if math.isnan(value) else round(value, 1) for value in row]
+        for row in repository.stop_distances(stops).tolist()
+    ]
+    legs = [
+        matrix[index][index + 1] if stops[index].day_index == stops[index + 1].day_index else None
+        for index in range(len(stops) - 1)
+    ]
+    return TripDistances(
+        stop_ids=[stop.id for stop in stops],
+        matrix_m=matrix,
+        legs_m=legs,
+        total_m=round(sum(leg for leg in legs if leg is not None), 1),
+    )
+
+
+@router.post("/{trip_id}/optimize", response_model=TripRead)
+def optimize_trip(
+    trip_id: int,
+    current_user: UserSnapshot = Depends(get_current_user),
+    repository: TripRepository = Depends(get_trip_repository),
+):
+    """Reorder the stops of every day for the shortest route between its stays."""
+    trip = repository.get(trip_id)
+    if not trip or trip.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    updated = repository.optimize_stops(trip)
+    return TripRead.model_validate(updated)
+
+
 @router.post("/stops/{stop_id}/mark", response_model=TripStopRead)
 def mark_stop(
     stop_id: int,
     payload: MarkStopPayload,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     repository: TripRepository = Depends(get_trip_repository),
 ):
-    # We expect to locate the stop across trips owned by the user
-    for trip in repository.for_user(current_user.id):
-        stop = next((s for s in trip.stops if s.id == stop_id), None)
-        if stop:
-            updated = repository.mark_stop_status(stop, payload.status)
-            return TripStopRead.model_validate(updated)
-    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stop not found")
+    stop = repository.mark_user_stop_status(current_user.id, stop_id, payload.status)
+    if not stop:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stop not found")
+    return TripStopRead.model_validate(stop)
 
 
 @router.post("/{trip_id}/bookings", response_model=BookingRead, status_code=status.HTTP_201_CREATED)
 def create_booking(
     trip_id: int,
     payload: BookingCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     repository: TripRepository = Depends(get_trip_repository),
 ):
-    trip = repository.get(trip_id)
+    trip = repository.get(trip_id, with_stops=False)
     if not trip or trip.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
     booking = repository.add_booking(payload.model_copy(update={"trip_id": trip_id}))
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractContextManager
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.orm import Session
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+
+# Encoded rows are flushed once this many bytes are buffered, trading a little latency for
+# far fewer socket writes than one chunk per row.
+FLUSH_BYTES = 64 * 1024
+
+_MAPPING = TypeAdapter(dict[str, Any])
+
+
+def stream_media_type(request: Request, stream: bool) -> str | None:
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return NDJSON_MEDIA_TYPE
+    if stream:
+        return JSON_MEDIA_TYPE
+    return None
+
+
+def model_encoder(schema: type[BaseModel]) -> Callable[[Any], bytes]:
+    return lambda row: schema.model_validate(row).model_dump_json().encode("utf-8")
+
+
+def mapping_encoder(row: dict[str, Any]) -> bytes:
+    return _MAPPING.dump_json(row)
+
+
+def encode_rows(
+    rows: Iterable[Any], encode: Callable[[Any], bytes], media_type: str
+) -> Iterator[bytes]:
+    ndjson = media_type == NDJSON_MEDIA_TYPE
+    buffer = bytearray() if ndjson else bytearray(b"[")
+    separator = b"\n" if ndjson else b","
+    first = True
+    for row in rows:
+        if not ndjson and not first:
+            buffer += separator
+        buffer += encode(row)
+        if ndjson:
+            buffer += separator
+        first = False
+        if len(buffer) >= FLUSH_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if not ndjson:
+        buffer += b"]"
+    if buffer:
+        yield bytes(buffer)
+
+
+def streaming_response(
+    session_factory: Callable[[], AbstractContextManager[Session]],
+    rows: Callable[[Session], Iterable[Any]],
+    encode: Callable[[Any], bytes],
+    media_type: str,
+) -> StreamingResponse:
+    """Stream ``rows(session)``, each serialised with ``encode``.
+
+    Request-scoped sessions are closed before the body is sent, so the generator opens its
+    own and keeps it for as long as the server-side cursor is being drained.
+    """
+
+    def body() -> Iterator[bytes]:
+        with session_factory() as db:
+            yield from encode_rows(rows(db), encode, media_type)
+
+    return StreamingResponse(body(), media_type=media_type)
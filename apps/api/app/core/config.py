@@ -15,8 +15,49 @@ class Settings(BaseSettings):
     mysql_user: str = "guidelkv2_user"
     mysql_password: str = "change_me"
     firebase_project_id: str = "guidelk-d1393"
+    firebase_certs_url: str = (
+        "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+    )
+    firebase_token_cache_size: int = 10_000
+    user_cache_size: int = 10_000
+    user_cache_ttl_seconds: float = 300.0
+    last_login_interval_seconds: float = 300.0
+    last_login_flush_seconds: float = 30.0
     environment: Literal["development", "production", "test"] = "development"
     sqlalchemy_database_uri: str | None = None
+    database_async: bool = False
+    async_database_uri: str | None = None
+    response_cache_backend: Literal["memory", "redis", "none"] = "memory"
+    response_cache_ttl_seconds: float = 300.0
+    response_cache_max_entries: int = 2048
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    redis_url: str | None = None
+    # Booking.com exports are only downloaded from these hosts (or their subdomains) over these
+    # schemes, and never from loopback, private or link-local addresses unless allowed here.
+    booking_export_hosts: list[str] = ["booking.com"]
+    booking_export_schemes: list[str] = ["https"]
+    booking_export_private_addresses: bool = False
+    # The spatial and text indexes live in each worker process and only see that process's
+    # writes; every this many seconds a read compares a table stamp and reloads them if another
+    # worker changed the table.
+    index_stamp_interval_seconds: float = 1.0
+    spatial_index_enabled: bool = True
+    spatial_index_cell_size: float = 0.05
+    # Off: search goes to the database (FULLTEXT on MySQL) instead of the in-process index.
+    # Unset: off on MySQL, whose FULLTEXT indexes need no per-worker copy; on elsewhere.
+    text_index_enabled: bool | None = None
+    # Sync tokens lag the database clock by this much, so rows stamped by a transaction still
+    # open when the token was issued are delivered on the next sync (possibly twice).
+    sync_token_margin_seconds: float = 600.0
+    distance_cache_capacity: int = 1024
+    # Saved at shutdown and loaded by the next process; empty disables persistence.
+    distance_cache_path: str | None = "var/distance_cache.npz"
+    # Per-request SQL profiling: Server-Timing header, one log line, repeated-statement warnings.
+    sql_instrumentation_enabled: bool = False
+    sql_repeat_threshold: int = 10
+    sql_slowest_statements: int = 3
+    # Prometheus /metrics: request, threadpool, connection pool, statement and cache metrics.
+    metrics_enabled: bool = True
 
     @property
     def database_url(self) -> str:
@@ -27,6 +68,26 @@ class Settings(BaseSettings):
             f"{self.mysql_port}/{self.mysql_db}?charset=utf8mb4"
         )
 
+    @property
+    def use_text_index(self) -> bool:
+        if self.text_index_enabled is not None:
+            return self.text_index_enabled
+        return not self.database_url.startswith("mysql")
+
+    @property
+    def async_database_url(self) -> str:
+        if self.async_database_uri:
+            return self.async_database_uri
+        url = self.database_url
+        for sync_prefix, async_prefix in (
+            ("mysql+mysqldb://", "mysql+aiomysql://"),
+            ("sqlite+pysqlite://", "sqlite+aiosqlite://"),
+            ("sqlite://", "sqlite+aiosqlite://"),
+        ):
+            if url.startswith(sync_prefix):
+                return async_prefix + url[len(sync_prefix) :]
+        return url
+
 
 @lru_cache
 def get_settings() -> Settings:
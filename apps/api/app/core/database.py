@@ -1,15 +1,48 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import Session, sessionmaker
 
 from .config import get_settings
+from .metrics import TimedAsyncQueuePool, TimedQueuePool
 
 settings = get_settings()
 
-engine = create_engine(settings.database_url, pool_pre_ping=True, future=True)
+
+def _pool_options(url: str, timed_pool: type) -> dict[str, type]:
+    # SQLite picks a pool to suit the database file; server databases get a queue pool that
+    # times checkouts for /metrics.
+    if not settings.metrics_enabled or make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {"poolclass": timed_pool}
+
+
+engine = create_engine(
+    settings.database_url,
+    pool_pre_ping=True,
+    future=True,
+    **_pool_options(settings.database_url, TimedQueuePool),
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# Optional async engine serving the read routes in DATABASE_ASYNC mode. Writes keep using the
+# sync engine above.
+async_engine: AsyncEngine | None = None
+AsyncSessionLocal: async_sessionmaker[AsyncSession] | None = None
+if settings.database_async:
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        pool_pre_ping=True,
+        **_pool_options(settings.async_database_url, TimedAsyncQueuePool),
+    )
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -17,3 +50,10 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database access requires DATABASE_ASYNC=true")
+    async with AsyncSessionLocal() as db:
+        yield db
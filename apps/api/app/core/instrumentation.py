@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Expanded IN lists ("IN (?, ?, ?)") render differently per length but are one statement shape.
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(\?|%s|%\(\w+\)s)(\s*,\s*(\?|%s|%\(\w+\)s))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+@dataclass(slots=True)
+class QueryProfile:
+    """Statements one request sent to the database and the time they took."""
+
+    keep_slowest: int = 3
+    statements: int = 0
+    duration_ms: float = 0.0
+    shapes: Counter[str] = field(default_factory=Counter)
+    shape_ms: Counter[str] = field(default_factory=Counter)
+    # Min-heap of (ms, statement), so the fastest of the kept statements is replaced first.
+    slowest: list[tuple[float, str]] = field(default_factory=list)
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        shape = statement_shape(statement)
+        self.statements += 1
+        self.duration_ms += elapsed_ms
+        self.shapes[shape] += 1
+        self.shape_ms[shape] += elapsed_ms
+        if len(self.slowest) < self.keep_slowest:
+            heapq.heappush(self.slowest, (elapsed_ms, shape))
+        elif elapsed_ms > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (elapsed_ms, shape))
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Shapes issued more than ``threshold`` times: the signature of an N+1 pattern."""
+        return {shape: count for shape, count in self.shapes.items() if count > threshold}
+
+    def summary(self, threshold: int) -> dict[str, Any]:
+        return {
+            "statements": self.statements,
+            "db_ms": round(self.duration_ms, 2),
+            "slowest": [
+                {"ms": round(ms, 2), "statement": shape}
+                for ms, shape in sorted(self.slowest, reverse=True)
+            ],
+            "repeated": [
+                {"count": count, "ms": round(self.shape_ms[shape], 2), "statement": shape}
+                for shape, count in self.repeated(threshold).items()
+            ],
+        }
+
+
+current_profile: ContextVar[QueryProfile | None] = ContextVar("current_profile", default=None)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record every statement ``engine`` executes into the current request's profile."""
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None and current_profile.get() is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    profile = current_profile.get()
+    started = getattr(context, "_profile_started", None)
+    if profile is not None and started is not None:
+        profile.record(statement, (time.perf_counter() - started) * 1000)
+
+
+class SQLProfileMiddleware:
+    """Profiles the SQL of each request: a ``Server-Timing`` header plus one log line.
+
+    Statements of a streamed body run after the headers are sent, so only the log line
+    covers them.
+    """
+
+    def __init__(self, app: ASGIApp, repeat_threshold: int = 10, keep_slowest: int = 3) -> None:
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+        self.keep_slowest = keep_slowest
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = QueryProfile(self.keep_slowest)
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={profile.duration_ms:.2f};desc="{profile.statements} statements", '
+                    f"app;dur={total_ms:.2f}",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+            self._log(scope, profile, (time.perf_counter() - started) * 1000)
+
+    def _log(self, scope: Scope, profile: QueryProfile, total_ms: float) -> None:
+        summary = profile.summary(self.repeat_threshold)
+        summary.update(method=scope["method"], path=scope["path"], total_ms=round(total_ms, 2))
+        level = logging.WARNING if summary["repeated"] else logging.INFO
+        logger.log(
+            level,
+            "sql %s %s statements=%d db_ms=%.2f total_ms=%.2f%s",
+            scope["method"],
+            scope["path"],
+            profile.statements,
+            profile.duration_ms,
+            total_ms,
+            " possible N+1" if summary["repeated"] else "",
+            extra={"sql_profile": summary},
+        )
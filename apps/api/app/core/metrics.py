@@ -0,0 +1,420 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Mapping, Sequence
+
+from anyio import CapacityLimiter, to_thread
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DB_OPERATIONS = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE"))
+
+# (labels, value) pairs produced by a callback metric at scrape time.
+Samples = Iterable[tuple[Mapping[str, str], float]]
+
+
+class _Shards:
+    """Per-thread slot arrays summed at scrape time.
+
+    Each thread only ever writes its own list, so recording needs no lock; the lock is taken
+    once per thread, when its list is created, and by the scrape that copies the list of lists.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._local = threading.local()
+        self._shards: list[list[float]] = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> list[float]:
+        try:
+            return self._local.slots
+        except AttributeError:
+            slots = self._local.slots = [0.0] * self.size
+            with self._lock:
+                self._shards.append(slots)
+            return slots
+
+    def totals(self) -> list[float]:
+        with self._lock:
+            shards = list(self._shards)
+        return [math.fsum(column) for column in zip(*shards)] if shards else [0.0] * self.size
+
+
+class _Value:
+    def __init__(self) -> None:
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._shards.mine()[0] += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._shards.mine()[0] -= amount
+
+    def samples(self, name: str, labels: dict[str, str]) -> list[tuple[str, dict[str, str], float]]:
+        return [(name, labels, self._shards.totals()[0])]
+
+
+class _Buckets:
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        # One slot per bound, one for +Inf and a trailing running sum.
+        self._shards = _Shards(len(bounds) + 2)
+
+    def observe(self, value: float) -> None:
+        slots = self._shards.mine()
+        slots[bisect_left(self.bounds, value)] += 1
+        slots[-1] += value
+
+    def samples(self, name: str, labels: dict[str, str]) -> list[tuple[str, dict[str, str], float]]:
+        totals = self._shards.totals()
+        samples = []
+        cumulative = 0.0
+        for bound, count in zip((*self.bounds, math.inf), totals):
+            cumulative += count
+            samples.append((f"{name}_bucket", {**labels, "le": _number(bound)}, cumulative))
+        samples.append((f"{name}_sum", labels, totals[-1]))
+        samples.append((f"{name}_count", labels, cumulative))
+        return samples
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], _Value | _Buckets] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        samples = []
+        for values, child in list(self._children.items()):
+            samples.extend(child.samples(self.name, dict(zip(self.labelnames, values))))
+        return samples
+
+    def _child(self) -> _Value | _Buckets:
+        return _Value()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _child(self) -> _Buckets:
+        return _Buckets(self.buckets)
+
+
+class Callback(_Metric):
+    """A gauge or counter whose samples are read from ``collect`` at scrape time."""
+
+    def __init__(
+        self, name: str, documentation: str, kind: str, collect: Callable[[], Samples]
+    ) -> None:
+        super().__init__(name, documentation)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        return [(self.name, dict(labels), value) for labels, value in self._collect()]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self, name: str, documentation: str, collect: Callable[[], Samples], kind: str = "gauge"
+    ) -> Callback:
+        return self.register(Callback(name, documentation, kind, collect))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation, help_text=True)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    rendered = ",".join(
+                        f'{key}="{_escape(str(item))}"' for key, item in labels.items()
+                    )
+                    lines.append(f"{name}{{{rendered}}} {_number(value)}")
+                else:
+                    lines.append(f"{name} {_number(value)}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+def _escape(text: str, help_text: bool = False) -> str:
+    text = text.replace("\\", "\\\\").replace("\n", "\\n")
+    return text if help_text else text.replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total",
+    "HTTP requests by route template and status.",
+    ("method", "route", "status"),
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    ("method", "route"),
+)
+http_in_flight = registry.gauge("http_requests_in_flight", "HTTP requests currently being served.")
+db_statement_duration = registry.histogram(
+    "db_statement_duration_seconds",
+    "Time the database driver spent executing a statement.",
+    ("engine", "operation"),
+    DB_BUCKETS,
+)
+db_pool_wait = registry.histogram(
+    "db_pool_wait_seconds",
+    "Time to obtain a connection from the pool, including opening a new one.",
+    ("engine",),
+    DB_BUCKETS,
+)
+
+_engines: dict[str, Engine] = {}
+_engine_labels: dict[Engine, str] = {}
+_caches: dict[str, Callable[[], Mapping[str, float] | None]] = {}
+
+
+def track_engine(engine: Engine, name: str) -> None:
+    """Time the statements ``engine`` executes and export its pool occupancy as ``name``."""
+    _engines[name] = engine
+    _engine_labels[engine] = name
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    operation = statement.lstrip()[:6].upper()
+    if operation not in DB_OPERATIONS:
+        operation = "OTHER"
+    db_statement_duration.labels(_engine_labels.get(conn.engine, "unknown"), operation).observe(
+        time.perf_counter() - started
+    )
+
+
+def register_cache(name: str, stats: Callable[[], Mapping[str, float] | None]) -> None:
+    """Export the ``hits`` and ``misses`` of ``stats()`` (``None`` when disabled) as ``name``."""
+    _caches[name] = stats
+
+
+class TimedQueuePool(QueuePool):
+    engine_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait.labels(self.engine_label).observe(time.perf_counter() - started)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait.labels(self.engine_label).observe(time.perf_counter() - started)
+
+
+def _pool_samples(read: Callable[[QueuePool], float]) -> Callable[[], Samples]:
+    def collect() -> Samples:
+        # The pool is looked up on every scrape because Engine.dispose() replaces it.
+        for name, engine in list(_engines.items()):
+            if isinstance(engine.pool, QueuePool):
+                yield {"engine": name}, read(engine.pool)
+
+    return collect
+
+
+def _cache_samples(field: str) -> Callable[[], Samples]:
+    def collect() -> Samples:
+        for name, stats in list(_caches.items()):
+            values = stats()
+            if values is None:
+                continue
+            if field == "ratio":
+                lookups = values["hits"] + values["misses"]
+                yield {"cache": name}, values["hits"] / lookups if lookups else 0.0
+            else:
+                yield {"cache": name}, values[field]
+
+    return collect
+
+
+def _threadpool_samples(read: Callable[[CapacityLimiter], float]) -> Callable[[], Samples]:
+    def collect() -> Samples:
+        # The limiter lives in the event loop, so it is only readable from a scrape there.
+        try:
+            limiter = to_thread.current_default_thread_limiter()
+        except RuntimeError:
+            return
+        yield {}, read(limiter)
+
+    return collect
+
+
+registry.callback(
+    "threadpool_tokens", "Worker threads available to sync handlers.",
+    _threadpool_samples(lambda limiter: limiter.total_tokens),
+)
+registry.callback(
+    "threadpool_borrowed_tokens", "Worker threads currently running sync handlers.",
+    _threadpool_samples(lambda limiter: limiter.borrowed_tokens),
+)
+registry.callback(
+    "threadpool_tasks_waiting", "Sync handlers queued for a free worker thread.",
+    _threadpool_samples(lambda limiter: limiter.statistics().tasks_waiting),
+)
+registry.callback("db_pool_size", "Configured pool size.", _pool_samples(lambda pool: pool.size()))
+registry.callback(
+    "db_pool_checked_out",
+    "Connections currently checked out.",
+    _pool_samples(lambda pool: pool.checkedout()),
+)
+registry.callback(
+    "db_pool_overflow",
+    "Connections open beyond the pool size.",
+    _pool_samples(lambda pool: pool.overflow()),
+)
+registry.callback(
+    "cache_hits_total", "Cache lookups that found an entry.", _cache_samples("hits"), "counter"
+)
+registry.callback(
+    "cache_misses_total", "Cache lookups that found nothing.", _cache_samples("misses"), "counter"
+)
+registry.callback(
+    "cache_hit_ratio", "Hits over lookups since the cache was cleared.", _cache_samples("ratio")
+)
+
+
+class MetricsMiddleware:
+    """Counts and times requests by route template, never by raw path."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec()
+            # The router stores the matched route in the scope; unmatched paths share one label.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_requests.labels(scope["method"], route, str(status)).inc()
+            elapsed = time.perf_counter() - started
+            http_request_duration.labels(scope["method"], route).observe(elapsed)
+
+
+async def metrics_endpoint() -> Response:
+    # Async so the scrape runs on the event loop, where the threadpool limiter is readable.
+    return Response(registry.render(), media_type=CONTENT_TYPE)
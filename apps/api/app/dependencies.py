@@ -1,16 +1,41 @@
 from __future__ import annotations
 
+from datetime import timedelta
+
 from fastapi import Depends, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .core.database import get_db
-from .models import User
+from .core.config import get_settings
+from .core.database import SessionLocal, get_async_db, get_db
 from .models.enums import TripStopStatus
-from .repositories.poi import PointOfInterestRepository
-from .repositories.property import PartnerPropertyRepository
-from .repositories.trip import TripRepository
+from .repositories.poi import AsyncPointOfInterestRepository, PointOfInterestRepository
+from .repositories.property import (
+    AsyncPartnerPropertyRepository,
+    PartnerPropertyRepository,
+)
+from .repositories.sync import SyncRepository
+from .repositories.trip import AsyncTripRepository, TripRepository
+from .services.distance_cache import distance_cache
 from .services.firebase import firebase_verifier
-from .services.users import UserService
+from .services.index_guard import poi_guard, property_guard
+from .services.response_cache import response_cache
+from .services.spatial_index import (
+    poi_index,
+    property_index,
+    published_poi_index,
+    published_property_index,
+)
+from .services.text_index import (
+    poi_suggest_index,
+    poi_text_index,
+    property_suggest_index,
+    property_text_index,
+)
+from .services.users import UserService, UserSnapshot, last_logins, user_cache
+
+settings = get_settings()
 
 
 def get_db_session() -> Session:
@@ -18,35 +43,102 @@ def get_db_session() -> Session:
 
 
 def get_poi_repository(db: Session = Depends(get_db_session)) -> PointOfInterestRepository:
-    return PointOfInterestRepository(db)
+    index = poi_index if settings.spatial_index_enabled else None
+    published_index = published_poi_index if settings.spatial_index_enabled else None
+    text_index = poi_text_index if settings.use_text_index else None
+    return PointOfInterestRepository(
+        db, index, response_cache, text_index, poi_suggest_index, published_index, poi_guard
+    )
 
 
 def get_property_repository(db: Session = Depends(get_db_session)) -> PartnerPropertyRepository:
-    return PartnerPropertyRepository(db)
+    index = property_index if settings.spatial_index_enabled else None
+    published_index = published_property_index if settings.spatial_index_enabled else None
+    text_index = property_text_index if settings.use_text_index else None
+    return PartnerPropertyRepository(
+        db,
+        index,
+        response_cache,
+        text_index,
+        property_suggest_index,
+        published_index,
+        property_guard,
+    )
 
 
 def get_trip_repository(db: Session = Depends(get_db_session)) -> TripRepository:
-    return TripRepository(db)
+    return TripRepository(db, distance_cache)
+
+
+def get_sync_repository(db: Session = Depends(get_db_session)) -> SyncRepository:
+    return SyncRepository(db, timedelta(seconds=settings.sync_token_margin_seconds))
+
+
+async def get_async_db_session() -> AsyncSession:
+    async for db in get_async_db():
+        yield db
+
+
+def get_async_poi_repository(
+    db: AsyncSession = Depends(get_async_db_session),
+) -> AsyncPointOfInterestRepository:
+    index = poi_index if settings.spatial_index_enabled else None
+    return AsyncPointOfInterestRepository(db, index, response_cache, poi_guard)
+
+
+def get_async_property_repository(
+    db: AsyncSession = Depends(get_async_db_session),
+) -> AsyncPartnerPropertyRepository:
+    index = property_index if settings.spatial_index_enabled else None
+    return AsyncPartnerPropertyRepository(db, index, response_cache, property_guard)
+
+
+def get_async_trip_repository(db: AsyncSession = Depends(get_async_db_session)) -> AsyncTripRepository:
+    return AsyncTripRepository(db)
 
 
 def get_current_user(
     authorization: str | None = Header(default=None),
     db: Session = Depends(get_db_session),
-) -> User:
-    if not authorization or not authorization.lower().startswith("bearer "):
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
-    raw_token = authorization.split(" ", maxsplit=1)[1]
+) -> UserSnapshot:
+    raw_token = _bearer_token(authorization)
     try:
         decoded = firebase_verifier.verify(raw_token)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc)) from exc
 
-    user = UserService(db).get_or_create(
+    return UserService(db, user_cache, last_logins).current(
         firebase_uid=decoded["uid"],
         email=decoded.get("email"),
         full_name=decoded.get("name"),
     )
-    return user
+
+
+async def get_async_current_user(
+    authorization: str | None = Header(default=None),
+) -> UserSnapshot:
+    """``get_current_user`` for the async routes.
+
+    A cached token of a cached user resolves on the event loop; verifying a new token, a
+    first login or a due last-login flush block, so those take the sync path in a thread.
+    """
+    decoded = firebase_verifier.tokens.get(_bearer_token(authorization))
+    snapshot = user_cache.get(decoded["uid"]) if decoded is not None else None
+    if snapshot is None or last_logins.due():
+        return await run_in_threadpool(_current_user_in_thread, authorization)
+    last_logins.touch(snapshot.id)
+    return snapshot
+
+
+def _current_user_in_thread(authorization: str | None) -> UserSnapshot:
+    with SessionLocal() as db:
+        return get_current_user(authorization, db)
+
+
+def _bearer_token(authorization: str | None) -> str:
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing token")
+    return authorization.split(" ", maxsplit=1)[1]
 
 
 def parse_stop_status(status_value: str) -> TripStopStatus:
@@ -1,12 +1,35 @@
 from __future__ import annotations
 
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .api.routes import auth, imports, pois, properties, trips
+from .api.routes import (
+    async_reads,
+    auth,
+    imports,
+    pois,
+    properties,
+    search,
+    sync,
+    trips,
+)
 from .core.config import get_settings
-from .core.database import engine
+from .core.database import SessionLocal, async_engine, engine
+from .core.instrumentation import SQLProfileMiddleware, instrument_engine
+from .core.metrics import (
+    MetricsMiddleware,
+    metrics_endpoint,
+    register_cache,
+    track_engine,
+)
 from .models import Base
+from .repositories.trip import TripRepository
+from .services.distance_cache import distance_cache
+from .services.firebase import firebase_verifier
+from .services.response_cache import response_cache
+from .services.users import last_logins, user_cache
 
 settings = get_settings()
 
@@ -25,6 +48,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.sql_instrumentation_enabled:
+    instrument_engine(engine)
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine)
+    app.add_middleware(
+        SQLProfileMiddleware,
+        repeat_threshold=settings.sql_repeat_threshold,
+        keep_slowest=settings.sql_slowest_statements,
+    )
+
+if settings.metrics_enabled:
+    track_engine(engine, "sync")
+    if async_engine is not None:
+        track_engine(async_engine.sync_engine, "async")
+    register_cache("response", lambda: response_cache and response_cache.stats())
+    register_cache("distance", distance_cache.stats)
+    register_cache("user", user_cache.stats)
+    register_cache("firebase_token", firebase_verifier.tokens.stats)
+    # Added last, so it is the outermost middleware and times everything beneath it.
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, tags=["system"], include_in_schema=False)
+
 
 @app.on_event("startup")
 def create_tables() -> None:
@@ -33,13 +78,55 @@ def create_tables() -> None:
     Base.metadata.create_all(bind=engine)
 
 
+@app.on_event("startup")
+def warm_distance_cache() -> None:
+    if settings.environment == "test":
+        return
+    # Seeding groups every trip stop, so it runs beside the first requests, not inside them.
+    threading.Thread(target=_seed_distance_cache, name="distance-cache-warm", daemon=True).start()
+
+
+def _seed_distance_cache() -> None:
+    with SessionLocal() as db:
+        distance_cache.warm(TripRepository(db).distance_seed)
+
+
+@app.on_event("shutdown")
+def flush_last_logins() -> None:
+    with SessionLocal() as db:
+        last_logins.flush(db)
+
+
+@app.on_event("shutdown")
+def save_distance_cache() -> None:
+    distance_cache.save()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine() -> None:
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+if settings.database_async:
+    # Starlette matches the first route, so the async read handlers take over their paths.
+    app.include_router(async_reads.router)
 app.include_router(auth.router)
 app.include_router(pois.router)
 app.include_router(properties.router)
 app.include_router(trips.router)
 app.include_router(imports.router)
+app.include_router(sync.router)
+app.include_router(search.router)
 
 
 @app.get("/health", tags=["system"])
 def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@app.get("/health/cache", tags=["system"])
+def cache_stats() -> dict[str, object]:
+    if response_cache is None:
+        return {"backend": "none"}
+    return response_cache.stats()
@@ -2,6 +2,7 @@ from .base import Base
 from .booking import Booking
 from .poi import PointOfInterest
 from .property import PartnerProperty
+from .tombstone import Tombstone
 from .trip import Trip, TripStop
 from .user import User
 
@@ -10,6 +11,7 @@ __all__ = [
     "Booking",
     "PointOfInterest",
     "PartnerProperty",
+    "Tombstone",
     "Trip",
     "TripStop",
     "User",
@@ -1,8 +1,19 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, func
+from sqlalchemy import DateTime, Integer, func, literal_column
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
+# SQLite fills server defaults with CURRENT_TIMESTAMP, which has no fractional seconds. Bind
+# parameters use the same format so comparisons against stored timestamps (keyset cursors)
+# agree, matching MySQL DATETIME's whole-second precision.
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
 
 class Base(DeclarativeBase):
     pass
@@ -10,8 +21,13 @@ class Base(DeclarativeBase):
 
 class TimestampMixin:
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        Timestamp, server_default=func.now(), nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+        Timestamp, server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+    # Bumped by every UPDATE, ORM or Core, so HTTP validators tell apart edits made within the
+    # same second, which updated_at cannot.
+    revision: Mapped[int] = mapped_column(
+        Integer, default=1, server_default="1", onupdate=literal_column("revision") + 1, nullable=False
     )
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Boolean, JSON, String
+from sqlalchemy import Boolean, Index, JSON, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base, TimestampMixin
@@ -9,9 +9,15 @@ from .spatial import SpatialPointMixin
 
 class PartnerProperty(Base, TimestampMixin, SpatialPointMixin):
     __tablename__ = "properties"
+    __table_args__ = (
+        Index("ix_properties_updated_at", "updated_at"),
+        Index("ft_properties_search", "name", "address", mysql_prefix="FULLTEXT").ddl_if(
+            dialect="mysql"
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    name: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
     address: Mapped[str | None] = mapped_column(String(512))
     phone: Mapped[str | None] = mapped_column(String(64))
     website: Mapped[str | None] = mapped_column(String(255))
@@ -2,18 +2,56 @@ from __future__ import annotations
 
 from typing import Any
 
-from sqlalchemy import func
+from sqlalchemy import ColumnElement, and_, func
 from sqlalchemy.dialects.mysql import DOUBLE, GEOMETRY
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class wgs84_point(FunctionElement):
+    """SRID 4326 point built from ``(longitude, latitude)``, rendered per dialect."""
+
+    name = "wgs84_point"
+    inherit_cache = True
+
+
+@compiles(wgs84_point)
+def _compile_wgs84_point(element: wgs84_point, compiler: Any, **kw: Any) -> str:
+    # Backends without spatial functions (the SQLite test database) keep the WKT text.
+    longitude, latitude = (compiler.process(arg, **kw) for arg in element.clauses)
+    return f"('POINT(' || {longitude} || ' ' || {latitude} || ')')"
+
+
+@compiles(wgs84_point, "mysql")
+def _compile_wgs84_point_mysql(element: wgs84_point, compiler: Any, **kw: Any) -> str:
+    return f"ST_SRID(ST_Point({compiler.process(element.clauses, **kw)}), 4326)"
 
 
 class SpatialPointMixin:
+    # Never serialised, so it is only read when explicitly requested.
     geom: Mapped[Any] = mapped_column(
-        GEOMETRY(geometry_type="POINT", srid=4326), nullable=False, comment="WGS84 point"
+        GEOMETRY(geometry_type="POINT", srid=4326),
+        nullable=False,
+        deferred=True,
+        comment="WGS84 point",
     )
     latitude: Mapped[float] = mapped_column(DOUBLE(asdecimal=False), nullable=False)
     longitude: Mapped[float] = mapped_column(DOUBLE(asdecimal=False), nullable=False)
 
     @staticmethod
     def build_point(longitude: float, latitude: float) -> Any:
-        return func.ST_SRID(func.ST_Point(longitude, latitude), 4326)
+        return wgs84_point(longitude, latitude)
+
+    @classmethod
+    def within_bbox(
+        cls, bbox: tuple[float, float, float, float], dialect_name: str
+    ) -> ColumnElement[bool]:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        if dialect_name == "mysql":
+            envelope = func.ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326)
+            return func.ST_Within(cls.geom, envelope)
+        return and_(
+            cls.longitude.between(min_lon, max_lon),
+            cls.latitude.between(min_lat, max_lat),
+        )
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Index, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, Timestamp
+
+
+class Tombstone(Base):
+    """A deleted row, kept so offline clients learn about the delete on their next sync."""
+
+    __tablename__ = "tombstones"
+    __table_args__ = (Index("ix_tombstones_deleted_at", "deleted_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    entity: Mapped[str] = mapped_column(String(32), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Owner of a deleted trip or stop; catalogue deletions have none and reach every client.
+    user_id: Mapped[int | None] = mapped_column(Integer)
+    deleted_at: Mapped[datetime] = mapped_column(Timestamp, server_default=func.now(), nullable=False)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import date
 
-from sqlalchemy import CheckConstraint, Enum, ForeignKey, Integer, String
+from sqlalchemy import CheckConstraint, Enum, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, TimestampMixin
@@ -11,6 +11,10 @@ from .enums import TripStatus, TripStopKind, TripStopStatus
 
 class Trip(Base, TimestampMixin):
     __tablename__ = "trips"
+    __table_args__ = (
+        Index("ix_trips_user_created", "user_id", "created_at", "id"),
+        Index("ix_trips_user_updated", "user_id", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -21,13 +25,14 @@ class Trip(Base, TimestampMixin):
 
     user: Mapped["User"] = relationship(back_populates="trips")
     stops: Mapped[list["TripStop"]] = relationship(
-        back_populates="trip", cascade="all, delete-orphan", order_by="TripStop.sort"
+        back_populates="trip", cascade="all, delete-orphan", order_by="[TripStop.sort, TripStop.id]"
     )
 
 
 class TripStop(Base, TimestampMixin):
     __tablename__ = "trip_stops"
     __table_args__ = (
+        Index("ix_trip_stops_trip_updated", "trip_id", "updated_at"),
         CheckConstraint("kind in ('poi','stay')", name="trip_stop_kind_valid"),
         CheckConstraint(
             "status in ('planned','visited','skipped')",
@@ -1,32 +1,273 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
-from typing import Optional
+from collections.abc import Callable, Iterator, Sequence
+from datetime import datetime
+from typing import Any
 
-from sqlalchemy import Select, func, select
+from sqlalchemy import ColumnElement, Row, Select, bindparam, case, func, insert, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..models.poi import PointOfInterest
 from ..models.spatial import SpatialPointMixin
+from ..models.trip import TripStop
 from ..schemas.poi import POICreate, POIUpdate
+from ..services.index_guard import IndexGuard
+from ..services.response_cache import ResponseCache
+from ..services.spatial_index import (
+    BBox,
+    Cluster,
+    GridIndex,
+    bbox_around,
+    cluster_bounds,
+    cluster_points,
+    rank_nearest,
+)
+from ..services.text_index import NameRow, PrefixIndex, TextIndex, TextRow, tokenize
+from .pagination import Keyset
+from .sync import bury
 
 
 class PointOfInterestRepository:
-    def __init__(self, db: Session):
+    # Above this many matches an IN list is slower than the plain coordinate range filter.
+    INDEX_ID_LIMIT = 5000
+    keyset = Keyset(PointOfInterest.name, PointOfInterest.id)
+    CACHE_NAMESPACE = "pois"
+    # Columns a client may request through sparse fieldsets; geom is never serialised.
+    FIELDS = (
+        "id",
+        "name",
+        "category",
+        "description",
+        "photos",
+        "latitude",
+        "longitude",
+        "is_published",
+        "created_at",
+        "updated_at",
+    )
+
+    def __init__(
+        self,
+        db: Session,
+        index: GridIndex | None = None,
+        cache: ResponseCache | None = None,
+        text_index: TextIndex | None = None,
+        suggest_index: PrefixIndex | None = None,
+        published_index: GridIndex | None = None,
+        guard: IndexGuard | None = None,
+        load_indexes: bool = True,
+    ):
         self.db = db
+        self.index = index
+        self.cache = cache
+        self.text_index = text_index
+        self.suggest_index = suggest_index
+        # Published rows only, unlike ``index``: what nearby, clusters and facets see.
+        self.published_index = published_index
+        self.guard = guard
+        # Off when the session cannot run queries itself: only already loaded indexes are used.
+        self.load_indexes = load_indexes
 
     def query(self) -> Select[tuple[PointOfInterest]]:
         return select(PointOfInterest)
 
-    def list(self, bbox: Optional[tuple[float, float, float, float]] = None) -> Sequence[PointOfInterest]:
+    def list(self, bbox: BBox | None = None) -> Sequence[PointOfInterest]:
         stmt = self.query()
         if bbox:
-            min_lon, min_lat, max_lon, max_lat = bbox
-            envelope = func.ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326)
-            stmt = stmt.where(func.ST_Within(PointOfInterest.geom, envelope))
+            stmt = stmt.where(self._bbox_clause(bbox))
         stmt = stmt.order_by(PointOfInterest.name)
         return self.db.scalars(stmt).all()
 
+    def page(
+        self,
+        bbox: BBox | None = None,
+        cursor: str | None = None,
+        limit: int = 100,
+        fields: Sequence[str] | None = None,
+    ) -> tuple[list[PointOfInterest] | list[dict[str, Any]], str | None]:
+        stmt = self.page_statement(bbox, cursor, limit, fields)
+        if not fields:
+            return self.keyset.split(self.db.scalars(stmt).all(), limit)
+        rows, next_cursor = self.keyset.split(self.db.execute(stmt).all(), limit)
+        return [self._project(row, fields) for row in rows], next_cursor
+
+    def page_statement(
+        self,
+        bbox: BBox | None,
+        cursor: str | None,
+        limit: int,
+        fields: Sequence[str] | None,
+    ) -> Select:
+        stmt = self._select(fields)
+        if bbox:
+            stmt = stmt.where(self._bbox_clause(bbox))
+        return self.keyset.apply(stmt, cursor, limit)
+
+    def version(self, bbox: BBox | None = None) -> tuple[datetime | None, int, int | None, int | None]:
+        return tuple(self.db.execute(self.version_statement(bbox)).one())
+
+    def version_statement(
+        self, bbox: BBox | None = None
+    ) -> Select[tuple[datetime | None, int, int | None, int | None]]:
+        # Every update bumps a revision; inserts and deletes move the count or the newest id.
+        stmt = select(
+            func.max(PointOfInterest.updated_at),
+            func.count(PointOfInterest.id),
+            func.max(PointOfInterest.id),
+            func.sum(PointOfInterest.revision),
+        )
+        if bbox:
+            stmt = stmt.where(self._bbox_clause(bbox))
+        return stmt
+
+    @staticmethod
+    def stamp_statement() -> Select[tuple[int, int | None, int | None]]:
+        # What IndexGuard compares: every insert, update and delete moves one of these.
+        return select(
+            func.count(PointOfInterest.id),
+            func.max(PointOfInterest.id),
+            func.sum(PointOfInterest.revision),
+        )
+
+    def row_version(self, poi_id: int) -> tuple[datetime, int] | None:
+        row = self.db.execute(self.row_version_statement(poi_id)).one_or_none()
+        return tuple(row) if row else None
+
+    @staticmethod
+    def row_version_statement(poi_id: int) -> Select[tuple[datetime, int]]:
+        stmt = select(PointOfInterest.updated_at, PointOfInterest.revision)
+        return stmt.where(PointOfInterest.id == poi_id)
+
+    def stream(
+        self,
+        bbox: BBox | None = None,
+        fields: Sequence[str] | None = None,
+        chunk_size: int = 500,
+    ) -> Iterator[PointOfInterest] | Iterator[dict[str, Any]]:
+        stmt = self._select(fields)
+        if bbox:
+            stmt = stmt.where(self._bbox_clause(bbox))
+        stmt = stmt.order_by(PointOfInterest.name, PointOfInterest.id)
+        stmt = stmt.execution_options(yield_per=chunk_size)
+        # yield_per fetches through a server-side cursor, so only one chunk is in memory.
+        if not fields:
+            yield from self.db.scalars(stmt)
+            return
+        for row in self.db.execute(stmt):
+            yield self._project(row, fields)
+
+    def nearby(
+        self,
+        longitude: float,
+        latitude: float,
+        radius_m: float,
+        k: int,
+        category: str | None = None,
+    ) -> list[tuple[PointOfInterest, float]]:
+        if self.published_index is not None:
+            self._ready(self.published_index, self._published_rows)
+            ranked = self.published_index.nearest(longitude, latitude, radius_m, k, tag=category)
+        else:
+            stmt = select(
+                PointOfInterest.id, PointOfInterest.longitude, PointOfInterest.latitude
+            ).where(
+                PointOfInterest.is_published.is_(True),
+                self._bbox_clause(bbox_around(longitude, latitude, radius_m)),
+            )
+            if category is not None:
+                stmt = stmt.where(PointOfInterest.category == category)
+            rows = self.db.execute(stmt).all()
+            ranked = rank_nearest(
+                [row[0] for row in rows],
+                [row[1] for row in rows],
+                [row[2] for row in rows],
+                longitude,
+                latitude,
+                radius_m,
+                k,
+            )
+        if not ranked:
+            return []
+        stmt = self.query().where(PointOfInterest.id.in_([row_id for row_id, _ in ranked]))
+        pois = {poi.id: poi for poi in self.db.scalars(stmt)}
+        return [(pois[row_id], distance) for row_id, distance in ranked if row_id in pois]
+
+    def clusters(self, bbox: BBox, zoom: int) -> list[Cluster]:
+        if self.published_index is not None:
+            self._ready(self.published_index, self._published_rows)
+            return self.published_index.clusters(bbox, zoom)
+        stmt = select(
+            PointOfInterest.longitude, PointOfInterest.latitude, PointOfInterest.category
+        ).where(
+            PointOfInterest.is_published.is_(True),
+            self._bbox_clause(cluster_bounds(bbox, zoom)),
+        )
+        return cluster_points(self.db.execute(stmt).all(), bbox, zoom)
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        bbox: BBox | None = None,
+        category: str | None = None,
+    ) -> list[tuple[PointOfInterest, float]]:
+        """Published rows matching ``query`` over name, category and description, with relevance."""
+        if self.text_index is not None:
+            self._ready(self.text_index, self._text_rows)
+            allowed = self._bbox_ids(bbox) if bbox else None
+            ranked = self.text_index.search(query, limit, category, allowed)
+        else:
+            columns = (PointOfInterest.name, PointOfInterest.category, PointOfInterest.description)
+            if self.db.get_bind().dialect.name == "mysql":
+                # Served by the ft_pois_search FULLTEXT index.
+                score = match(*columns, against=query)
+                stmt = select(PointOfInterest.id, score).where(score)
+            else:
+                terms = tokenize(query)
+                if not terms:
+                    return []
+                # One point per term found in each column, so rows matching more rank higher.
+                score = sum(
+                    case((column.ilike(f"%{term}%"), 1), else_=0)
+                    for term in terms
+                    for column in columns
+                )
+                stmt = select(PointOfInterest.id, score).where(score > 0)
+            stmt = stmt.where(PointOfInterest.is_published.is_(True))
+            if bbox:
+                stmt = stmt.where(self._bbox_clause(bbox))
+            if category is not None:
+                stmt = stmt.where(PointOfInterest.category == category)
+            ranked = self.db.execute(stmt.order_by(score.desc(), PointOfInterest.id).limit(limit)).all()
+        if not ranked:
+            return []
+        stmt = self.query().where(PointOfInterest.id.in_([row_id for row_id, _ in ranked]))
+        pois = {poi.id: poi for poi in self.db.scalars(stmt)}
+        return [(pois[row_id], float(score)) for row_id, score in ranked if row_id in pois]
+
+    def suggest(self, prefix: str, limit: int) -> list[NameRow]:
+        """Published POIs whose name has a word starting with ``prefix``, most popular first."""
+        if self.suggest_index is None:
+            return []
+        self._ready(self.suggest_index, self._name_rows)
+        return self.suggest_index.suggest(prefix, limit)
+
+    def facets(self, bbox: BBox | None = None) -> dict[str, int]:
+        """Published POIs per category, within ``bbox`` when given."""
+        if self.published_index is not None:
+            self._ready(self.published_index, self._published_rows)
+            return self.published_index.facets(bbox)
+        stmt = (
+            select(PointOfInterest.category, func.count())
+            .where(PointOfInterest.is_published.is_(True))
+            .group_by(PointOfInterest.category)
+        )
+        if bbox:
+            stmt = stmt.where(self._bbox_clause(bbox))
+        return {category: count for category, count in self.db.execute(stmt)}
+
     def get(self, poi_id: int) -> PointOfInterest | None:
         return self.db.get(PointOfInterest, poi_id)
 
@@ -44,9 +285,61 @@ class PointOfInterestRepository:
         self.db.add(poi)
         self.db.commit()
         self.db.refresh(poi)
+        if self.guard is not None:
+            self.guard.record(rows=1, revisions=poi.revision, created=poi.id)
+        if self.index is not None:
+            self.index.upsert(poi.id, poi.longitude, poi.latitude, poi.category)
+        if self.text_index is not None:
+            self._index_text(poi)
+        if self.suggest_index is not None:
+            self._index_name(poi)
+        if self.published_index is not None:
+            self._index_published(poi)
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_NAMESPACE)
         return poi
 
+    def bulk_create(self, payloads: Sequence[POICreate]) -> int:
+        # A single executemany INSERT; the database builds each point from the row's own binds.
+        stmt = insert(PointOfInterest.__table__).values(
+            geom=SpatialPointMixin.build_point(bindparam("geom_longitude"), bindparam("geom_latitude"))
+        )
+        rows = [
+            {
+                "name": payload.name,
+                "category": payload.category,
+                "description": payload.description,
+                "photos": list(payload.photos),
+                "is_published": payload.is_published,
+                "latitude": payload.latitude,
+                "longitude": payload.longitude,
+                "geom_longitude": payload.longitude,
+                "geom_latitude": payload.latitude,
+            }
+            for payload in payloads
+        ]
+        if not rows:
+            return 0
+        self.db.execute(stmt, rows)
+        self.db.commit()
+        if self.guard is not None:
+            # The new ids are unknown, so the next read checks the stamp and reloads once.
+            self.guard.reset()
+        if self.index is not None:
+            # New ids are not returned by executemany; the index reloads on its next query.
+            self.index.invalidate()
+        if self.text_index is not None:
+            self.text_index.invalidate()
+        if self.suggest_index is not None:
+            self.suggest_index.invalidate()
+        if self.published_index is not None:
+            self.published_index.invalidate()
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_NAMESPACE)
+        return len(rows)
+
     def update(self, poi: PointOfInterest, payload: POIUpdate) -> PointOfInterest:
+        revision = poi.revision
         if payload.name is not None:
             poi.name = payload.name
         if payload.category is not None:
@@ -64,8 +357,201 @@ class PointOfInterestRepository:
         self.db.add(poi)
         self.db.commit()
         self.db.refresh(poi)
+        if self.guard is not None:
+            self.guard.record(revisions=poi.revision - revision)
+        if self.index is not None:
+            self.index.upsert(poi.id, poi.longitude, poi.latitude, poi.category)
+        if self.text_index is not None:
+            self._index_text(poi)
+        if self.suggest_index is not None:
+            self._index_name(poi)
+        if self.published_index is not None:
+            self._index_published(poi)
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_NAMESPACE, poi.id)
         return poi
 
     def delete(self, poi: PointOfInterest) -> None:
+        poi_id, revision = poi.id, poi.revision
+        bury(self.db, "pois", [poi_id])
         self.db.delete(poi)
         self.db.commit()
+        if self.guard is not None:
+            self.guard.record(rows=-1, revisions=-revision, removed=poi_id)
+        if self.index is not None:
+            self.index.remove(poi_id)
+        if self.text_index is not None:
+            self.text_index.remove(poi_id)
+        if self.suggest_index is not None:
+            self.suggest_index.remove(poi_id)
+        if self.published_index is not None:
+            self.published_index.remove(poi_id)
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_NAMESPACE, poi_id)
+
+    def _select(self, fields: Sequence[str] | None) -> Select:
+        if not fields:
+            return self.query()
+        # Keyset columns ride along so the cursor can be built even if they were not requested.
+        names = dict.fromkeys([*fields, "name", "id"])
+        return select(*(getattr(PointOfInterest, name) for name in names))
+
+    @staticmethod
+    def _project(row: Row, fields: Sequence[str]) -> dict[str, Any]:
+        mapping = row._mapping
+        return {field: mapping[field] for field in fields}
+
+    def _bbox_clause(self, bbox: BBox) -> ColumnElement[bool]:
+        if self.index is not None and self._ready(self.index, self._index_rows):
+            ids = self.index.query(bbox)
+            if len(ids) <= self.INDEX_ID_LIMIT:
+                return PointOfInterest.id.in_(ids)
+        return PointOfInterest.within_bbox(bbox, self.db.get_bind().dialect.name)
+
+    def index_statement(self) -> Select[tuple[int, float, float, str]]:
+        return select(
+            PointOfInterest.id,
+            PointOfInterest.longitude,
+            PointOfInterest.latitude,
+            PointOfInterest.category,
+        )
+
+    def _index_rows(self) -> list[tuple[int, float, float, str]]:
+        return [tuple(row) for row in self.db.execute(self.index_statement())]
+
+    def _ready(
+        self, index: GridIndex | TextIndex | PrefixIndex, loader: Callable[[], list]
+    ) -> bool:
+        """Whether ``index`` can answer, loading (and reloading once stale) when allowed."""
+        if not self.load_indexes:
+            return index.populated
+        if self.guard is not None:
+            self.guard.check(lambda: self.db.execute(self.stamp_statement()).one())
+        index.ensure_loaded(loader)
+        return True
+
+    def _bbox_ids(self, bbox: BBox) -> set[int]:
+        if self.index is not None:
+            self._ready(self.index, self._index_rows)
+            return set(self.index.query(bbox))
+        clause = PointOfInterest.within_bbox(bbox, self.db.get_bind().dialect.name)
+        return set(self.db.scalars(select(PointOfInterest.id).where(clause)))
+
+    def _index_name(self, poi: PointOfInterest) -> None:
+        if poi.is_published:
+            self.suggest_index.upsert(poi.id, poi.name)
+        else:
+            self.suggest_index.remove(poi.id)
+
+    def _index_published(self, poi: PointOfInterest) -> None:
+        if poi.is_published:
+            self.published_index.upsert(poi.id, poi.longitude, poi.latitude, poi.category)
+        else:
+            self.published_index.remove(poi.id)
+
+    def _index_text(self, poi: PointOfInterest) -> None:
+        if poi.is_published:
+            self.text_index.upsert(poi.id, self._texts(poi), poi.category)
+        else:
+            self.text_index.remove(poi.id)
+
+    def _published_rows(self) -> list[tuple[int, float, float, str]]:
+        stmt = self.index_statement().where(PointOfInterest.is_published.is_(True))
+        return [tuple(row) for row in self.db.execute(stmt)]
+
+    def _name_rows(self) -> list[NameRow]:
+        # Popularity is the number of trip stops visiting the POI.
+        visits = (
+            select(TripStop.poi_id, func.count().label("visits"))
+            .where(TripStop.poi_id.is_not(None))
+            .group_by(TripStop.poi_id)
+            .subquery()
+        )
+        stmt = (
+            select(PointOfInterest.id, PointOfInterest.name, func.coalesce(visits.c.visits, 0))
+            .outerjoin(visits, visits.c.poi_id == PointOfInterest.id)
+            .where(PointOfInterest.is_published.is_(True))
+        )
+        return [tuple(row) for row in self.db.execute(stmt)]
+
+    @staticmethod
+    def _texts(poi: PointOfInterest) -> tuple[str | None, ...]:
+        return poi.name, poi.category, poi.description
+
+    def _text_rows(self) -> list[TextRow]:
+        stmt = select(
+            PointOfInterest.id,
+            PointOfInterest.name,
+            PointOfInterest.category,
+            PointOfInterest.description,
+        ).where(PointOfInterest.is_published.is_(True))
+        return [
+            (row_id, (name, category, description), category)
+            for row_id, name, category, description in self.db.execute(stmt)
+        ]
+
+
+class AsyncPointOfInterestRepository:
+    """Read paths of PointOfInterestRepository on an ``AsyncSession``."""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        index: GridIndex | None = None,
+        cache: ResponseCache | None = None,
+        guard: IndexGuard | None = None,
+    ):
+        self.db = db
+        self.index = index
+        self.cache = cache
+        self.guard = guard
+        # Statement building is shared with the sync repository; it only reads the dialect
+        # from the session and never executes through it, so it must not load indexes. The
+        # index is loaded here with an awaited query; if it went stale meanwhile the bbox
+        # filter falls back to SQL for that request.
+        self._statements = PointOfInterestRepository(
+            db.sync_session, index, load_indexes=False
+        )
+
+    async def page(
+        self,
+        bbox: BBox | None = None,
+        cursor: str | None = None,
+        limit: int = 100,
+        fields: Sequence[str] | None = None,
+    ) -> tuple[list[PointOfInterest] | list[dict[str, Any]], str | None]:
+        if bbox:
+            await self._load_index()
+        stmt = self._statements.page_statement(bbox, cursor, limit, fields)
+        keyset = self._statements.keyset
+        if not fields:
+            return keyset.split((await self.db.scalars(stmt)).all(), limit)
+        rows, next_cursor = keyset.split((await self.db.execute(stmt)).all(), limit)
+        return [PointOfInterestRepository._project(row, fields) for row in rows], next_cursor
+
+    async def version(
+        self, bbox: BBox | None = None
+    ) -> tuple[datetime | None, int, int | None, int | None]:
+        if bbox:
+            await self._load_index()
+        return tuple((await self.db.execute(self._statements.version_statement(bbox))).one())
+
+    async def row_version(self, poi_id: int) -> tuple[datetime, int] | None:
+        stmt = self._statements.row_version_statement(poi_id)
+        row = (await self.db.execute(stmt)).one_or_none()
+        return tuple(row) if row else None
+
+    async def get(self, poi_id: int) -> PointOfInterest | None:
+        return await self.db.get(PointOfInterest, poi_id)
+
+    async def _load_index(self) -> None:
+        if self.index is None:
+            return
+        if self.guard is not None and self.guard.due():
+            stamp = (await self.db.execute(self._statements.stamp_statement())).one()
+            self.guard.observe(stamp)
+        await self.index.ensure_loaded_async(self._index_rows)
+
+    async def _index_rows(self) -> list[tuple]:
+        rows = (await self.db.execute(self._statements.index_statement())).all()
+        return [tuple(row) for row in rows]
@@ -1,32 +1,227 @@
 from __future__ import annotations
 
-from collections.abc import Sequence
-from typing import Optional
+from collections.abc import Callable, Iterator, Sequence
+from datetime import datetime
+from typing import Any
 
-from sqlalchemy import Select, func, select
+from sqlalchemy import ColumnElement, Row, Select, bindparam, case, func, insert, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..models.property import PartnerProperty
 from ..models.spatial import SpatialPointMixin
+from ..models.trip import TripStop
 from ..schemas.property import PropertyCreate, PropertyUpdate
+from ..services.index_guard import IndexGuard
+from ..services.response_cache import ResponseCache
+from ..services.spatial_index import BBox, GridIndex, bbox_around, rank_nearest
+from ..services.text_index import NameRow, PrefixIndex, TextIndex, TextRow, tokenize
+from .pagination import Keyset
+from .sync import bury
 
 
 class PartnerPropertyRepository:
-    def __init__(self, db: Session):
+    # Above this many matches an IN list is slower than the plain coordinate range filter.
+    INDEX_ID_LIMIT = 5000
+    keyset = Keyset(PartnerProperty.name, PartnerProperty.id)
+    CACHE_NAMESPACE = "properties"
+    # Columns a client may request through sparse fieldsets; geom is never serialised.
+    FIELDS = (
+        "id",
+        "name",
+        "address",
+        "phone",
+        "website",
+        "photos",
+        "latitude",
+        "longitude",
+        "is_published",
+        "created_at",
+        "updated_at",
+    )
+
+    def __init__(
+        self,
+        db: Session,
+        index: GridIndex | None = None,
+        cache: ResponseCache | None = None,
+        text_index: TextIndex | None = None,
+        suggest_index: PrefixIndex | None = None,
+        published_index: GridIndex | None = None,
+        guard: IndexGuard | None = None,
+        load_indexes: bool = True,
+    ):
         self.db = db
+        self.index = index
+        self.cache = cache
+        self.text_index = text_index
+        self.suggest_index = suggest_index
+        # Published rows only, unlike ``index``: what nearby sees.
+        self.published_index = published_index
+        self.guard = guard
+        # Off when the session cannot run queries itself: only already loaded indexes are used.
+        self.load_indexes = load_indexes
 
     def query(self) -> Select[tuple[PartnerProperty]]:
         return select(PartnerProperty)
 
-    def list(self, bbox: Optional[tuple[float, float, float, float]] = None) -> Sequence[PartnerProperty]:
+    def list(self, bbox: BBox | None = None) -> Sequence[PartnerProperty]:
         stmt = self.query()
         if bbox:
-            min_lon, min_lat, max_lon, max_lat = bbox
-            envelope = func.ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326)
-            stmt = stmt.where(func.ST_Within(PartnerProperty.geom, envelope))
+            stmt = stmt.where(self._bbox_clause(bbox))
         stmt = stmt.order_by(PartnerProperty.name)
         return self.db.scalars(stmt).all()
 
+    def page(
+        self,
+        bbox: BBox | None = None,
+        cursor: str | None = None,
+        limit: int = 100,
+        fields: Sequence[str] | None = None,
+    ) -> tuple[list[PartnerProperty] | list[dict[str, Any]], str | None]:
+        stmt = self.page_statement(bbox, cursor, limit, fields)
+        if not fields:
+            return self.keyset.split(self.db.scalars(stmt).all(), limit)
+        rows, next_cursor = self.keyset.split(self.db.execute(stmt).all(), limit)
+        return [self._project(row, fields) for row in rows], next_cursor
+
+    def page_statement(
+        self,
+        bbox: BBox | None,
+        cursor: str | None,
+        limit: int,
+        fields: Sequence[str] | None,
+    ) -> Select:
+        stmt = self._select(fields)
+        if bbox:
+            stmt = stmt.where(self._bbox_clause(bbox))
+        return self.keyset.apply(stmt, cursor, limit)
+
+    def version(self, bbox: BBox | None = None) -> tuple[datetime | None, int, int | None, int | None]:
+        return tuple(self.db.execute(self.version_statement(bbox)).one())
+
+    def version_statement(
+        self, bbox: BBox | None = None
+    ) -> Select[tuple[datetime | None, int, int | None, int | None]]:
+        # Every update bumps a revision; inserts and deletes move the count or the newest id.
+        stmt = select(
+            func.max(PartnerProperty.updated_at),
+            func.count(PartnerProperty.id),
+            func.max(PartnerProperty.id),
+            func.sum(PartnerProperty.revision),
+        )
+        if bbox:
+            stmt = stmt.where(self._bbox_clause(bbox))
+        return stmt
+
+    @staticmethod
+    def stamp_statement() -> Select[tuple[int, int | None, int | None]]:
+        # What IndexGuard compares: every insert, update and delete moves one of these.
+        return select(
+            func.count(PartnerProperty.id),
+            func.max(PartnerProperty.id),
+            func.sum(PartnerProperty.revision),
+        )
+
+    def row_version(self, property_id: int) -> tuple[datetime, int] | None:
+        row = self.db.execute(self.row_version_statement(property_id)).one_or_none()
+        return tuple(row) if row else None
+
+    @staticmethod
+    def row_version_statement(property_id: int) -> Select[tuple[datetime, int]]:
+        stmt = select(PartnerProperty.updated_at, PartnerProperty.revision)
+        return stmt.where(PartnerProperty.id == property_id)
+
+    def stream(
+        self,
+        bbox: BBox | None = None,
+        fields: Sequence[str] | None = None,
+        chunk_size: int = 500,
+    ) -> Iterator[PartnerProperty] | Iterator[dict[str, Any]]:
+        stmt = self._select(fields)
+        if bbox:
+            stmt = stmt.where(self._bbox_clause(bbox))
+        stmt = stmt.order_by(PartnerProperty.name, PartnerProperty.id)
+        stmt = stmt.execution_options(yield_per=chunk_size)
+        # yield_per fetches through a server-side cursor, so only one chunk is in memory.
+        if not fields:
+            yield from self.db.scalars(stmt)
+            return
+        for row in self.db.execute(stmt):
+            yield self._project(row, fields)
+
+    def nearby(
+        self, longitude: float, latitude: float, radius_m: float, k: int
+    ) -> list[tuple[PartnerProperty, float]]:
+        if self.published_index is not None:
+            self._ready(self.published_index, self._published_rows)
+            ranked = self.published_index.nearest(longitude, latitude, radius_m, k)
+        else:
+            stmt = select(
+                PartnerProperty.id, PartnerProperty.longitude, PartnerProperty.latitude
+            ).where(
+                PartnerProperty.is_published.is_(True),
+                self._bbox_clause(bbox_around(longitude, latitude, radius_m)),
+            )
+            rows = self.db.execute(stmt).all()
+            ranked = rank_nearest(
+                [row[0] for row in rows],
+                [row[1] for row in rows],
+                [row[2] for row in rows],
+                longitude,
+                latitude,
+                radius_m,
+                k,
+            )
+        if not ranked:
+            return []
+        stmt = self.query().where(PartnerProperty.id.in_([row_id for row_id, _ in ranked]))
+        props = {prop.id: prop for prop in self.db.scalars(stmt)}
+        return [(props[row_id], distance) for row_id, distance in ranked if row_id in props]
+
+    def search(
+        self, query: str, limit: int, bbox: BBox | None = None
+    ) -> list[tuple[PartnerProperty, float]]:
+        """Published rows matching ``query`` over name and address, with relevance."""
+        if self.text_index is not None:
+            self._ready(self.text_index, self._text_rows)
+            allowed = self._bbox_ids(bbox) if bbox else None
+            ranked = self.text_index.search(query, limit, allowed=allowed)
+        else:
+            columns = (PartnerProperty.name, PartnerProperty.address)
+            if self.db.get_bind().dialect.name == "mysql":
+                # Served by the ft_properties_search FULLTEXT index.
+                score = match(*columns, against=query)
+                stmt = select(PartnerProperty.id, score).where(score)
+            else:
+                terms = tokenize(query)
+                if not terms:
+                    return []
+                # One point per term found in each column, so rows matching more rank higher.
+                score = sum(
+                    case((column.ilike(f"%{term}%"), 1), else_=0)
+                    for term in terms
+                    for column in columns
+                )
+                stmt = select(PartnerProperty.id, score).where(score > 0)
+            stmt = stmt.where(PartnerProperty.is_published.is_(True))
+            if bbox:
+                stmt = stmt.where(self._bbox_clause(bbox))
+            ranked = self.db.execute(stmt.order_by(score.desc(), PartnerProperty.id).limit(limit)).all()
+        if not ranked:
+            return []
+        stmt = self.query().where(PartnerProperty.id.in_([row_id for row_id, _ in ranked]))
+        props = {prop.id: prop for prop in self.db.scalars(stmt)}
+        return [(props[row_id], float(score)) for row_id, score in ranked if row_id in props]
+
+    def suggest(self, prefix: str, limit: int) -> list[NameRow]:
+        """Published properties whose name has a word starting with ``prefix``, most popular first."""
+        if self.suggest_index is None:
+            return []
+        self._ready(self.suggest_index, self._name_rows)
+        return self.suggest_index.suggest(prefix, limit)
+
     def get(self, property_id: int) -> PartnerProperty | None:
         return self.db.get(PartnerProperty, property_id)
 
@@ -45,9 +240,62 @@ class PartnerPropertyRepository:
         self.db.add(prop)
         self.db.commit()
         self.db.refresh(prop)
+        if self.guard is not None:
+            self.guard.record(rows=1, revisions=prop.revision, created=prop.id)
+        if self.index is not None:
+            self.index.upsert(prop.id, prop.longitude, prop.latitude)
+        if self.text_index is not None:
+            self._index_text(prop)
+        if self.suggest_index is not None:
+            self._index_name(prop)
+        if self.published_index is not None:
+            self._index_published(prop)
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_NAMESPACE)
         return prop
 
+    def bulk_create(self, payloads: Sequence[PropertyCreate]) -> int:
+        # A single executemany INSERT; the database builds each point from the row's own binds.
+        stmt = insert(PartnerProperty.__table__).values(
+            geom=SpatialPointMixin.build_point(bindparam("geom_longitude"), bindparam("geom_latitude"))
+        )
+        rows = [
+            {
+                "name": payload.name,
+                "address": payload.address,
+                "phone": payload.phone,
+                "website": payload.website,
+                "photos": list(payload.photos),
+                "is_published": payload.is_published,
+                "latitude": payload.latitude,
+                "longitude": payload.longitude,
+                "geom_longitude": payload.longitude,
+                "geom_latitude": payload.latitude,
+            }
+            for payload in payloads
+        ]
+        if not rows:
+            return 0
+        self.db.execute(stmt, rows)
+        self.db.commit()
+        if self.guard is not None:
+            # The new ids are unknown, so the next read checks the stamp and reloads once.
+            self.guard.reset()
+        if self.index is not None:
+            # New ids are not returned by executemany; the index reloads on its next query.
+            self.index.invalidate()
+        if self.text_index is not None:
+            self.text_index.invalidate()
+        if self.suggest_index is not None:
+            self.suggest_index.invalidate()
+        if self.published_index is not None:
+            self.published_index.invalidate()
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_NAMESPACE)
+        return len(rows)
+
     def update(self, prop: PartnerProperty, payload: PropertyUpdate) -> PartnerProperty:
+        revision = prop.revision
         if payload.name is not None:
             prop.name = payload.name
         if payload.address is not None:
@@ -67,8 +315,199 @@ class PartnerPropertyRepository:
         self.db.add(prop)
         self.db.commit()
         self.db.refresh(prop)
+        if self.guard is not None:
+            self.guard.record(revisions=prop.revision - revision)
+        if self.index is not None:
+            self.index.upsert(prop.id, prop.longitude, prop.latitude)
+        if self.text_index is not None:
+            self._index_text(prop)
+        if self.suggest_index is not None:
+            self._index_name(prop)
+        if self.published_index is not None:
+            self._index_published(prop)
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_NAMESPACE, prop.id)
         return prop
 
     def delete(self, prop: PartnerProperty) -> None:
+        prop_id, revision = prop.id, prop.revision
+        bury(self.db, "properties", [prop_id])
         self.db.delete(prop)
         self.db.commit()
+        if self.guard is not None:
+            self.guard.record(rows=-1, revisions=-revision, removed=prop_id)
+        if self.index is not None:
+            self.index.remove(prop_id)
+        if self.text_index is not None:
+            self.text_index.remove(prop_id)
+        if self.suggest_index is not None:
+            self.suggest_index.remove(prop_id)
+        if self.published_index is not None:
+            self.published_index.remove(prop_id)
+        if self.cache is not None:
+            self.cache.invalidate(self.CACHE_NAMESPACE, prop_id)
+
+    def _select(self, fields: Sequence[str] | None) -> Select:
+        if not fields:
+            return self.query()
+        # Keyset columns ride along so the cursor can be built even if they were not requested.
+        names = dict.fromkeys([*fields, "name", "id"])
+        return select(*(getattr(PartnerProperty, name) for name in names))
+
+    @staticmethod
+    def _project(row: Row, fields: Sequence[str]) -> dict[str, Any]:
+        mapping = row._mapping
+        return {field: mapping[field] for field in fields}
+
+    def _bbox_clause(self, bbox: BBox) -> ColumnElement[bool]:
+        if self.index is not None and self._ready(self.index, self._index_rows):
+            ids = self.index.query(bbox)
+            if len(ids) <= self.INDEX_ID_LIMIT:
+                return PartnerProperty.id.in_(ids)
+        return PartnerProperty.within_bbox(bbox, self.db.get_bind().dialect.name)
+
+    def match_candidates(self) -> list[tuple[int, str, float, float]]:
+        stmt = select(
+            PartnerProperty.id,
+            PartnerProperty.name,
+            PartnerProperty.longitude,
+            PartnerProperty.latitude,
+        )
+        return [tuple(row) for row in self.db.execute(stmt)]
+
+    def index_statement(self) -> Select[tuple[int, float, float]]:
+        return select(PartnerProperty.id, PartnerProperty.longitude, PartnerProperty.latitude)
+
+    def _index_rows(self) -> list[tuple[int, float, float]]:
+        return [tuple(row) for row in self.db.execute(self.index_statement())]
+
+    def _ready(
+        self, index: GridIndex | TextIndex | PrefixIndex, loader: Callable[[], list]
+    ) -> bool:
+        """Whether ``index`` can answer, loading (and reloading once stale) when allowed."""
+        if not self.load_indexes:
+            return index.populated
+        if self.guard is not None:
+            self.guard.check(lambda: self.db.execute(self.stamp_statement()).one())
+        index.ensure_loaded(loader)
+        return True
+
+    def _bbox_ids(self, bbox: BBox) -> set[int]:
+        if self.index is not None:
+            self._ready(self.index, self._index_rows)
+            return set(self.index.query(bbox))
+        clause = PartnerProperty.within_bbox(bbox, self.db.get_bind().dialect.name)
+        return set(self.db.scalars(select(PartnerProperty.id).where(clause)))
+
+    def _index_name(self, prop: PartnerProperty) -> None:
+        if prop.is_published:
+            self.suggest_index.upsert(prop.id, prop.name)
+        else:
+            self.suggest_index.remove(prop.id)
+
+    def _index_published(self, prop: PartnerProperty) -> None:
+        if prop.is_published:
+            self.published_index.upsert(prop.id, prop.longitude, prop.latitude)
+        else:
+            self.published_index.remove(prop.id)
+
+    def _index_text(self, prop: PartnerProperty) -> None:
+        if prop.is_published:
+            self.text_index.upsert(prop.id, self._texts(prop))
+        else:
+            self.text_index.remove(prop.id)
+
+    def _published_rows(self) -> list[tuple[int, float, float]]:
+        stmt = self.index_statement().where(PartnerProperty.is_published.is_(True))
+        return [tuple(row) for row in self.db.execute(stmt)]
+
+    def _name_rows(self) -> list[NameRow]:
+        # Popularity is the number of trip stops staying at the property.
+        stays = (
+            select(TripStop.stay_id, func.count().label("stays"))
+            .where(TripStop.stay_id.is_not(None))
+            .group_by(TripStop.stay_id)
+            .subquery()
+        )
+        stmt = (
+            select(PartnerProperty.id, PartnerProperty.name, func.coalesce(stays.c.stays, 0))
+            .outerjoin(stays, stays.c.stay_id == PartnerProperty.id)
+            .where(PartnerProperty.is_published.is_(True))
+        )
+        return [tuple(row) for row in self.db.execute(stmt)]
+
+    @staticmethod
+    def _texts(prop: PartnerProperty) -> tuple[str | None, ...]:
+        return prop.name, prop.address
+
+    def _text_rows(self) -> list[TextRow]:
+        stmt = select(PartnerProperty.id, PartnerProperty.name, PartnerProperty.address).where(
+            PartnerProperty.is_published.is_(True)
+        )
+        return [(row_id, (name, address), None) for row_id, name, address in self.db.execute(stmt)]
+
+
+class AsyncPartnerPropertyRepository:
+    """Read paths of PartnerPropertyRepository on an ``AsyncSession``."""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        index: GridIndex | None = None,
+        cache: ResponseCache | None = None,
+        guard: IndexGuard | None = None,
+    ):
+        self.db = db
+        self.index = index
+        self.cache = cache
+        self.guard = guard
+        # Statement building is shared with the sync repository; it only reads the dialect
+        # from the session and never executes through it, so it must not load indexes. The
+        # index is loaded here with an awaited query; if it went stale meanwhile the bbox
+        # filter falls back to SQL for that request.
+        self._statements = PartnerPropertyRepository(
+            db.sync_session, index, load_indexes=False
+        )
+
+    async def page(
+        self,
+        bbox: BBox | None = None,
+        cursor: str | None = None,
+        limit: int = 100,
+        fields: Sequence[str] | None = None,
+    ) -> tuple[list[PartnerProperty] | list[dict[str, Any]], str | None]:
+        if bbox:
+            await self._load_index()
+        stmt = self._statements.page_statement(bbox, cursor, limit, fields)
+        keyset = self._statements.keyset
+        if not fields:
+            return keyset.split((await self.db.scalars(stmt)).all(), limit)
+        rows, next_cursor = keyset.split((await self.db.execute(stmt)).all(), limit)
+        return [PartnerPropertyRepository._project(row, fields) for row in rows], next_cursor
+
+    async def version(
+        self, bbox: BBox | None = None
+    ) -> tuple[datetime | None, int, int | None, int | None]:
+        if bbox:
+            await self._load_index()
+        return tuple((await self.db.execute(self._statements.version_statement(bbox))).one())
+
+    async def row_version(self, property_id: int) -> tuple[datetime, int] | None:
+        stmt = self._statements.row_version_statement(property_id)
+        row = (await self.db.execute(stmt)).one_or_none()
+        return tuple(row) if row else None
+
+    async def get(self, property_id: int) -> PartnerProperty | None:
+        return await self.db.get(PartnerProperty, property_id)
+
+    async def _load_index(self) -> None:
+        if self.index is None:
+            return
+        if self.guard is not None and self.guard.due():
+            stamp = (await self.db.execute(self._statements.stamp_statement())).one()
+            self.guard.observe(stamp)
+        await self.index.ensure_loaded_async(self._index_rows)
+
+    async def _index_rows(self) -> list[tuple]:
+        rows = (await self.db.execute(self._statements.index_statement())).all()
+        return [tuple(row) for row in rows]
@@ -1,33 +1,108 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+from collections.abc import Iterable, Sequence
 
-from sqlalchemy import Select, select
-from sqlalchemy.orm import Session
+import numpy as np
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    bindparam,
+    delete,
+    distinct,
+    func,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.interfaces import ORMOption
 
-from ..models import Booking, Trip, TripStop
-from ..models.enums import TripStopStatus
+from ..models import Booking, PartnerProperty, PointOfInterest, Trip, TripStop
+from ..models.enums import BookingSource, TripStopKind, TripStopStatus
 from ..schemas.trip import (
     BookingCreate,
     TripCreate,
+    TripStopChange,
     TripStopCreate,
     TripStopUpdate,
+    TripStopUpsert,
     TripUpdate,
 )
+from ..services.distance_cache import DistanceCache, Place, place_distances
+from ..services.route_optimizer import order_stops
+from .pagination import Keyset
+from .sync import bury
 
 
 class TripRepository:
-    def __init__(self, db: Session):
+    keyset = Keyset(Trip.created_at, Trip.id, descending=True)
+    STOP_FIELDS = ("kind", "poi_id", "stay_id", "day_index", "sort", "status")
+
+    def __init__(self, db: Session, distances: DistanceCache | None = None):
         self.db = db
+        self.distances = distances
 
     def query(self) -> Select[tuple[Trip]]:
         return select(Trip).order_by(Trip.created_at.desc())
 
-    def for_user(self, user_id: int) -> list[Trip]:
-        return self.db.scalars(self.query().where(Trip.user_id == user_id)).all()
+    def graph_options(self) -> tuple[ORMOption, ...]:
+        # Stops, their POIs and their stays each arrive in one SELECT ... IN batch, so a trip
+        # graph costs a fixed number of queries however many stops it has.
+        stops = selectinload(Trip.stops)
+        return (stops.selectinload(TripStop.poi), stops.selectinload(TripStop.stay))
+
+    def for_user(self, user_id: int, with_stops: bool = True) -> list[Trip]:
+        stmt = self.query().where(Trip.user_id == user_id)
+        if with_stops:
+            stmt = stmt.options(*self.graph_options())
+        return self.db.scalars(stmt).all()
+
+    def page_for_user(
+        self, user_id: int, cursor: str | None = None, limit: int = 50
+    ) -> tuple[list[Trip], str | None]:
+        rows = self.db.scalars(self.page_statement(user_id, cursor, limit)).all()
+        return self.keyset.split(rows, limit)
+
+    def page_statement(self, user_id: int, cursor: str | None, limit: int) -> Select[tuple[Trip]]:
+        stmt = select(Trip).where(Trip.user_id == user_id).options(*self.graph_options())
+        return self.keyset.apply(stmt, cursor, limit)
+
+    def get(self, trip_id: int, with_stops: bool = True) -> Trip | None:
+        options = self.graph_options() if with_stops else ()
+        return self.db.get(Trip, trip_id, options=options)
 
-    def get(self, trip_id: int) -> Trip | None:
-        return self.db.get(Trip, trip_id)
+    def version_for_user(self, user_id: int) -> tuple:
+        return tuple(self.db.execute(self.version_statement(Trip.user_id == user_id)).one())
+
+    def version_of(self, user_id: int, trip_id: int) -> tuple:
+        stmt = self.version_statement(Trip.user_id == user_id, Trip.id == trip_id)
+        return tuple(self.db.execute(stmt).one())
+
+    @staticmethod
+    def version_statement(*criteria: ColumnElement[bool]) -> Select:
+        """Newest timestamps, row counts and revision sums across everything a serialised
+        trip embeds."""
+        return (
+            select(
+                func.count(distinct(Trip.id)),
+                func.max(Trip.updated_at),
+                func.sum(Trip.revision),
+                func.count(TripStop.id),
+                func.max(TripStop.id),
+                func.max(TripStop.updated_at),
+                func.sum(TripStop.revision),
+                func.max(PointOfInterest.updated_at),
+                func.sum(PointOfInterest.revision),
+                func.max(PartnerProperty.updated_at),
+                func.sum(PartnerProperty.revision),
+            )
+            .select_from(Trip)
+            .outerjoin(TripStop, TripStop.trip_id == Trip.id)
+            .outerjoin(PointOfInterest, TripStop.poi_id == PointOfInterest.id)
+            .outerjoin(PartnerProperty, TripStop.stay_id == PartnerProperty.id)
+            .where(*criteria)
+        )
 
     def create(self, user_id: int, payload: TripCreate) -> Trip:
         trip = Trip(
@@ -42,8 +117,7 @@ class TripRepository:
         for index, stop in enumerate(payload.stops):
             trip.stops.append(self._build_stop(stop, index))
         self.db.commit()
-        self.db.refresh(trip)
-        return trip
+        return self._reload(trip)
 
     def update(self, trip: Trip, payload: TripUpdate) -> Trip:
         if payload.name is not None:
@@ -55,15 +129,15 @@ class TripRepository:
         if payload.status is not None:
             trip.status = payload.status
         if payload.stops is not None:
-            trip.stops.clear()
-            for index, stop in enumerate(payload.stops):
-                trip.stops.append(self._build_stop(stop, index))
+            self._sync_stops(trip, payload.stops)
         self.db.add(trip)
         self.db.commit()
-        self.db.refresh(trip)
-        return trip
+        return self._reload(trip)
 
     def delete(self, trip: Trip) -> None:
+        stop_ids = self.db.scalars(select(TripStop.id).where(TripStop.trip_id == trip.id))
+        bury(self.db, "trip_stops", stop_ids, trip.user_id)
+        bury(self.db, "trips", [trip.id], trip.user_id)
         self.db.delete(trip)
         self.db.commit()
 
@@ -100,8 +174,91 @@ class TripRepository:
         self.db.refresh(stop)
         return stop
 
+    def mark_user_stop_status(self, user_id: int, stop_id: int, status: TripStopStatus) -> TripStop | None:
+        """Update a stop owned by ``user_id`` by primary key without loading its trip."""
+        owned_trips = select(Trip.id).where(Trip.user_id == user_id)
+        result = self.db.execute(
+            update(TripStop)
+            .where(TripStop.id == stop_id, TripStop.trip_id.in_(owned_trips))
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            self.db.rollback()
+            return None
+        self.db.commit()
+        stmt = (
+            select(TripStop)
+            .where(TripStop.id == stop_id)
+            .options(joinedload(TripStop.poi), joinedload(TripStop.stay))
+            .execution_options(populate_existing=True)
+        )
+        return self.db.scalars(stmt).one()
 
-    def remove_stop(self, stop: TripStop) -> None:
+    def apply_stop_changes(
+        self, trip_id: int, changes: Sequence[TripStopChange]
+    ) -> tuple[list[str | None], dict[int, TripStop]]:
+        """Apply ``changes`` in order with one batched UPDATE and a single commit.
+
+        Returns an error (or None) per change and the touched stops after the write. A change
+        to a stop of another trip, or pointing at a missing POI or stay, is skipped on its own.
+        """
+        stop_ids = {change.stop_id for change in changes}
+        stops = {
+            stop.id: stop
+            for stop in self.db.scalars(
+                select(TripStop).where(TripStop.trip_id == trip_id, TripStop.id.in_(stop_ids))
+            )
+        }
+        known_pois = self._existing_ids(PointOfInterest, {change.poi_id for change in changes})
+        known_stays = self._existing_ids(PartnerProperty, {change.stay_id for change in changes})
+        errors: list[str | None] = []
+        pending: dict[int, dict] = {}
+        for change in changes:
+            if change.stop_id not in stops:
+                errors.append("Stop not found")
+            elif change.poi_id is not None and change.poi_id not in known_pois:
+                errors.append("POI not found")
+            elif change.stay_id is not None and change.stay_id not in known_stays:
+                errors.append("Stay not found")
+            else:
+                stop = stops[change.stop_id]
+                values = pending.setdefault(
+                    stop.id, {field: getattr(stop, field) for field in self.STOP_FIELDS}
+                )
+                values.update(
+                    (field, getattr(change, field))
+                    for field in self.STOP_FIELDS
+                    if getattr(change, field) is not None
+                )
+                errors.append(None)
+        self._update_stops(
+            [
+                (stop_id, values)
+                for stop_id, values in pending.items()
+                if any(getattr(stops[stop_id], field) != value for field, value in values.items())
+            ]
+        )
+        self.db.commit()
+        if not pending:
+            return errors, {}
+        stmt = (
+            select(TripStop)
+            .where(TripStop.id.in_(pending))
+            .options(selectinload(TripStop.poi), selectinload(TripStop.stay))
+            .execution_options(populate_existing=True)
+        )
+        return errors, {stop.id: stop for stop in self.db.scalars(stmt)}
+
+    def _existing_ids(self, model: type[PointOfInterest] | type[PartnerProperty], ids: set) -> set[int]:
+        ids.discard(None)
+        if not ids:
+            return set()
+        return set(self.db.scalars(select(model.id).where(model.id.in_(ids))))
+
+    def remove_stop(self, trip: Trip, stop: TripStop) -> None:
+        bury(self.db, "trip_stops", [stop.id], trip.user_id)
+        trip.stops.remove(stop)
         self.db.delete(stop)
         self.db.commit()
 
@@ -113,17 +270,126 @@ class TripRepository:
         trip.stops.sort(key=lambda stop: stop.sort)
         self.db.add(trip)
         self.db.commit()
-        self.db.refresh(trip)
-        return trip
+        return self._reload(trip)
+
+    def optimize_stops(self, trip: Trip) -> Trip:
+        """Reorder each day's stops for the shortest route, stays pinned as its ends."""
+        days: dict[int, list[TripStop]] = {}
+        for stop in trip.stops:
+            days.setdefault(stop.day_index, []).append(stop)
+        ordered: list[TripStop] = []
+        for day_index in sorted(days):
+            stops = days[day_index]
+            pinned = [stop.kind == TripStopKind.STAY for stop in stops]
+            ordered.extend(stops[index] for index in order_stops(self.stop_distances(stops), pinned))
+        for sort, stop in enumerate(ordered):
+            stop.sort = sort
+        self.db.commit()
+        return self._reload(trip)
+
+    def stop_distances(self, stops: Sequence[TripStop]) -> np.ndarray:
+        """Distances in metres between ``stops`` (with their POIs/stays loaded) in one batch."""
+        places: list[Place | None] = []
+        for stop in stops:
+            kind, place = ("stay", stop.stay) if stop.kind == TripStopKind.STAY else ("poi", stop.poi)
+            places.append((kind, place.id, place.longitude, place.latitude) if place else None)
+        if self.distances is None:
+            return place_distances(places)
+        self.distances.ensure_loaded()
+        return self.distances.lookup(places)
+
+    def distance_seed(self, limit: int) -> list[Place]:
+        """Catalogue points ordered by the number of trips they appear in, most shared first."""
+        rows = []
+        trips = func.count(distinct(TripStop.trip_id))
+        for kind, model, column in (
+            ("poi", PointOfInterest, TripStop.poi_id),
+            ("stay", PartnerProperty, TripStop.stay_id),
+        ):
+            stmt = (
+                select(trips, model.id, model.longitude, model.latitude)
+                .join(TripStop, column == model.id)
+                .group_by(model.id, model.longitude, model.latitude)
+                .order_by(trips.desc(), model.id)
+                .limit(limit)
+            )
+            rows.extend((count, (kind, *place)) for count, *place in self.db.execute(stmt))
+        rows.sort(key=lambda row: -row[0])
+        return [place for _, place in rows[:limit]]
+
+    def _reload(self, trip: Trip) -> Trip:
+        return self.db.get(Trip, trip.id, options=self.graph_options(), populate_existing=True)
 
     def _build_stop(self, payload: TripStopCreate, index: int) -> TripStop:
-        return TripStop(
-            kind=payload.kind,
-            poi_id=payload.poi_id,
-            stay_id=payload.stay_id,
-            day_index=payload.day_index,
-            sort=payload.sort if payload.sort else index,
-            status=payload.status,
+        return TripStop(**self._stop_values(payload, index))
+
+    def _stop_values(self, payload: TripStopCreate | TripStopUpsert, index: int) -> dict:
+        return {
+            "kind": payload.kind,
+            "poi_id": payload.poi_id,
+            "stay_id": payload.stay_id,
+            "day_index": payload.day_index,
+            "sort": payload.sort if payload.sort else index,
+            "status": payload.status,
+        }
+
+    def _sync_stops(self, trip: Trip, payloads: Sequence[TripStopUpsert]) -> None:
+        """Turn ``trip.stops`` into ``payloads`` with the fewest row writes.
+
+        Incoming stops match existing rows by id, otherwise by place (kind, POI, stay) in
+        order. Matched rows keep their id and created_at and are only written when a value
+        changed; the deletes, updates and inserts each go out as one batched statement.
+        """
+        existing = {stop.id: stop for stop in trip.stops}
+        matches: list[int | None] = [payload.id for payload in payloads]
+        ids = [stop_id for stop_id in matches if stop_id is not None]
+        claimed = set(ids)
+        if len(claimed) != len(ids) or not claimed <= existing.keys():
+            raise ValueError("Stop ids must be unique and belong to this trip")
+        by_place: dict[tuple, list[int]] = {}
+        for stop in trip.stops:
+            if stop.id not in claimed:
+                by_place.setdefault((stop.kind, stop.poi_id, stop.stay_id), []).append(stop.id)
+        wanted = [self._stop_values(payload, index) for index, payload in enumerate(payloads)]
+        for position, values in enumerate(wanted):
+            if matches[position] is None:
+                candidates = by_place.get((values["kind"], values["poi_id"], values["stay_id"]))
+                if candidates:
+                    matches[position] = candidates.pop(0)
+
+        inserts, updates = [], []
+        for stop_id, values in zip(matches, wanted):
+            if stop_id is None:
+                inserts.append({"trip_id": trip.id, **values})
+            elif any(getattr(existing[stop_id], field) != value for field, value in values.items()):
+                updates.append((stop_id, values))
+        removed = existing.keys() - set(matches)
+        if removed:
+            bury(self.db, "trip_stops", removed, trip.user_id)
+            self.db.execute(
+                delete(TripStop).where(TripStop.id.in_(removed)),
+                execution_options={"synchronize_session": False},
+            )
+        self._update_stops(updates)
+        if inserts:
+            self.db.execute(insert(TripStop), inserts)
+
+    def _update_stops(self, rows: Sequence[tuple[int, dict]]) -> None:
+        # One executemany UPDATE; every row carries all stop fields so they share a statement.
+        if not rows:
+            return
+        table = TripStop.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("stop_id"))
+            .values({field: bindparam(f"new_{field}") for field in self.STOP_FIELDS})
+        )
+        self.db.execute(
+            stmt,
+            [
+                {"stop_id": stop_id, **{f"new_{field}": values[field] for field in self.STOP_FIELDS}}
+                for stop_id, values in rows
+            ],
         )
 
     # Booking helpers -----------------------------------------------------
@@ -149,3 +415,57 @@ class TripRepository:
     def delete_booking(self, booking: Booking) -> None:
         self.db.delete(booking)
         self.db.commit()
+
+    def imported_booking_payloads(self, user_id: int) -> list[dict]:
+        stmt = (
+            select(Booking.raw_json)
+            .join(Trip, Booking.trip_id == Trip.id)
+            .where(Trip.user_id == user_id, Booking.source == BookingSource.BOOKING_IMPORT)
+        )
+        return [raw for raw in self.db.scalars(stmt) if raw]
+
+    def import_trip(self, user_id: int, name: str) -> int:
+        stmt = select(Trip.id).where(Trip.user_id == user_id, Trip.name == name).order_by(Trip.id)
+        trip_id = self.db.scalars(stmt).first()
+        if trip_id is not None:
+            return trip_id
+        trip = Trip(user_id=user_id, name=name)
+        self.db.add(trip)
+        self.db.commit()
+        return trip.id
+
+    def bulk_add_bookings(self, rows: Sequence[dict]) -> int:
+        if not rows:
+            return 0
+        self.db.execute(insert(Booking), rows)
+        self.db.commit()
+        return len(rows)
+
+
+class AsyncTripRepository:
+    """Read paths of TripRepository on an ``AsyncSession``."""
+
+    keyset = TripRepository.keyset
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._statements = TripRepository(db.sync_session)
+
+    async def page_for_user(
+        self, user_id: int, cursor: str | None = None, limit: int = 50
+    ) -> tuple[list[Trip], str | None]:
+        stmt = self._statements.page_statement(user_id, cursor, limit)
+        rows = (await self.db.scalars(stmt)).all()
+        return self.keyset.split(rows, limit)
+
+    async def version_for_user(self, user_id: int) -> tuple:
+        stmt = TripRepository.version_statement(Trip.user_id == user_id)
+        return tuple((await self.db.execute(stmt)).one())
+
+    async def version_of(self, user_id: int, trip_id: int) -> tuple:
+        stmt = TripRepository.version_statement(Trip.user_id == user_id, Trip.id == trip_id)
+        return tuple((await self.db.execute(stmt)).one())
+
+    async def get(self, trip_id: int, with_stops: bool = True) -> Trip | None:
+        options = self._statements.graph_options() if with_stops else ()
+        return await self.db.get(Trip, trip_id, options=options)
@@ -1,7 +1,10 @@
 from datetime import datetime
+from typing import Generic, TypeVar
 
 from pydantic import BaseModel
 
+T = TypeVar("T")
+
 
 class ORMModel(BaseModel):
     class Config:
@@ -12,3 +15,18 @@ class ORMModel(BaseModel):
 class TimestampedModel(ORMModel):
     created_at: datetime
     updated_at: datetime
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+
+
+class BulkRejection(BaseModel):
+    line: int
+    error: str
+
+
+class BulkResult(BaseModel):
+    inserted: int = 0
+    rejected: list[BulkRejection] = []
@@ -31,3 +31,19 @@ class POIUpdate(BaseModel):
 
 class POIRead(TimestampedModel, POIAttributes):
     id: int
+
+
+class POINearby(POIRead):
+    distance_m: float
+
+
+class POIFacets(BaseModel):
+    total: int
+    categories: dict[str, int]
+
+
+class POICluster(BaseModel):
+    latitude: float
+    longitude: float
+    count: int
+    categories: dict[str, int]
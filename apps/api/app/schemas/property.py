@@ -33,3 +33,7 @@ class PropertyUpdate(BaseModel):
 
 class PropertyRead(TimestampedModel, PropertyAttributes):
     id: int
+
+
+class PropertyNearby(PropertyRead):
+    distance_m: float
@@ -0,0 +1,20 @@
+from typing import Literal
+
+from pydantic import BaseModel
+
+from .poi import POIRead
+from .property import PropertyRead
+
+
+class SearchHit(BaseModel):
+    kind: Literal["poi", "property"]
+    score: float
+    poi: POIRead | None = None
+    property: PropertyRead | None = None
+
+
+class Suggestion(BaseModel):
+    kind: Literal["poi", "property"]
+    id: int
+    name: str
+    popularity: int
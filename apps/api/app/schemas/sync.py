@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from .base import ORMModel, TimestampedModel
+from .poi import POIRead
+from .property import PropertyRead
+from .trip import TripBase, TripStopBase
+
+
+class SyncTrip(TimestampedModel, TripBase):
+    id: int
+    user_id: int
+
+
+class SyncTripStop(TimestampedModel, TripStopBase):
+    id: int
+    trip_id: int
+
+
+class SyncDeletion(ORMModel):
+    entity: str
+    id: int
+    deleted_at: datetime
+
+
+class SyncChanges(BaseModel):
+    # Pass as ``since`` on the next sync.
+    token: str
+    pois: list[POIRead] = []
+    properties: list[PropertyRead] = []
+    trips: list[SyncTrip] = []
+    trip_stops: list[SyncTripStop] = []
+    # Apply before the upserts above; a row may be deleted and recreated between syncs.
+    deleted: list[SyncDeletion] = []
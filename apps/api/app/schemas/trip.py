@@ -24,6 +24,11 @@ class TripStopCreate(TripStopBase):
     pass
 
 
+class TripStopUpsert(TripStopBase):
+    # Id of an existing stop to keep; without one the stop is matched by place or inserted.
+    id: int | None = None
+
+
 class TripStopUpdate(BaseModel):
     kind: TripStopKind | None = None
     poi_id: int | None = None
@@ -39,6 +44,26 @@ class TripStopRead(TimestampedModel, TripStopBase):
     stay: PropertyRead | None = None
 
 
+class TripStopChange(TripStopUpdate):
+    stop_id: int
+
+
+class TripStopBatch(BaseModel):
+    # Applied in order; later changes to the same stop win field by field.
+    operations: list[TripStopChange] = Field(min_length=1, max_length=500)
+
+
+class TripStopChangeResult(BaseModel):
+    stop_id: int
+    ok: bool
+    detail: str | None = None
+    stop: TripStopRead | None = None
+
+
+class TripStopBatchResult(BaseModel):
+    results: list[TripStopChangeResult]
+
+
 class TripBase(BaseModel):
     name: str
     start_date: date | None = None
@@ -55,7 +80,7 @@ class TripUpdate(BaseModel):
     start_date: date | None = None
     end_date: date | None = None
     status: TripStatus | None = None
-    stops: Sequence[TripStopCreate] | None = None
+    stops: Sequence[TripStopUpsert] | None = None
 
 
 class TripRead(TimestampedModel, TripBase):
@@ -64,6 +89,15 @@ class TripRead(TimestampedModel, TripBase):
     stops: list[TripStopRead] = []
 
 
+class TripDistances(BaseModel):
+    stop_ids: list[int]
+    # Great-circle metres between stops, in trip order; null where a stop has no location.
+    matrix_m: list[list[float | None]]
+    # Consecutive stops of the same day; null across day boundaries.
+    legs_m: list[float | None]
+    total_m: float
+
+
 class BookingBase(BaseModel):
     stay_id: int | None = None
     check_in: date | None = None
@@ -0,0 +1,411 @@
+from __future__ import annotations
+
+import codecs
+import difflib
+import ipaddress
+import json
+import logging
+import re
+import socket
+import threading
+import unicodedata
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Any
+
+import httpx
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings
+from ..models.enums import BookingSource
+from ..repositories.property import PartnerPropertyRepository
+from ..repositories.trip import TripRepository
+from .spatial_index import GridIndex, bbox_around, distance_m
+
+logger = logging.getLogger(__name__)
+
+IMPORT_TRIP_NAME = "Booking.com stays"
+MAX_REDIRECTS = 5
+# A single reservation is a few kilobytes; an unfinished value longer than this is not one.
+MAX_VALUE_CHARS = 1_000_000
+
+
+class ExportError(ValueError):
+    """A failure whose message is safe to show the user who registered the import."""
+
+
+class ExportParser:
+    """Incremental parser for an export that is either a JSON array or NDJSON.
+
+    ``feed`` takes decoded text as it arrives and returns the complete top-level values seen
+    so far; only the unfinished tail is buffered, up to ``max_value_chars``. An NDJSON line
+    that does not parse is returned as its raw text so the caller can count it as invalid.
+    """
+
+    _WHITESPACE = re.compile(r"\s*")
+
+    def __init__(self, max_value_chars: int = MAX_VALUE_CHARS) -> None:
+        self.max_value_chars = max_value_chars
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._array: bool | None = None
+        self._closed = False
+
+    def feed(self, text: str) -> list[Any]:
+        buffer = self._buffer + text
+        values: list[Any] = []
+        position = 0
+        while not self._closed:
+            position = self._WHITESPACE.match(buffer, position).end()
+            if position >= len(buffer):
+                break
+            if self._array is None:
+                self._array = buffer[position] == "["
+                if self._array:
+                    position += 1
+                    continue
+            if self._array and buffer[position] == ",":
+                position += 1
+                continue
+            if self._array and buffer[position] == "]":
+                self._closed = True
+                position = len(buffer)
+                break
+            try:
+                value, position = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                newline = buffer.find("\n", position)
+                if self._array or newline < 0:
+                    break  # incomplete value, wait for more input
+                values.append(buffer[position:newline])
+                position = newline + 1
+                continue
+            values.append(value)
+        self._buffer = buffer[position:]
+        if len(self._buffer) > self.max_value_chars:
+            # A malformed array element never completes; without a cap it would buffer the rest.
+            raise ExportError("Export contains a reservation that is too large or malformed")
+        return values
+
+    def close(self) -> list[Any]:
+        values = self.feed("\n") if not self._array else []
+        if self._buffer.strip() or (self._array and not self._closed):
+            raise ExportError("Export is truncated or is not valid JSON")
+        return values
+
+
+@dataclass(frozen=True, slots=True)
+class Reservation:
+    reservation_id: str
+    name: str
+    longitude: float | None
+    latitude: float | None
+    check_in: date | None
+    check_out: date | None
+    raw: dict[str, Any]
+
+    @classmethod
+    def from_record(cls, record: Any) -> Reservation:
+        if not isinstance(record, dict):
+            raise ValueError("Reservation is not a JSON object")
+        reservation_id = reservation_key(record)
+        if reservation_id is None:
+            raise ValueError("Reservation has no id")
+        location = record.get("location") if isinstance(record.get("location"), dict) else record
+        longitude, latitude = location.get("longitude"), location.get("latitude")
+        has_point = isinstance(longitude, (int, float)) and isinstance(latitude, (int, float))
+        return cls(
+            reservation_id=reservation_id,
+            name=str(record.get("hotel_name") or record.get("property_name") or ""),
+            longitude=float(longitude) if has_point else None,
+            latitude=float(latitude) if has_point else None,
+            check_in=_parse_date(record.get("check_in")),
+            check_out=_parse_date(record.get("check_out")),
+            raw=record,
+        )
+
+
+def reservation_key(record: dict[str, Any]) -> str | None:
+    value = record.get("reservation_id") or record.get("id")
+    return str(value) if value not in (None, "") else None
+
+
+def _parse_date(value: Any) -> date | None:
+    if not value:
+        return None
+    return date.fromisoformat(str(value)[:10])
+
+
+def normalize_name(name: str) -> str:
+    folded = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    return " ".join(re.findall(r"[a-z0-9]+", folded))
+
+
+class StayMatcher:
+    """Matches reservations to partner properties.
+
+    Properties within ``radius_m`` of the reservation are compared by name similarity;
+    reservations without coordinates need a near-exact name match instead.
+    """
+
+    def __init__(
+        self,
+        properties: Iterable[tuple[int, str, float, float]],
+        radius_m: float = 500.0,
+        min_similarity: float = 0.6,
+        name_only_similarity: float = 0.9,
+    ) -> None:
+        self.radius_m = radius_m
+        self.min_similarity = min_similarity
+        self.name_only_similarity = name_only_similarity
+        self._points: dict[int, tuple[float, float]] = {}
+        self._names: dict[int, str] = {}
+        self._ids_by_name: dict[str, list[int]] = {}
+        for property_id, name, longitude, latitude in properties:
+            self._points[property_id] = (longitude, latitude)
+            self._names[property_id] = normalize_name(name)
+            self._ids_by_name.setdefault(self._names[property_id], []).append(property_id)
+        self._grid = GridIndex(cell_size=0.01)
+        self._grid.load((pid, lon, lat) for pid, (lon, lat) in self._points.items())
+        self._name_matches: dict[str, int | None] = {}
+
+    def match(self, reservation: Reservation) -> int | None:
+        name = normalize_name(reservation.name)
+        if reservation.longitude is None or reservation.latitude is None:
+            return self._match_name(name)
+        best: tuple[float, float, int] | None = None
+        bbox = bbox_around(reservation.longitude, reservation.latitude, self.radius_m)
+        for property_id in self._grid.query(bbox):
+            distance = distance_m(reservation.longitude, reservation.latitude, *self._points[property_id])
+            if distance > self.radius_m:
+                continue
+            similarity = difflib.SequenceMatcher(None, name, self._names[property_id]).ratio()
+            if similarity < self.min_similarity:
+                continue
+            candidate = (similarity, -distance, property_id)
+            if best is None or candidate > best:
+                best = candidate
+        return best[2] if best else None
+
+    def _match_name(self, name: str) -> int | None:
+        if not name:
+            return None
+        if name not in self._name_matches:
+            exact = self._ids_by_name.get(name)
+            if exact:
+                match = exact[0] if len(exact) == 1 else None
+            else:
+                close = difflib.get_close_matches(
+                    name, self._ids_by_name.keys(), n=1, cutoff=self.name_only_similarity
+                )
+                ids = self._ids_by_name[close[0]] if close else []
+                match = ids[0] if len(ids) == 1 else None
+            self._name_matches[name] = match
+        return self._name_matches[name]
+
+
+@dataclass
+class ImportProgress:
+    state: str = "pending"
+    bytes_read: int = 0
+    reservations: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    matched: int = 0
+    imported: int = 0
+    trip_id: int | None = None
+    error: str | None = None
+    started_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: datetime | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.state in ("pending", "running")
+
+
+class BookingImporter:
+    """Runs Booking.com portability imports and keeps each user's latest progress in memory.
+
+    The export URL comes from the user, so it and every redirect it leads to must use an
+    allowed scheme and host, and the host must not resolve to a loopback, private or
+    link-local address.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        timeout: float = 30.0,
+        allowed_hosts: Iterable[str] = ("booking.com",),
+        allowed_schemes: Iterable[str] = ("https",),
+        private_addresses: bool = False,
+    ) -> None:
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.allowed_hosts = tuple(host.lower().strip(".") for host in allowed_hosts)
+        self.allowed_schemes = tuple(allowed_schemes)
+        self.private_addresses = private_addresses
+        self._jobs: dict[int, ImportProgress] = {}
+        self._lock = threading.Lock()
+
+    def status(self, user_id: int) -> ImportProgress | None:
+        return self._jobs.get(user_id)
+
+    def start(self, user_id: int) -> ImportProgress:
+        with self._lock:
+            current = self._jobs.get(user_id)
+            if current is not None and current.running:
+                raise RuntimeError("An import is already running")
+            progress = self._jobs[user_id] = ImportProgress()
+        return progress
+
+    def run(
+        self,
+        session_factory: Callable[[], AbstractContextManager[Session]],
+        user_id: int,
+        url: str,
+        progress: ImportProgress,
+    ) -> None:
+        progress.state = "running"
+        try:
+            with session_factory() as db:
+                self._import(db, user_id, url, progress)
+        except ExportError as exc:
+            progress.state = "failed"
+            progress.error = str(exc)
+        except (httpx.HTTPError, ValueError):
+            # The details stay in the log: they can describe hosts the user should not learn about.
+            logger.warning("Booking.com export download failed for user %s", user_id, exc_info=True)
+            progress.state = "failed"
+            progress.error = "Could not download the export"
+        except Exception:
+            logger.exception("Booking.com import failed for user %s", user_id)
+            progress.state = "failed"
+            progress.error = "Internal error"
+        else:
+            progress.state = "completed"
+        finally:
+            progress.finished_at = datetime.now(timezone.utc)
+
+    def _import(self, db: Session, user_id: int, url: str, progress: ImportProgress) -> None:
+        trips = TripRepository(db)
+        seen = {reservation_key(raw) for raw in trips.imported_booking_payloads(user_id)}
+        matcher = StayMatcher(PartnerPropertyRepository(db).match_candidates())
+        batch: list[dict[str, Any]] = []
+        for record in self._download(url, progress):
+            try:
+                reservation = Reservation.from_record(record)
+            except ValueError:
+                progress.invalid += 1
+                continue
+            progress.reservations += 1
+            if reservation.reservation_id in seen:
+                progress.duplicates += 1
+                continue
+            seen.add(reservation.reservation_id)
+            stay_id = matcher.match(reservation)
+            if stay_id is not None:
+                progress.matched += 1
+            batch.append(
+                {
+                    "stay_id": stay_id,
+                    "check_in": reservation.check_in,
+                    "check_out": reservation.check_out,
+                    "source": BookingSource.BOOKING_IMPORT,
+                    "raw_json": reservation.raw,
+                }
+            )
+            if len(batch) >= self.batch_size:
+                self._flush(trips, user_id, batch, progress)
+        self._flush(trips, user_id, batch, progress)
+
+    def _flush(
+        self,
+        trips: TripRepository,
+        user_id: int,
+        batch: list[dict[str, Any]],
+        progress: ImportProgress,
+    ) -> None:
+        if not batch:
+            return
+        if progress.trip_id is None:
+            progress.trip_id = trips.import_trip(user_id, IMPORT_TRIP_NAME)
+        for row in batch:
+            row["trip_id"] = progress.trip_id
+        progress.imported += trips.bulk_add_bookings(batch)
+        batch.clear()
+
+    def check_url(self, url: str | httpx.URL) -> httpx.URL:
+        """Raise ``ExportError`` unless ``url`` may be downloaded."""
+        return self._vet(url)[0]
+
+    def pinned_request(self, client: httpx.Client, url: str | httpx.URL) -> httpx.Request:
+        """A GET for ``url`` that connects to the address ``check_url`` vetted.
+
+        Resolving the name again at connect time would let a rebinding DNS server swap in a
+        private address after the check; the Host header and TLS SNI keep the name.
+        """
+        url, address = self._vet(url)
+        if address is None:
+            return client.build_request("GET", url)
+        return client.build_request(
+            "GET",
+            url.copy_with(host=address),
+            headers={"Host": url.netloc.decode("ascii")},
+            extensions={"sni_hostname": url.host},
+        )
+
+    def _vet(self, url: str | httpx.URL) -> tuple[httpx.URL, str | None]:
+        url = httpx.URL(url)
+        host = url.host.lower().rstrip(".")
+        if url.scheme not in self.allowed_schemes or not any(
+            host == allowed or host.endswith(f".{allowed}") for allowed in self.allowed_hosts
+        ):
+            raise ExportError("Export URL is not allowed")
+        if self.private_addresses:
+            return url, None
+        try:
+            addresses = sorted({info[4][0] for info in socket.getaddrinfo(host, url.port)})
+        except (OSError, UnicodeError) as exc:
+            raise ExportError("Export host could not be resolved") from exc
+        # is_global is False for loopback, private, link-local (cloud metadata) and reserved.
+        if not addresses or not all(
+            ipaddress.ip_address(address.split("%")[0]).is_global for address in addresses
+        ):
+            raise ExportError("Export URL is not allowed")
+        return url, addresses[0]
+
+    def _download(self, url: str, progress: ImportProgress) -> Iterator[Any]:
+        parser = ExportParser()
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        with httpx.Client(timeout=self.timeout, follow_redirects=False) as client:
+            target = httpx.URL(url)
+            for _ in range(MAX_REDIRECTS + 1):
+                # Each hop is checked before it is requested.
+                response = client.send(self.pinned_request(client, target), stream=True)
+                if not response.is_redirect:
+                    break
+                response.close()
+                # Relative locations resolve against the name, not the pinned address.
+                target = target.join(response.headers["Location"])
+            else:
+                raise ExportError("Export URL redirects too many times")
+            try:
+                response.raise_for_status()
+                for chunk in response.iter_bytes():
+                    progress.bytes_read += len(chunk)
+                    yield from parser.feed(decoder.decode(chunk))
+            finally:
+                response.close()
+        yield from parser.feed(decoder.decode(b"", final=True))
+        yield from parser.close()
+
+
+_settings = get_settings()
+
+booking_importer = BookingImporter(
+    allowed_hosts=_settings.booking_export_hosts,
+    allowed_schemes=_settings.booking_export_schemes,
+    private_addresses=_settings.booking_export_private_addresses,
+)
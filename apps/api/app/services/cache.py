@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Thread-safe LRU whose entries also expire, after ``ttl`` seconds or at an explicit time.
+
+    With ``weigh`` and ``max_weight`` the cache is also bounded by the summed weight of its
+    values (for example their size in bytes), evicting least recently used entries first.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        weigh: Callable[[V], int] | None = None,
+        max_weight: int | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clock = clock
+        self._weigh = weigh
+        self._entries: OrderedDict[K, tuple[V, float | None, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, weight = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                self.weight -= weight
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V, expires_at: float | None = None) -> None:
+        if self.max_entries <= 0:
+            return
+        weight = self._weigh(value) if self._weigh is not None else 0
+        if self.max_weight is not None and weight > self.max_weight:
+            self.pop(key)
+            return
+        if expires_at is None and self.ttl is not None:
+            expires_at = self._clock() + self.ttl
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.weight -= previous[2]
+            self._entries[key] = (value, expires_at, weight)
+            self.weight += weight
+            while len(self._entries) > self.max_entries or (
+                self.max_weight is not None and self.weight > self.max_weight
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self.weight -= evicted[2]
+                self.evictions += 1
+
+    def pop(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self.weight -= entry[2]
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
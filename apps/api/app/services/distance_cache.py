@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Sequence
+
+import numpy as np
+
+from ..core.config import get_settings
+from .spatial_index import distance_matrix
+
+logger = logging.getLogger(__name__)
+
+# (kind, id, longitude, latitude) of a POI ("poi") or partner property ("stay").
+Place = tuple[str, int, float, float]
+KINDS = ("poi", "stay")
+
+
+def place_key(kind: str, row_id: int) -> int:
+    # POI and property ids share one int64 key space; the low bit tells the tables apart.
+    return (row_id << 1) | KINDS.index(kind)
+
+
+class DistanceCache:
+    """Bounded cache of pairwise distances (metres) between catalogue points.
+
+    Points occupy slots of a ``capacity`` x ``capacity`` float32 matrix; when every slot is
+    taken the least recently used point is evicted. Each slot remembers the coordinates its
+    distances were computed from, so a point that moved is recomputed instead of served
+    stale. At startup ``warm`` loads the matrix the previous process saved to a compressed
+    ``.npz`` file, or seeds the points that co-occur most in trips; lookups fill the rest.
+    """
+
+    def __init__(self, capacity: int = 1024, path: str | None = None) -> None:
+        self.capacity = capacity
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._slots: OrderedDict[int, int] = OrderedDict()
+        self._free = list(range(capacity - 1, -1, -1))
+        self._coordinates = np.full((capacity, 2), np.nan)
+        self._distances = np.full((capacity, capacity), np.nan, dtype=np.float32)
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def ensure_loaded(self) -> None:
+        """Load the saved matrix once; without one the cache starts empty and fills on lookup."""
+        if self._loaded:
+            return
+        if self.path and self.load():
+            return
+        with self._lock:
+            self._loaded = True
+
+    def warm(self, seed_loader: Callable[[int], Iterable[Place]]) -> None:
+        """Load the saved matrix, or seed from ``seed_loader(capacity)`` when there is none."""
+        if self.path and not self._loaded and self.load():
+            return
+        places = list(seed_loader(self.capacity))
+        with self._lock:
+            # Lookups that ran meanwhile already filled the cache; seeding would drop them.
+            if not self._slots:
+                self.seed(places)
+
+    def seed(self, places: Iterable[Place]) -> None:
+        """Fill the cache with ``places``, most important first."""
+        with self._lock:
+            # Stored in reverse so the most important places are the last to be evicted.
+            places = list(places)[: self.capacity][::-1]
+            keys = [place_key(kind, row_id) for kind, row_id, _, _ in places]
+            coordinates = np.array([place[2:] for place in places], dtype=float).reshape(-1, 2)
+            self._reset()
+            self._store(keys, coordinates, distance_matrix(coordinates[:, 0], coordinates[:, 1]))
+            self._loaded = True
+
+    def lookup(self, places: Sequence[Place | None]) -> np.ndarray:
+        """Distance matrix between ``places`` in one call; rows of ``None`` places are NaN."""
+        return _expand(places, self._fetch)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._slots),
+        }
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            slots = list(self._slots.values())
+            keys = np.fromiter(self._slots, dtype=np.int64, count=len(slots))
+            coordinates = self._coordinates[slots]
+            distances = self._distances[np.ix_(slots, slots)]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as handle:
+            np.savez_compressed(handle, keys=keys, coordinates=coordinates, distances=distances)
+        os.replace(temporary, self.path)
+
+    def load(self) -> bool:
+        try:
+            with np.load(self.path) as saved:
+                keys, coordinates, distances = saved["keys"], saved["coordinates"], saved["distances"]
+        except (OSError, KeyError, ValueError):
+            if os.path.exists(self.path):
+                logger.warning("Ignoring unreadable distance cache %s", self.path, exc_info=True)
+            return False
+        # Saved least recently used first; keep the most recent points if capacity shrank.
+        keep = slice(max(len(keys) - self.capacity, 0), None)
+        with self._lock:
+            self._reset()
+            self._store(keys[keep].tolist(), coordinates[keep], distances[keep, keep])
+            self._loaded = True
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self._loaded = False
+            self.hits = self.misses = self.evictions = 0
+
+    def _fetch(self, keys: list[int], coordinates: np.ndarray) -> np.ndarray:
+        if len(keys) > self.capacity:
+            return distance_matrix(coordinates[:, 0], coordinates[:, 1])
+        with self._lock:
+            found = [self._slots.get(key) for key in keys]
+            known = [index for index, slot in enumerate(found) if slot is not None]
+            if known:
+                cached = self._coordinates[[found[index] for index in known]]
+                moved = np.any(cached != coordinates[known], axis=1)
+                for index, stale in zip(known, moved.tolist()):
+                    if stale:
+                        self._forget(keys[index])
+                        found[index] = None
+                    else:
+                        self._slots.move_to_end(keys[index])
+            batch = set(keys)
+            for index, slot in enumerate(found):
+                if slot is None:
+                    found[index] = self._claim(keys[index], batch)
+                    self._coordinates[found[index]] = coordinates[index]
+            slots: list[int] = found
+            block = self._distances[np.ix_(slots, slots)].astype(float)
+            unknown = np.isnan(block)
+            missing = int(unknown.sum())
+            self.misses += missing
+            self.hits += block.size - missing
+            if missing:
+                # Rows with any gap are recomputed whole: one vectorised pass beats pair lookups.
+                rows = np.flatnonzero(unknown.any(axis=1))
+                origins = coordinates[rows]
+                block[rows] = distance_matrix(
+                    origins[:, 0], origins[:, 1], coordinates[:, 0], coordinates[:, 1]
+                )
+                block[:, rows] = block[rows].T
+                self._distances[np.ix_(slots, slots)] = block
+            return block
+
+    def _store(self, keys: list[int], coordinates: np.ndarray, distances: np.ndarray) -> None:
+        slots = []
+        for key, point in zip(keys, coordinates):
+            slot = self._claim(key, set())
+            self._coordinates[slot] = point
+            slots.append(slot)
+        self._distances[np.ix_(slots, slots)] = distances
+
+    def _claim(self, key: int, protected: set[int]) -> int:
+        if not self._free:
+            victim = next(candidate for candidate in self._slots if candidate not in protected)
+            self._forget(victim)
+            self.evictions += 1
+        slot = self._free.pop()
+        self._slots[key] = slot
+        return slot
+
+    def _forget(self, key: int) -> None:
+        slot = self._slots.pop(key)
+        self._distances[slot, :] = np.nan
+        self._distances[:, slot] = np.nan
+        self._coordinates[slot] = np.nan
+        self._free.append(slot)
+
+    def _reset(self) -> None:
+        self._slots.clear()
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self._coordinates.fill(np.nan)
+        self._distances.fill(np.nan)
+
+
+def place_distances(places: Sequence[Place | None]) -> np.ndarray:
+    """Uncached counterpart of ``DistanceCache.lookup``."""
+    return _expand(places, lambda _, coordinates: distance_matrix(coordinates[:, 0], coordinates[:, 1]))
+
+
+def _expand(
+    places: Sequence[Place | None], distances_of: Callable[[list[int], np.ndarray], np.ndarray]
+) -> np.ndarray:
+    # Distances are computed once per distinct place and spread back over the input order.
+    size = len(places)
+    result = np.full((size, size), np.nan)
+    positions = [index for index, place in enumerate(places) if place is not None]
+    if not positions:
+        return result
+    batch: dict[int, tuple[float, float]] = {}
+    rows = []
+    for index in positions:
+        kind, row_id, longitude, latitude = places[index]
+        key = place_key(kind, row_id)
+        batch.setdefault(key, (longitude, latitude))
+        rows.append(key)
+    keys = list(batch)
+    distances = distances_of(keys, np.array(list(batch.values()), dtype=float))
+    order = {key: position for position, key in enumerate(keys)}
+    rows = [order[key] for key in rows]
+    result[np.ix_(positions, positions)] = distances[np.ix_(rows, rows)]
+    return result
+
+
+_settings = get_settings()
+
+distance_cache = DistanceCache(_settings.distance_cache_capacity, _settings.distance_cache_path)
@@ -1,21 +1,156 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections.abc import Callable
+
+from google.auth import exceptions, jwt
 from google.auth.transport import requests
-from google.oauth2 import id_token
 
 from ..core.config import get_settings
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class CertCache:
+    """Google signing certificates held for the ``max-age`` the endpoint advertises.
+
+    Once an entry is within ``refresh_margin`` seconds of expiring, callers keep getting
+    the current certificates while a background thread fetches the next set.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        request: requests.Request,
+        refresh_margin: float = 300.0,
+        default_ttl: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.url = url
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self._request = request
+        self._clock = clock
+        self._certs: dict[str, str] | None = None
+        self._fetched_at = 0.0
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self) -> dict[str, str]:
+        certs = self._certs
+        now = self._clock()
+        if certs is None or now >= self._expires_at:
+            return self._load()
+        if now >= self._expires_at - self.refresh_margin:
+            self._refresh_in_background()
+        return certs
+
+    def refresh(self, min_age: float = 0.0) -> dict[str, str]:
+        """Fetch synchronously unless a fetch newer than ``min_age`` seconds already landed."""
+        with self._lock:
+            if self._certs is not None and self._clock() - self._fetched_at < min_age:
+                return self._certs
+            return self._fetch()
+
+    def _load(self) -> dict[str, str]:
+        with self._lock:
+            if self._certs is None or self._clock() >= self._expires_at:
+                return self._fetch()
+            return self._certs
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name="firebase-certs", daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            with self._lock:
+                self._fetch()
+        except Exception:  # keep serving the current certs; the next call retries
+            logger.warning("Background refresh of Firebase certificates failed", exc_info=True)
+        finally:
+            self._refreshing = False
+
+    def _fetch(self) -> dict[str, str]:
+        response = self._request(self.url, method="GET")
+        if response.status != 200:
+            raise exceptions.TransportError(f"Could not fetch certificates at {self.url}")
+        certs = json.loads(response.data.decode("utf-8"))
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        ttl = float(match.group(1)) if match else self.default_ttl
+        self._certs = certs
+        self._fetched_at = self._clock()
+        self._expires_at = self._fetched_at + ttl
+        return certs
+
+
+class TokenCache:
+    """Bounded LRU of verified claims keyed by token hash, each kept until the token's ``exp``."""
+
+    def __init__(self, max_entries: int = 10_000, clock: Callable[[], float] = time.time) -> None:
+        self._entries: TTLCache[str, dict] = TTLCache(max_entries, clock=clock)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        return self._entries.stats()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> dict | None:
+        claims = self._entries.get(self.key(token))
+        return dict(claims) if claims is not None else None
+
+    def put(self, token: str, claims: dict) -> None:
+        if claims.get("exp") is not None:
+            self._entries.set(self.key(token), dict(claims), expires_at=claims["exp"])
 
 
 class FirebaseVerifier:
-    def __init__(self) -> None:
-        self._request = requests.Request()
-        self._project_id = get_settings().firebase_project_id
+    # Minimum spacing between forced refreshes triggered by an unknown signing key id.
+    KEY_ROTATION_REFRESH_SECONDS = 60.0
+
+    def __init__(
+        self,
+        project_id: str | None = None,
+        certs_url: str | None = None,
+        request: requests.Request | None = None,
+    ) -> None:
+        settings = get_settings()
+        self._request = request or requests.Request()
+        self._project_id = project_id or settings.firebase_project_id
+        self.certs = CertCache(certs_url or settings.firebase_certs_url, self._request)
+        self.tokens = TokenCache(settings.firebase_token_cache_size)
 
     def verify(self, token: str) -> dict:
+        cached = self.tokens.get(token)
+        if cached is not None:
+            return cached
         try:
-            return id_token.verify_firebase_token(token, self._request, audience=self._project_id)
+            certs = self.certs.get()
+            if jwt.decode_header(token).get("kid") not in certs:
+                certs = self.certs.refresh(min_age=self.KEY_ROTATION_REFRESH_SECONDS)
+            claims = jwt.decode(token, certs=certs, audience=self._project_id)
         except ValueError as exc:  # includes Expired or invalid token
             raise ValueError("Invalid Firebase token") from exc
+        claims.setdefault("uid", claims.get("sub"))
+        self.tokens.put(token, claims)
+        return claims
 
 
 firebase_verifier = FirebaseVerifier()
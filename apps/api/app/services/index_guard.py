@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Protocol
+
+from ..core.config import get_settings
+from .spatial_index import (
+    poi_index,
+    property_index,
+    published_poi_index,
+    published_property_index,
+)
+from .text_index import (
+    poi_suggest_index,
+    poi_text_index,
+    property_suggest_index,
+    property_text_index,
+)
+
+
+class Invalidatable(Protocol):
+    def invalidate(self) -> None: ...
+
+
+class IndexGuard:
+    """Drops in-process indexes once their table changed behind this process's back.
+
+    The indexes are per process: a write served by another worker never reaches them. At
+    most once per ``interval`` the next read compares a cheap table stamp (row count,
+    newest id, revision sum) with the stamp expected here and, if they differ, invalidates
+    every index so the next lookup reloads. The repositories apply this process's writes
+    to the indexes themselves and fold them into the expected stamp with ``record``, so
+    only foreign writes cost a reload; they are visible here within ``interval``.
+    """
+
+    def __init__(
+        self,
+        indexes: Iterable[Invalidatable],
+        interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.indexes = list(indexes)
+        self.interval = interval
+        self._clock = clock
+        self._stamp: tuple[int, int, int] | None = None
+        self._next_check = float("-inf")
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        return self._clock() >= self._next_check
+
+    def observe(self, stamp: Iterable[int | None]) -> None:
+        # Empty tables give NULL aggregates; MySQL sums come back as Decimal.
+        rows, newest, revisions = (int(value or 0) for value in stamp)
+        with self._lock:
+            self._next_check = self._clock() + self.interval
+            if (rows, newest, revisions) == self._stamp:
+                return
+            self._stamp = (rows, newest, revisions)
+        for index in self.indexes:
+            index.invalidate()
+
+    def record(
+        self,
+        rows: int = 0,
+        revisions: int = 0,
+        created: int | None = None,
+        removed: int | None = None,
+    ) -> None:
+        """Fold a committed local write into the expected stamp.
+
+        A check that reads the stamp between the commit and this call sees the write as
+        foreign; that costs one spurious reload, never a missed change.
+        """
+        with self._lock:
+            if self._stamp is None:
+                return
+            count, newest, total = self._stamp
+            if removed is not None and removed >= newest:
+                # The next newest id is unknown here: the next check reloads once.
+                self._stamp = None
+                return
+            if created is not None:
+                newest = max(newest, created)
+            self._stamp = (count + rows, newest, total + revisions)
+
+    def reset(self) -> None:
+        """Forget the expected stamp; the next read checks again and reloads."""
+        with self._lock:
+            self._stamp = None
+            self._next_check = float("-inf")
+
+    def check(self, read_stamp: Callable[[], Iterable[int | None]]) -> None:
+        if self.due():
+            self.observe(read_stamp())
+
+
+_settings = get_settings()
+
+poi_guard = IndexGuard(
+    [poi_index, published_poi_index, poi_text_index, poi_suggest_index],
+    _settings.index_stamp_interval_seconds,
+)
+property_guard = IndexGuard(
+    [property_index, published_property_index, property_text_index, property_suggest_index],
+    _settings.index_stamp_interval_seconds,
+)
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, Protocol
+
+from ..core.config import Settings, get_settings
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(Protocol):
+    name: str
+    # Whether calls wait on the network; async handlers then make them from the threadpool.
+    blocking: bool
+
+    def get(self, key: str) -> bytes | None: ...
+
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def incr(self, key: str) -> int: ...
+
+    def counter(self, key: str) -> int: ...
+
+    def clear(self) -> None: ...
+
+    def stats(self) -> dict[str, int]: ...
+
+
+class MemoryBackend:
+    """Per-process LRU bounded by entry count and total body bytes."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(
+        self, max_entries: int, max_bytes: int, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._clock = clock
+        self._entries: TTLCache[str, bytes] = TTLCache(
+            max_entries, clock=clock, weigh=len, max_weight=max_bytes
+        )
+        # Counters live outside the LRU: evicting one would resurrect stale list entries.
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        return self._entries.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries.set(key, value, expires_at=self._clock() + ttl)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        with self._lock:
+            self._counters.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self._entries.hits,
+            "misses": self._entries.misses,
+            "evictions": self._entries.evictions,
+            "entries": len(self._entries),
+            "bytes": self._entries.weight,
+        }
+
+
+class RedisBackend:
+    """Shared backend over a redis-py compatible client; failures degrade to cache misses."""
+
+    name = "redis"
+    blocking = True
+
+    def __init__(self, client: Any, prefix: str = "guidelk:cache:") -> None:
+        self.client = client
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        try:
+            from redis.exceptions import RedisError
+        except ImportError:
+            self._failures: tuple[type[Exception], ...] = (OSError,)
+        else:
+            self._failures = (OSError, RedisError)
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            value = self.client.get(self.prefix + key)
+        except self._failures:
+            self._failed("get")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            self.client.set(self.prefix + key, value, px=max(int(ttl * 1000), 1))
+        except self._failures:
+            self._failed("set")
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(self.prefix + key)
+        except self._failures:
+            self._failed("delete")
+
+    def incr(self, key: str) -> int:
+        try:
+            return int(self.client.incr(self.prefix + key))
+        except self._failures:
+            self._failed("incr")
+            return 0
+
+    def counter(self, key: str) -> int:
+        try:
+            return int(self.client.get(self.prefix + key) or 0)
+        except self._failures:
+            self._failed("get")
+            return 0
+
+    def clear(self) -> None:
+        self.hits = self.misses = self.errors = 0
+
+    def stats(self) -> dict[str, int]:
+        # Evictions happen inside Redis and are reported by its own INFO stats.
+        return {"hits": self.hits, "misses": self.misses, "evictions": 0, "errors": self.errors}
+
+    def _failed(self, operation: str) -> None:
+        self.errors += 1
+        logger.warning("Response cache %s failed", operation, exc_info=True)
+
+
+class ResponseCache:
+    """Rendered response bodies keyed by namespace.
+
+    Keys embed a generation counter: one per namespace for list pages, one per row for
+    details. A write bumps the namespace counter and the counters of the rows it changed,
+    so every page and only those details are retired. A request that read a row before
+    the bump stores its body under the old generation, where no later request looks.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 300.0) -> None:
+        self.backend = backend
+        self.ttl = ttl
+
+    @property
+    def blocking(self) -> bool:
+        return self.backend.blocking
+
+    def key(self, namespace: str, variant: str, listing: bool = False) -> str:
+        if listing:
+            generation = self.backend.counter(f"{namespace}:generation")
+            return f"{namespace}:list:{generation}:{variant}"
+        generation = self.backend.counter(f"{namespace}:{variant}:generation")
+        return f"{namespace}:{generation}:{variant}"
+
+    def get(self, key: str) -> bytes | None:
+        return self.backend.get(key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self.backend.set(key, value, self.ttl)
+
+    def invalidate(self, namespace: str, *row_ids: int) -> None:
+        # The bumps alone retire the entries; deleting the changed rows frees them sooner.
+        for row_id in row_ids:
+            self.backend.delete(self.key(namespace, str(row_id)))
+            self.backend.incr(f"{namespace}:{row_id}:generation")
+        self.backend.incr(f"{namespace}:generation")
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": self.backend.name, **self.backend.stats()}
+
+
+def build_response_cache(settings: Settings) -> ResponseCache | None:
+    if settings.response_cache_backend == "none":
+        return None
+    if settings.response_cache_backend == "redis":
+        import redis  # optional dependency, only needed for the shared backend
+
+        client = redis.Redis.from_url(settings.redis_url or "redis://localhost:6379/0")
+        backend: CacheBackend = RedisBackend(client)
+    else:
+        backend = MemoryBackend(
+            settings.response_cache_max_entries, settings.response_cache_max_bytes
+        )
+    return ResponseCache(backend, ttl=settings.response_cache_ttl_seconds)
+
+
+response_cache = build_response_cache(get_settings())
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import numpy as np
+
+# Improvements smaller than this (metres) are rounding noise and would only cause churn.
+MIN_GAIN_M = 1e-6
+OR_OPT_SEGMENTS = (1, 2, 3)
+
+
+def route_length(matrix: np.ndarray, route: Sequence[int]) -> float:
+    route = np.asarray(route, dtype=int)
+    return float(matrix[route[:-1], route[1:]].sum())
+
+
+def optimize_route(
+    matrix: np.ndarray, start: int | None = None, end: int | None = None
+) -> list[int]:
+    """Short visiting order of every node in ``matrix``.
+
+    ``start`` and ``end`` pin the first and last node; pinning the same node to both makes a
+    round trip from it. The order is built nearest-neighbour first and then improved with
+    best-move 2-opt and Or-opt passes until neither finds a shorter route.
+    """
+    size = len(matrix)
+    if size == 0:
+        return []
+    depot = None
+    if start is None or end is None:
+        # A free end becomes a zero-cost depot, so every case is a path between fixed nodes.
+        depot = size
+        padded = np.zeros((size + 1, size + 1))
+        padded[:size, :size] = matrix
+        matrix = padded
+        start = depot if start is None else start
+        end = depot if end is None else end
+    route = _nearest_neighbour(matrix, start, end)
+    for _ in range(50 * len(route)):
+        improved = _two_opt_move(matrix, route)
+        if improved is None:
+            improved = _or_opt_move(matrix, route)
+        if improved is None:
+            break
+        route = improved
+    order = route.tolist()
+    if order[0] == order[-1]:
+        order.pop()
+    return [node for node in order if node != depot]
+
+
+def order_stops(matrix: np.ndarray, pinned: Sequence[bool]) -> list[int]:
+    """Visit order, as indices into ``matrix``, for the stops of one day.
+
+    The first and last pinned stops (the stays) start and end the day; a single stay is a
+    round trip. Stops without a known position (NaN rows) keep their relative order after
+    the route.
+    """
+    known = ~np.isnan(np.diagonal(matrix))
+    located = np.flatnonzero(known).tolist()
+    unlocated = np.flatnonzero(~known).tolist()
+    anchors = [position for position, index in enumerate(located) if pinned[index]]
+    if len(located) < 3 and not anchors:
+        # Any order of two free stops is as short as the other; keep the planned one.
+        return located + unlocated
+    start = anchors[0] if anchors else None
+    end = anchors[-1] if anchors else None
+    route = optimize_route(matrix[np.ix_(located, located)], start, end)
+    return [located[position] for position in route] + unlocated
+
+
+def _nearest_neighbour(matrix: np.ndarray, start: int, end: int) -> np.ndarray:
+    remaining = np.array([node for node in range(len(matrix)) if node not in (start, end)], dtype=int)
+    route = [start]
+    current = start
+    while remaining.size:
+        pick = int(np.argmin(matrix[current, remaining]))
+        current = int(remaining[pick])
+        route.append(current)
+        remaining = np.delete(remaining, pick)
+    route.append(end)
+    return np.array(route, dtype=int)
+
+
+def _two_opt_move(matrix: np.ndarray, route: np.ndarray) -> np.ndarray | None:
+    """Apply the best segment reversals of ``route[i..j]``, if any shortens it."""
+    size = len(route)
+    if size < 4:
+        return None
+    # Distances by route position, so every term below is a slice rather than a gather.
+    positional = matrix[np.ix_(route, route)]
+    edges = positional.diagonal(1)
+    # delta[i-1, j-1] for reversing route[i..j] with 1 <= i < j <= size-2.
+    delta = positional[:-2, 1:-1] + positional[1:-1, 2:] - edges[:-1][:, None] - edges[1:][None, :]
+    delta = np.triu(delta, 1).ravel()
+    candidates = np.flatnonzero(delta < -MIN_GAIN_M)
+    if candidates.size == 0:
+        return None
+    if candidates.size > size:
+        candidates = candidates[np.argpartition(delta[candidates], size)[:size]]
+    candidates = candidates[np.argsort(delta[candidates], kind="stable")]
+    # Reversals whose touched spans [i-1, j+1] are disjoint do not change each other's gain,
+    # so one evaluation applies every such move, best first.
+    improved = route.copy()
+    taken: list[tuple[int, int]] = []
+    for candidate in candidates.tolist():
+        i, j = divmod(candidate, size - 2)
+        i, j = i + 1, j + 1
+        if any(i - 1 <= high and low <= j + 1 for low, high in taken):
+            continue
+        taken.append((i - 1, j + 1))
+        improved[i : j + 1] = route[i : j + 1][::-1]
+    return improved
+
+
+def _or_opt_move(matrix: np.ndarray, route: np.ndarray) -> np.ndarray | None:
+    """Apply the best relocation of a run of 1-3 stops, optionally reversed, if any helps."""
+    size = len(route)
+    positional = matrix[np.ix_(route, route)]
+    edges = positional.diagonal(1)
+    gaps = np.arange(size - 1)
+    best_delta, best_move = -MIN_GAIN_M, None
+    for length in OR_OPT_SEGMENTS:
+        starts = np.arange(1, size - length)
+        if starts.size == 0:
+            break
+        heads, tails = positional[starts], positional[starts + length - 1]
+        removal = (
+            edges[starts - 1]
+            + edges[starts + length - 1]
+            - positional[starts - 1, starts + length]
+        )
+        forward = heads[:, :-1] + tails[:, 1:]
+        backward = tails[:, :-1] + heads[:, 1:]
+        insertion = np.minimum(forward, backward) - edges[None, :]
+        # The segment cannot go back into, or next to, the gap it was cut from.
+        blocked = (gaps[None, :] >= starts[:, None] - 1) & (gaps[None, :] <= starts[:, None] + length - 1)
+        delta = np.where(blocked, np.inf, insertion - removal[:, None])
+        best = int(np.argmin(delta))
+        if delta.flat[best] < best_delta:
+            segment, gap = divmod(best, size - 1)
+            best_delta = delta.flat[best]
+            best_move = (int(starts[segment]), length, gap, backward.flat[best] < forward.flat[best])
+    if best_move is None:
+        return None
+    start, length, gap, reverse = best_move
+    segment = route[start : start + length]
+    if reverse:
+        segment = segment[::-1]
+    rest = np.concatenate((route[:start], route[start + length :]))
+    position = gap + 1 if gap < start else gap - length + 1
+    return np.concatenate((rest[:position], segment, rest[position:]))
@@ -0,0 +1,474 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from ..core.config import get_settings
+
+BBox = tuple[float, float, float, float]
+# (id, longitude, latitude) with an optional trailing tag (the POI category).
+IndexRow = tuple[int, float, float] | tuple[int, float, float, str | None]
+
+EARTH_RADIUS_M = 6_371_008.8
+# Cluster cells split each 256 px web map tile into 4x4 cells of 64 px, so a zoom level yields
+# at most a screenful of clusters whatever the catalogue size.
+CLUSTER_CELLS_PER_TILE = 4
+# Levels above this are aggregated on demand: their viewports hold few enough rows.
+MAX_CLUSTER_ZOOM = 14
+MAX_MERCATOR_LATITUDE = 85.051128
+
+
+def distance_m(longitude: float, latitude: float, other_longitude: float, other_latitude: float) -> float:
+    """Great-circle (haversine) distance in metres."""
+    phi1, phi2 = math.radians(latitude), math.radians(other_latitude)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(other_longitude - longitude)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def haversine_m(
+    longitude: float, latitude: float, longitudes: np.ndarray, latitudes: np.ndarray
+) -> np.ndarray:
+    """Vectorised great-circle distances in metres from one point to many."""
+    phi1, phi2 = np.radians(latitude), np.radians(latitudes)
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(longitudes - longitude)
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def distance_matrix(
+    longitudes: Sequence[float],
+    latitudes: Sequence[float],
+    other_longitudes: Sequence[float] | None = None,
+    other_latitudes: Sequence[float] | None = None,
+) -> np.ndarray:
+    """Great-circle (haversine) distances in metres between every pair of points, or from
+    each point to each of the ``other`` points."""
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    if other_longitudes is None or other_latitudes is None:
+        other_lon, other_lat = lon, lat
+    else:
+        other_lon = np.radians(np.asarray(other_longitudes, dtype=float))
+        other_lat = np.radians(np.asarray(other_latitudes, dtype=float))
+    d_lat = lat[:, None] - other_lat[None, :]
+    d_lon = lon[:, None] - other_lon[None, :]
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(other_lat)[None, :] * np.sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def rank_nearest(
+    ids: Sequence[int],
+    longitudes: Sequence[float],
+    latitudes: Sequence[float],
+    longitude: float,
+    latitude: float,
+    radius_m: float,
+    k: int,
+) -> list[tuple[int, float]]:
+    """The ``k`` closest ``(id, distance_m)`` pairs within ``radius_m``, nearest first."""
+    if not ids:
+        return []
+    distances = haversine_m(
+        longitude, latitude, np.asarray(longitudes, dtype=float), np.asarray(latitudes, dtype=float)
+    )
+    inside = np.flatnonzero(distances <= radius_m)
+    if len(inside) > k:
+        inside = inside[np.argpartition(distances[inside], k - 1)[:k]]
+    ordered = inside[np.argsort(distances[inside], kind="stable")]
+    return [(ids[position], float(distances[position])) for position in ordered]
+
+
+def bbox_around(longitude: float, latitude: float, radius_m: float) -> BBox:
+    """Smallest lon/lat box containing every point within ``radius_m`` of the centre."""
+    d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    d_lon = d_lat / max(math.cos(math.radians(latitude)), 1e-6)
+    return (longitude - d_lon, latitude - d_lat, longitude + d_lon, latitude + d_lat)
+
+
+def cluster_cell(longitude: float, latitude: float, zoom: int) -> tuple[int, int]:
+    """Web Mercator cluster cell containing the point at ``zoom``."""
+    cells = CLUSTER_CELLS_PER_TILE << zoom
+    latitude = min(max(latitude, -MAX_MERCATOR_LATITUDE), MAX_MERCATOR_LATITUDE)
+    x = (longitude + 180.0) / 360.0
+    y = (1.0 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2.0
+    return min(math.floor(x * cells), cells - 1), min(math.floor(y * cells), cells - 1)
+
+
+def cluster_bounds(bbox: BBox, zoom: int) -> BBox:
+    """Outer edges of the cluster cells intersecting ``bbox``; whole cells are aggregated."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    cells = CLUSTER_CELLS_PER_TILE << zoom
+    min_x, min_y = cluster_cell(min_lon, max_lat, zoom)
+    max_x, max_y = cluster_cell(max_lon, min_lat, zoom)
+
+    def latitude(y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / cells))))
+
+    return (
+        min_x / cells * 360.0 - 180.0,
+        latitude(max_y + 1),
+        (max_x + 1) / cells * 360.0 - 180.0,
+        latitude(min_y),
+    )
+
+
+@dataclass(slots=True)
+class Cluster:
+    """Running aggregate of the rows in one cluster cell."""
+
+    count: int = 0
+    longitude_sum: float = 0.0
+    latitude_sum: float = 0.0
+    tags: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def longitude(self) -> float:
+        return self.longitude_sum / self.count
+
+    @property
+    def latitude(self) -> float:
+        return self.latitude_sum / self.count
+
+    def add(self, longitude: float, latitude: float, tag: str | None, weight: int = 1) -> None:
+        self.count += weight
+        self.longitude_sum += weight * longitude
+        self.latitude_sum += weight * latitude
+        if tag is not None:
+            remaining = self.tags.get(tag, 0) + weight
+            if remaining:
+                self.tags[tag] = remaining
+            else:
+                del self.tags[tag]
+
+
+class ClusterPyramid:
+    """Cluster aggregates for every zoom level from ``min_zoom`` to ``max_zoom``.
+
+    Each row contributes to one cell per level, so inserts and removals cost one update per
+    level and a query reads only the occupied cells of the requested level.
+    """
+
+    def __init__(self, min_zoom: int = 0, max_zoom: int = MAX_CLUSTER_ZOOM) -> None:
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self._levels: dict[int, dict[tuple[int, int], Cluster]] = {
+            zoom: {} for zoom in range(min_zoom, max_zoom + 1)
+        }
+
+    def add(self, longitude: float, latitude: float, tag: str | None = None) -> None:
+        for zoom, cells in self._levels.items():
+            key = cluster_cell(longitude, latitude, zoom)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = Cluster()
+            cell.add(longitude, latitude, tag)
+
+    def remove(self, longitude: float, latitude: float, tag: str | None = None) -> None:
+        for zoom, cells in self._levels.items():
+            key = cluster_cell(longitude, latitude, zoom)
+            cell = cells.get(key)
+            if cell is None:
+                continue
+            if cell.count <= 1:
+                del cells[key]
+            else:
+                cell.add(longitude, latitude, tag, weight=-1)
+
+    def clear(self) -> None:
+        for cells in self._levels.values():
+            cells.clear()
+
+    def query(self, bbox: BBox, zoom: int) -> list[Cluster]:
+        cells = self._levels[zoom]
+        min_lon, min_lat, max_lon, max_lat = bbox
+        # Mercator y grows southwards.
+        min_x, min_y = cluster_cell(min_lon, max_lat, zoom)
+        max_x, max_y = cluster_cell(max_lon, min_lat, zoom)
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(cells):
+            return [
+                cell
+                for (x, y), cell in cells.items()
+                if min_x <= x <= max_x and min_y <= y <= max_y
+            ]
+        keys = ((x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1))
+        return [cells[key] for key in keys if key in cells]
+
+
+def cluster_points(
+    points: Iterable[tuple[float, float, str | None]], bbox: BBox, zoom: int
+) -> list[Cluster]:
+    """Aggregate ``(longitude, latitude, tag)`` rows into the cells of one zoom level."""
+    level = ClusterPyramid(zoom, zoom)
+    for longitude, latitude, tag in points:
+        level.add(longitude, latitude, tag)
+    return level.query(bbox, zoom)
+
+
+class GridIndex:
+    """Uniform longitude/latitude grid mapping cells to row ids.
+
+    The index is loaded lazily from the database on first use and then kept current by
+    the repository write methods, so bbox and nearby lookups never touch the table.
+    """
+
+    def __init__(
+        self, cell_size: float = 0.05, clustered: bool = False, faceted: bool = False
+    ) -> None:
+        self.cell_size = cell_size
+        # Zoomed-out map clusters, maintained alongside the cells when enabled.
+        self._clusters = ClusterPyramid() if clustered else None
+        # Rows per tag for each cell and overall, maintained alongside the cells when enabled.
+        self._facets: dict[tuple[int, int], Counter[str]] | None = {} if faceted else None
+        self._facet_totals: Counter[str] = Counter()
+        self._cells: dict[tuple[int, int], set[int]] = {}
+        self._points: dict[int, tuple[float, float]] = {}
+        self._tags: dict[int, str | None] = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+        # Bumped by invalidate(), so a load that raced an invalidation is not installed.
+        self._generation = 0
+        # Held by the one reader reloading; set once there is a snapshot others can serve.
+        self._reload = threading.Lock()
+        self._populated = False
+        # Latest write per row since the index went stale, replayed on top of the next snapshot.
+        self._journal: dict[int, tuple[float, float, str | None] | None] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def populated(self) -> bool:
+        """Whether there is a snapshot to serve, possibly a stale one."""
+        return self._populated
+
+    def ensure_loaded(self, loader: Callable[[], Iterable[IndexRow]]) -> None:
+        # The loader runs without the lock (it may wait on I/O); writes that race it are
+        # journaled and replayed by load(). An invalidation that races it forces a reread.
+        while not self._loaded:
+            # Blocks only for the first load; a stale snapshot is served while one reloads.
+            if not self._reload.acquire(blocking=not self._populated):
+                return
+            try:
+                generation = self._generation
+                if not self._loaded:
+                    self.install(list(loader()), generation)
+            finally:
+                self._reload.release()
+
+    async def ensure_loaded_async(
+        self, loader: Callable[[], Awaitable[Iterable[IndexRow]]]
+    ) -> None:
+        """``ensure_loaded`` for the event loop: never waits for a reload in another thread.
+
+        Until the first load completes elsewhere, ``populated`` stays False and callers fall
+        back to the database.
+        """
+        while not self._loaded:
+            if not self._reload.acquire(blocking=False):
+                return
+            try:
+                generation = self._generation
+                if not self._loaded:
+                    self.install(list(await loader()), generation)
+            finally:
+                self._reload.release()
+
+    def install(self, rows: Iterable[IndexRow], generation: int) -> None:
+        """Load ``rows``, read at ``generation``, unless the index was invalidated since."""
+        with self._lock:
+            if not self._loaded and generation == self._generation:
+                self.load(rows)
+
+    def load(self, rows: Iterable[IndexRow]) -> None:
+        with self._lock:
+            self._cells.clear()
+            self._points.clear()
+            self._tags.clear()
+            if self._clusters is not None:
+                self._clusters.clear()
+            if self._facets is not None:
+                self._facets.clear()
+                self._facet_totals.clear()
+            for row_id, longitude, latitude, *tag in rows:
+                self._insert(row_id, longitude, latitude, tag[0] if tag else None)
+            for row_id, entry in self._journal.items():
+                self._discard(row_id)
+                if entry is not None:
+                    self._insert(row_id, *entry)
+            self._journal.clear()
+            self._loaded = True
+            self._populated = True
+
+    def invalidate(self) -> None:
+        # Readers keep the stale contents until the next ensure_loaded() swaps in a snapshot.
+        with self._lock:
+            self._journal.clear()
+            self._loaded = False
+            self._generation += 1
+
+    def upsert(self, row_id: int, longitude: float, latitude: float, tag: str | None = None) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._journal[row_id] = (longitude, latitude, tag)
+            self._discard(row_id)
+            self._insert(row_id, longitude, latitude, tag)
+
+    def remove(self, row_id: int) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._journal[row_id] = None
+            self._discard(row_id)
+
+    def query(self, bbox: BBox, tag: str | None = None) -> list[int]:
+        return self._candidates(bbox, tag)[0]
+
+    def clusters(self, bbox: BBox, zoom: int) -> list[Cluster]:
+        """Clusters of the cells at ``zoom`` that intersect ``bbox``."""
+        with self._lock:
+            if self._clusters is not None and zoom <= self._clusters.max_zoom:
+                # Copies: the live aggregates keep changing once the lock is released.
+                return [
+                    Cluster(cell.count, cell.longitude_sum, cell.latitude_sum, dict(cell.tags))
+                    for cell in self._clusters.query(bbox, zoom)
+                ]
+            ids, longitudes, latitudes = self._candidates(cluster_bounds(bbox, zoom), None)
+            tags = [self._tags.get(row_id) for row_id in ids]
+        return cluster_points(zip(longitudes, latitudes, tags), bbox, zoom)
+
+    def facets(self, bbox: BBox | None = None) -> dict[str, int]:
+        """Rows per tag, within ``bbox`` when given; requires ``faceted``."""
+        if self._facets is None:
+            raise ValueError("Index does not keep facet counts")
+        with self._lock:
+            if bbox is None:
+                return dict(self._facet_totals)
+            min_lon, min_lat, max_lon, max_lat = bbox
+            min_x, min_y = self._cell(min_lon, min_lat)
+            max_x, max_y = self._cell(max_lon, max_lat)
+            counts: Counter[str] = Counter()
+            for key in self._cell_keys(bbox):
+                if min_x < key[0] < max_x and min_y < key[1] < max_y:
+                    # Interior cells lie wholly inside the bbox: their counts apply as is.
+                    counts.update(self._facets.get(key, {}))
+                    continue
+                for row_id in self._cells.get(key, ()):
+                    longitude, latitude = self._points[row_id]
+                    tag = self._tags.get(row_id)
+                    if tag is None or not (min_lon <= longitude <= max_lon):
+                        continue
+                    if min_lat <= latitude <= max_lat:
+                        counts[tag] += 1
+        return dict(counts)
+
+    def nearest(
+        self,
+        longitude: float,
+        latitude: float,
+        radius_m: float,
+        k: int,
+        tag: str | None = None,
+    ) -> list[tuple[int, float]]:
+        """The ``k`` rows closest to the point within ``radius_m``, as ``(id, distance_m)``."""
+        # Start around one cell and widen: once k rows lie within the searched radius, nothing
+        # outside it can be closer, so dense areas never rank more than a few cells.
+        search_m = min(radius_m, self.cell_size * 111_320)
+        while True:
+            ids, longitudes, latitudes = self._candidates(
+                bbox_around(longitude, latitude, search_m), tag
+            )
+            ranked = rank_nearest(ids, longitudes, latitudes, longitude, latitude, search_m, k)
+            if len(ranked) >= k or search_m >= radius_m:
+                return ranked
+            search_m = min(search_m * 4, radius_m)
+
+    def _candidates(
+        self, bbox: BBox, tag: str | None
+    ) -> tuple[list[int], list[float], list[float]]:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        ids: list[int] = []
+        longitudes: list[float] = []
+        latitudes: list[float] = []
+        with self._lock:
+            for key in self._cell_keys(bbox):
+                for row_id in self._cells.get(key, ()):
+                    if tag is not None and self._tags.get(row_id) != tag:
+                        continue
+                    longitude, latitude = self._points[row_id]
+                    if min_lon <= longitude <= max_lon and min_lat <= latitude <= max_lat:
+                        ids.append(row_id)
+                        longitudes.append(longitude)
+                        latitudes.append(latitude)
+        return ids, longitudes, latitudes
+
+    def _cell_keys(self, bbox: BBox) -> list[tuple[int, int]]:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        min_x, min_y = self._cell(min_lon, min_lat)
+        max_x, max_y = self._cell(max_lon, max_lat)
+        span = (max_x - min_x + 1) * (max_y - min_y + 1)
+        if span > len(self._cells):
+            # Zoomed-out views cover more cells than are occupied; walk the occupied ones.
+            return [
+                key for key in self._cells if min_x <= key[0] <= max_x and min_y <= key[1] <= max_y
+            ]
+        return [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+    def _cell(self, longitude: float, latitude: float) -> tuple[int, int]:
+        return math.floor(longitude / self.cell_size), math.floor(latitude / self.cell_size)
+
+    def _insert(self, row_id: int, longitude: float, latitude: float, tag: str | None = None) -> None:
+        self._points[row_id] = (longitude, latitude)
+        if tag is not None:
+            self._tags[row_id] = tag
+        key = self._cell(longitude, latitude)
+        self._cells.setdefault(key, set()).add(row_id)
+        if self._clusters is not None:
+            self._clusters.add(longitude, latitude, tag)
+        if self._facets is not None and tag is not None:
+            self._facets.setdefault(key, Counter())[tag] += 1
+            self._facet_totals[tag] += 1
+
+    def _discard(self, row_id: int) -> None:
+        point = self._points.pop(row_id, None)
+        tag = self._tags.pop(row_id, None)
+        if point is None:
+            return
+        if self._clusters is not None:
+            self._clusters.remove(*point, tag)
+        key = self._cell(*point)
+        bucket = self._cells.get(key)
+        if bucket is not None:
+            bucket.discard(row_id)
+            if not bucket:
+                del self._cells[key]
+        if self._facets is not None and tag is not None:
+            _decrement(self._facets[key], tag)
+            if not self._facets[key]:
+                del self._facets[key]
+            _decrement(self._facet_totals, tag)
+
+
+def _decrement(counts: Counter[str], tag: str) -> None:
+    counts[tag] -= 1
+    if not counts[tag]:
+        del counts[tag]
+
+
+_settings = get_settings()
+
+poi_index = GridIndex(_settings.spatial_index_cell_size)
+property_index = GridIndex(_settings.spatial_index_cell_size)
+# Published rows only, for the discovery endpoints: nearby, map clusters and category facets.
+published_poi_index = GridIndex(_settings.spatial_index_cell_size, clustered=True, faceted=True)
+published_property_index = GridIndex(_settings.spatial_index_cell_size)
@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from collections.abc import Callable, Collection, Iterable, Sequence
+
+import numpy as np
+
+# (id, texts in the index's field order, optional tag such as the POI category).
+TextRow = tuple[int, Sequence[str | None], str | None]
+# (id, name, popularity)
+NameRow = tuple[int, str, int]
+
+TOKEN = re.compile(r"\w+")
+# Lookups spanning more keys than this are cached until a write touches them; they come from
+# the first keystrokes, which every user repeats.
+PREFIX_CACHE_SPAN = 256
+# BM25 term frequency saturation and document length normalisation.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def fold(text: str) -> str:
+    """Case- and accent-insensitive form of ``text`` used for matching."""
+    if text.isascii():
+        return text.lower()
+    # Accents on Latin letters are dropped; the combining signs of other scripts (Sinhala,
+    # Tamil vowel signs) are part of the letter and stay.
+    kept: list[str] = []
+    base = ""
+    for char in unicodedata.normalize("NFKD", text.casefold()):
+        if unicodedata.combining(char) and base.isascii():
+            continue
+        if not unicodedata.combining(char):
+            base = char
+        kept.append(char)
+    return unicodedata.normalize("NFC", "".join(kept))
+
+
+def tokenize(text: str | None) -> list[str]:
+    return TOKEN.findall(fold(text)) if text else []
+
+
+class TextIndex:
+    """In-memory inverted index ranking rows by BM25 over weighted text fields.
+
+    Like ``GridIndex`` it is loaded lazily from the database on first use and then kept
+    current by the repository write methods. Rows occupy dense slots so a search scores
+    the posting lists of the query terms with a few vectorised passes.
+    """
+
+    def __init__(self, weights: Sequence[float]) -> None:
+        # One weight per indexed field: a term in a heavier field counts as several.
+        self.weights = tuple(weights)
+        self._postings: dict[str, dict[int, float]] = {}
+        # Posting lists as (slots, frequencies) arrays, rebuilt after the term changes.
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._slots: dict[int, int] = {}
+        self._terms: dict[int, dict[str, float]] = {}
+        self._free: list[int] = []
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._lengths = np.zeros(0)
+        self._tags = np.zeros(0, dtype=np.int32)
+        self._tag_codes: dict[str | None, int] = {None: 0}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+        self._loaded = False
+        # Bumped by invalidate(), so a load that raced an invalidation is not installed.
+        self._generation = 0
+        # Held by the one reader reloading; set once there is a snapshot others can serve.
+        self._reload = threading.Lock()
+        self._populated = False
+        # Latest write per row since the index went stale, replayed on top of the next snapshot.
+        self._journal: dict[int, tuple[Sequence[str | None], str | None] | None] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def populated(self) -> bool:
+        """Whether there is a snapshot to serve, possibly a stale one."""
+        return self._populated
+
+    def ensure_loaded(self, loader: Callable[[], Iterable[TextRow]]) -> None:
+        while not self._loaded:
+            # Blocks only for the first load; a stale snapshot is served while one reloads.
+            if not self._reload.acquire(blocking=not self._populated):
+                return
+            try:
+                generation = self._generation
+                if not self._loaded:
+                    self.install(list(loader()), generation)
+            finally:
+                self._reload.release()
+
+    def install(self, rows: Iterable[TextRow], generation: int) -> None:
+        """Load ``rows``, read at ``generation``, unless the index was invalidated since."""
+        with self._lock:
+            if not self._loaded and generation == self._generation:
+                self.load(rows)
+
+    def load(self, rows: Iterable[TextRow]) -> None:
+        with self._lock:
+            self._clear()
+            for row_id, texts, tag in rows:
+                self._insert(row_id, texts, tag)
+            for row_id, entry in self._journal.items():
+                self._discard(row_id)
+                if entry is not None:
+                    self._insert(row_id, *entry)
+            self._journal.clear()
+            self._loaded = True
+            self._populated = True
+
+    def invalidate(self) -> None:
+        # Readers keep the stale contents until the next ensure_loaded() swaps in a snapshot.
+        with self._lock:
+            self._journal.clear()
+            self._loaded = False
+            self._generation += 1
+
+    def upsert(self, row_id: int, texts: Sequence[str | None], tag: str | None = None) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._journal[row_id] = (tuple(texts), tag)
+            self._discard(row_id)
+            self._insert(row_id, texts, tag)
+
+    def remove(self, row_id: int) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._journal[row_id] = None
+            self._discard(row_id)
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        tag: str | None = None,
+        allowed: Collection[int] | None = None,
+    ) -> list[tuple[int, float]]:
+        """Best ``limit`` rows matching any term of ``query`` as ``(id, score)``, best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._slots)
+            if not count or not terms:
+                return []
+            scale = count / self._total_length if self._total_length else 0.0
+            norms = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths * scale)
+            scores = np.zeros(len(self._ids))
+            for term in terms:
+                if term not in self._postings:
+                    continue
+                slots, frequencies = self._posting_arrays(term)
+                idf = math.log(1 + (count - len(slots) + 0.5) / (len(slots) + 0.5))
+                scores[slots] += idf * frequencies * (BM25_K1 + 1) / (frequencies + norms[slots])
+            if tag is not None:
+                scores[self._tags != self._tag_codes.get(tag, -1)] = 0.0
+            if allowed is not None:
+                keep = [self._slots[row_id] for row_id in allowed if row_id in self._slots]
+                mask = np.zeros(len(scores), dtype=bool)
+                mask[keep] = True
+                scores[~mask] = 0.0
+            matches = np.flatnonzero(scores)
+            if matches.size > limit:
+                matches = matches[np.argpartition(-scores[matches], limit - 1)[:limit]]
+            # Ties go to the lower id so results are stable between calls.
+            order = np.lexsort((self._ids[matches], -scores[matches]))
+            return [
+                (int(self._ids[slot]), float(scores[slot])) for slot in matches[order][:limit]
+            ]
+
+    def _posting_arrays(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=float, count=len(postings)),
+            )
+            self._arrays[term] = arrays
+        return arrays
+
+    def _clear(self) -> None:
+        self._postings.clear()
+        self._arrays.clear()
+        self._slots.clear()
+        self._terms.clear()
+        self._free.clear()
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._lengths = np.zeros(0)
+        self._tags = np.zeros(0, dtype=np.int32)
+        self._total_length = 0.0
+
+    def _insert(self, row_id: int, texts: Sequence[str | None], tag: str | None) -> None:
+        frequencies: Counter[str] = Counter()
+        for text, weight in zip(texts, self.weights):
+            for term in tokenize(text):
+                frequencies[term] += weight
+        slot = self._claim()
+        terms = dict(frequencies)
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[slot] = frequency
+            self._arrays.pop(term, None)
+        length = sum(terms.values())
+        self._slots[row_id] = slot
+        self._terms[slot] = terms
+        self._ids[slot] = row_id
+        self._lengths[slot] = length
+        self._tags[slot] = self._tag_codes.setdefault(tag, len(self._tag_codes))
+        self._total_length += length
+
+    def _discard(self, row_id: int) -> None:
+        slot = self._slots.pop(row_id, None)
+        if slot is None:
+            return
+        for term in self._terms.pop(slot):
+            postings = self._postings[term]
+            del postings[slot]
+            self._arrays.pop(term, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths[slot]
+        self._lengths[slot] = 0.0
+        self._free.append(slot)
+
+    def _claim(self) -> int:
+        if self._free:
+            return self._free.pop()
+        slot = len(self._slots)
+        if slot == len(self._ids):
+            # Grown geometrically so loading n rows copies the arrays O(log n) times.
+            size = max(64, 2 * slot)
+            self._ids = np.resize(self._ids, size)
+            self._lengths = np.resize(self._lengths, size)
+            self._tags = np.resize(self._tags, size)
+        return slot
+
+
+class PrefixIndex:
+    """Sorted array of folded names answering prefix lookups by binary search.
+
+    Every word of a name starts a key, so "tooth" finds "Temple of the Tooth". Matches
+    rank by popularity, then names starting with the prefix, then name. Loaded lazily and
+    kept current by the repository write methods like ``TextIndex``.
+    """
+
+    def __init__(self) -> None:
+        self._keys: list[tuple[str, int]] = []
+        self._rows: dict[int, tuple[str, int, list[str]]] = {}
+        self._cache: dict[tuple[str, int], list[NameRow]] = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+        # Bumped by invalidate(), so a load that raced an invalidation is not installed.
+        self._generation = 0
+        # Held by the one reader reloading; set once there is a snapshot others can serve.
+        self._reload = threading.Lock()
+        self._populated = False
+        # Latest write per row since the index went stale, replayed on top of the next snapshot.
+        self._journal: dict[int, str | None] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def populated(self) -> bool:
+        """Whether there is a snapshot to serve, possibly a stale one."""
+        return self._populated
+
+    def ensure_loaded(self, loader: Callable[[], Iterable[NameRow]]) -> None:
+        while not self._loaded:
+            # Blocks only for the first load; a stale snapshot is served while one reloads.
+            if not self._reload.acquire(blocking=not self._populated):
+                return
+            try:
+                generation = self._generation
+                if not self._loaded:
+                    self.install(list(loader()), generation)
+            finally:
+                self._reload.release()
+
+    def install(self, rows: Iterable[NameRow], generation: int) -> None:
+        """Load ``rows``, read at ``generation``, unless the index was invalidated since."""
+        with self._lock:
+            if not self._loaded and generation == self._generation:
+                self.load(rows)
+
+    def load(self, rows: Iterable[NameRow]) -> None:
+        with self._lock:
+            self._rows.clear()
+            self._cache.clear()
+            keys = []
+            for row_id, name, popularity in rows:
+                words = _word_keys(name)
+                self._rows[row_id] = (name, popularity, words)
+                keys.extend((key, row_id) for key in words)
+            keys.sort()
+            self._keys = keys
+            for row_id, name in self._journal.items():
+                self._replace(row_id, name)
+            self._journal.clear()
+            self._loaded = True
+            self._populated = True
+
+    def invalidate(self) -> None:
+        # Readers keep the stale contents until the next ensure_loaded() swaps in a snapshot.
+        with self._lock:
+            self._journal.clear()
+            self._loaded = False
+            self._generation += 1
+
+    def upsert(self, row_id: int, name: str) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._journal[row_id] = name
+            self._replace(row_id, name)
+
+    def remove(self, row_id: int) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._journal[row_id] = None
+            self._discard(row_id)
+
+    def suggest(self, prefix: str, limit: int) -> list[NameRow]:
+        """Up to ``limit`` rows with a name word starting with ``prefix``, best first."""
+        folded = " ".join(fold(prefix).split())
+        if not folded:
+            return []
+        with self._lock:
+            cached = self._cache.get((folded, limit))
+            if cached is not None:
+                return cached
+            low = bisect.bisect_left(self._keys, (folded,))
+            high = bisect.bisect_left(self._keys, (folded + "\U0010ffff",), low)
+            best: dict[int, bool] = {}
+            for key, row_id in self._keys[low:high]:
+                # True when the match is the start of the name rather than a later word.
+                best[row_id] = best.get(row_id, False) or key == self._rows[row_id][2][0]
+            ranked = heapq.nsmallest(
+                limit,
+                best,
+                key=lambda row_id: (-self._rows[row_id][1], not best[row_id], self._rows[row_id][0]),
+            )
+            result = [(row_id, *self._rows[row_id][:2]) for row_id in ranked]
+            if high - low > PREFIX_CACHE_SPAN:
+                self._cache[(folded, limit)] = result
+            return result
+
+    def _replace(self, row_id: int, name: str | None) -> None:
+        # Renames keep the popularity, which comes from the database load.
+        previous = self._rows.get(row_id)
+        self._discard(row_id)
+        if name is not None:
+            self._insert(row_id, name, previous[1] if previous else 0)
+
+    def _insert(self, row_id: int, name: str, popularity: int) -> None:
+        words = _word_keys(name)
+        self._rows[row_id] = (name, popularity, words)
+        for key in words:
+            bisect.insort(self._keys, (key, row_id))
+        self._forget_cached(words)
+
+    def _discard(self, row_id: int) -> None:
+        row = self._rows.pop(row_id, None)
+        if row is None:
+            return
+        for key in row[2]:
+            position = bisect.bisect_left(self._keys, (key, row_id))
+            del self._keys[position]
+        self._forget_cached(row[2])
+
+    def _forget_cached(self, words: list[str]) -> None:
+        # Only lookups whose prefix one of the changed keys starts with can differ.
+        stale = [entry for entry in self._cache if any(key.startswith(entry[0]) for key in words)]
+        for entry in stale:
+            del self._cache[entry]
+
+
+def _word_keys(name: str) -> list[str]:
+    # The folded name from each word onwards, whole name first.
+    folded = " ".join(fold(name).split())
+    return list(dict.fromkeys(folded[match.start() :] for match in TOKEN.finditer(folded)))
+
+
+# name, category, description
+poi_text_index = TextIndex((3.0, 2.0, 1.0))
+# name, address
+property_text_index = TextIndex((3.0, 1.0))
+
+poi_suggest_index = PrefixIndex()
+property_suggest_index = PrefixIndex()
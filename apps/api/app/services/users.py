@@ -1,22 +1,157 @@
 from __future__ import annotations
 
-from sqlalchemy import select
+import logging
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from ..core.config import get_settings
 from ..models import User
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Detached copy of the columns request handlers read from the current user."""
+
+    id: int
+    firebase_uid: str
+    email: str | None = None
+    full_name: str | None = None
+    locale: str | None = None
+
+    @classmethod
+    def from_model(cls, user: User) -> UserSnapshot:
+        return cls(
+            id=user.id,
+            firebase_uid=user.firebase_uid,
+            email=user.email,
+            full_name=user.full_name,
+            locale=user.locale,
+        )
+
+
+class LastLoginRecorder:
+    """Buffers ``last_login_at`` stamps and writes them with one batched UPDATE.
+
+    Each user is stamped at most once per ``min_interval`` seconds; pending stamps are
+    flushed once ``flush_interval`` seconds have passed or ``max_pending`` accumulate.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 300.0,
+        flush_interval: float = 30.0,
+        max_pending: int = 500,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.min_interval = min_interval
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._clock = clock
+        self._pending: dict[int, datetime] = {}
+        self._stamped: dict[int, float] = {}
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+
+    def touch(self, user_id: int) -> None:
+        now = self._clock()
+        with self._lock:
+            if now - self._stamped.get(user_id, float("-inf")) < self.min_interval:
+                return
+            self._stamped[user_id] = now
+            self._pending[user_id] = datetime.fromtimestamp(now, tz=timezone.utc)
+
+    def due(self) -> bool:
+        if not self._pending:
+            return False
+        elapsed = self._clock() - self._last_flush
+        return len(self._pending) >= self.max_pending or elapsed >= self.flush_interval
+
+    def flush(self, db: Session) -> int:
+        now = self._clock()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = now
+            cutoff = now - self.min_interval
+            self._stamped = {uid: at for uid, at in self._stamped.items() if at > cutoff}
+        if not pending:
+            return 0
+        db.execute(
+            update(User),
+            [{"id": user_id, "last_login_at": at} for user_id, at in pending.items()],
+        )
+        db.commit()
+        return len(pending)
 
 
 class UserService:
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        cache: TTLCache[str, UserSnapshot] | None = None,
+        logins: LastLoginRecorder | None = None,
+    ):
         self.db = db
+        self.cache = cache
+        self.logins = logins
+
+    def current(
+        self, firebase_uid: str, email: str | None = None, full_name: str | None = None
+    ) -> UserSnapshot:
+        snapshot = self.cache.get(firebase_uid) if self.cache is not None else None
+        if snapshot is None:
+            snapshot = UserSnapshot.from_model(self.get_or_create(firebase_uid, email, full_name))
+            if self.cache is not None:
+                self.cache.set(firebase_uid, snapshot)
+        if self.logins is not None:
+            self.logins.touch(snapshot.id)
+            if self.logins.due():
+                try:
+                    self.logins.flush(self.db)
+                except SQLAlchemyError:
+                    # Login stamps are best effort and must never fail the request.
+                    self.db.rollback()
+                    logger.warning("Failed to flush last_login_at updates", exc_info=True)
+        return snapshot
 
     def get_or_create(self, firebase_uid: str, email: str | None = None, full_name: str | None = None) -> User:
-        stmt = select(User).where(User.firebase_uid == firebase_uid)
-        user = self.db.scalars(stmt).first()
+        user = self._find(firebase_uid)
         if user:
             return user
         user = User(firebase_uid=firebase_uid, email=email, full_name=full_name)
         self.db.add(user)
-        self.db.commit()
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # A concurrent first login inserted the same uid; use the row it created.
+            self.db.rollback()
+            user = self._find(firebase_uid)
+            if user is None:
+                raise
+            return user
         self.db.refresh(user)
         return user
+
+    def _find(self, firebase_uid: str) -> User | None:
+        stmt = select(User).where(User.firebase_uid == firebase_uid)
+        return self.db.scalars(stmt).first()
+
+
+_settings = get_settings()
+
+user_cache: TTLCache[str, UserSnapshot] = TTLCache(
+    _settings.user_cache_size, ttl=_settings.user_cache_ttl_seconds
+)
+last_logins = LastLoginRecorder(
+    min_interval=_settings.last_login_interval_seconds,
+    flush_interval=_settings.last_login_flush_seconds,
+)
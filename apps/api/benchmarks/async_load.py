@@ -0,0 +1,114 @@
+"""Throughput and tail latency of the read routes with DATABASE_ASYNC off and on.
+
+Starts one uvicorn worker per mode against the same seeded SQLite file and drives it with
+concurrent listing and detail requests. Run from ``apps/api``:
+``python -m benchmarks.async_load``
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models import Base
+
+from .catalogue_stream import seed
+
+PORT = 8765
+CONCURRENCY = 64
+REQUESTS = 1_000
+
+
+def start_server(database_path: Path, async_mode: bool) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "ENVIRONMENT": "test",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite+pysqlite:///{database_path}",
+        "DATABASE_ASYNC": "true" if async_mode else "false",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/health").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def drive() -> tuple[float, list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+    paths = [
+        "/pois/?limit=100&bbox=80.2,6.5,80.9,7.5",
+        "/pois/?limit=50&fields=name,latitude,longitude",
+        "/pois/42",
+    ]
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for n in range(REQUESTS):
+        queue.put_nowait(paths[n % len(paths)])
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while not queue.empty():
+            path = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                # The sync path can exhaust the connection pool while every worker thread
+                # waits on it; those requests fail with a pool timeout.
+                errors += 1
+
+    limits = httpx.Limits(max_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies, errors
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = Path(tmp) / "bench.db"
+        engine = create_engine(f"sqlite+pysqlite:///{database_path}")
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            seed(db)
+        engine.dispose()
+        for label, async_mode in (("sync", False), ("async", True)):
+            server = start_server(database_path, async_mode)
+            try:
+                elapsed, latencies, errors = asyncio.run(drive())
+            finally:
+                server.terminate()
+                server.wait()
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            print(
+                f"{label:>5}: {len(latencies) / elapsed:7.0f} req/s, "
+                f"p50 {statistics.median(latencies):6.1f} ms, p99 {p99:6.1f} ms, {errors} errors"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""End-to-end time of a Booking.com portability import served from a local HTTP server.
+
+Run from ``apps/api``: ``python -m benchmarks.booking_import``
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from sqlalchemy import insert
+
+from app.models import PartnerProperty, User
+from app.services.booking_import import BookingImporter
+
+from ._common import sqlite_sessions
+
+PROPERTIES = 2_000
+RESERVATIONS = 10_000
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+def seed(db) -> int:
+    db.execute(
+        insert(PartnerProperty),
+        [
+            {
+                "name": f"Hotel {n:04d} Lagoon View",
+                "photos": [],
+                "latitude": 6 + (n % 200) / 100,
+                "longitude": 80 + (n // 200) / 10,
+                "geom": f"POINT({80 + (n // 200) / 10} {6 + (n % 200) / 100})",
+            }
+            for n in range(PROPERTIES)
+        ],
+    )
+    user = User(firebase_uid="bench")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def export() -> bytes:
+    reservations = []
+    for n in range(RESERVATIONS):
+        hotel = n % PROPERTIES
+        reservations.append(
+            {
+                "reservation_id": f"R{n % (RESERVATIONS - 500)}",
+                "hotel_name": f"Hotel {hotel:04d} Lagoon View Resort",
+                "latitude": 6 + (hotel % 200) / 100 + 0.0005,
+                "longitude": 80 + (hotel // 200) / 10,
+                "check_in": "2024-03-01",
+                "check_out": "2024-03-04",
+            }
+        )
+    return json.dumps(reservations).encode()
+
+
+def main() -> None:
+    sessions = sqlite_sessions()
+    with sessions() as db:
+        user_id = seed(db)
+    with TemporaryDirectory() as tmp:
+        Path(tmp, "export.json").write_bytes(export())
+        handler = partial(QuietHandler, directory=tmp)
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        importer = BookingImporter()
+        progress = importer.start(user_id)
+        start = time.perf_counter()
+        importer.run(sessions, user_id, f"http://127.0.0.1:{httpd.server_port}/export.json", progress)
+        elapsed = time.perf_counter() - start
+        httpd.shutdown()
+    print(
+        f"{progress.state}: {progress.reservations} reservations in {elapsed:.2f} s "
+        f"({progress.imported} imported, {progress.matched} matched, {progress.duplicates} duplicates)"
+    )
+
+
+if __name__ == "__main__":
+    main()
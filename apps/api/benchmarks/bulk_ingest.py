@@ -0,0 +1,53 @@
+"""Rows per second for per-request POI creates vs the chunked CSV bulk ingest.
+
+Run from ``apps/api``: ``python -m benchmarks.bulk_ingest``
+"""
+
+from __future__ import annotations
+
+import io
+import time
+
+from app.api.ingest import CSV_MEDIA_TYPE, ingest, read_records
+from app.repositories.poi import PointOfInterestRepository
+from app.schemas.poi import POICreate
+
+from ._common import sqlite_sessions
+
+SINGLE_ROWS = 1_000
+BULK_ROWS = 20_000
+
+
+def csv_upload(rows: int) -> str:
+    lines = ["name,category,description,latitude,longitude,is_published"]
+    for n in range(rows):
+        lines.append(f"POI {n:05d},heritage,Imported row,{6 + (n % 300) / 100},{80 + (n % 170) / 100},true")
+    return "\n".join(lines) + "\n"
+
+
+def main() -> None:
+    sessions = sqlite_sessions()
+    with sessions() as db:
+        repository = PointOfInterestRepository(db)
+        payloads = [
+            POICreate(name=f"POI {n:05d}", category="heritage", latitude=7.0, longitude=80.5)
+            for n in range(SINGLE_ROWS)
+        ]
+        start = time.perf_counter()
+        for payload in payloads:
+            repository.create(payload)
+        elapsed = time.perf_counter() - start
+        print(f"  single: {SINGLE_ROWS / elapsed:8.0f} rows/s")
+
+    upload = csv_upload(BULK_ROWS)
+    with sessions() as db:
+        repository = PointOfInterestRepository(db)
+        start = time.perf_counter()
+        records = read_records(io.StringIO(upload), CSV_MEDIA_TYPE)
+        result = ingest(records, POICreate, repository.bulk_create)
+        elapsed = time.perf_counter() - start
+        print(f"    bulk: {result.inserted / elapsed:8.0f} rows/s ({len(result.rejected)} rejected)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Peak memory and time to first byte of buffered vs streamed catalogue listings.
+
+Run from ``apps/api``: ``python -m benchmarks.catalogue_stream``
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import tracemalloc
+
+from sqlalchemy import insert
+
+from app.api.streaming import NDJSON_MEDIA_TYPE, encode_rows, model_encoder
+from app.models import PointOfInterest
+from app.repositories.poi import PointOfInterestRepository
+from app.schemas.poi import POIRead
+
+from ._common import sqlite_sessions
+
+ROWS = 20_000
+
+
+def seed(db) -> None:
+    db.execute(
+        insert(PointOfInterest),
+        [
+            {
+                "name": f"POI {n:05d}",
+                "category": "heritage",
+                "description": "x" * 512,
+                "photos": [],
+                "latitude": 6 + (n % 300) / 100,
+                "longitude": 80 + (n % 170) / 100,
+                "geom": f"POINT({80 + (n % 170) / 100} {6 + (n % 300) / 100})",
+            }
+            for n in range(ROWS)
+        ],
+    )
+    db.commit()
+
+
+def buffered(repository: PointOfInterestRepository) -> tuple[float, int]:
+    start = time.perf_counter()
+    body = json.dumps([POIRead.model_validate(poi).model_dump(mode="json") for poi in repository.list()])
+    return time.perf_counter() - start, len(body)
+
+
+def streamed(repository: PointOfInterestRepository) -> tuple[float, int]:
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    for chunk in encode_rows(repository.stream(), model_encoder(POIRead), NDJSON_MEDIA_TYPE):
+        first_byte = first_byte or time.perf_counter() - start
+        size += len(chunk)
+    return first_byte or 0.0, size
+
+
+def main() -> None:
+    sessions = sqlite_sessions()
+    with sessions() as db:
+        seed(db)
+    for label, run in (("buffered", buffered), ("streamed", streamed)):
+        with sessions() as db:
+            tracemalloc.start()
+            first_byte, size = run(PointOfInterestRepository(db))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        print(f"{label:>9}: first byte {first_byte * 1000:8.1f} ms, peak {peak / 2**20:7.1f} MiB, {size / 2**20:.1f} MiB body")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Latency and size of /pois/clusters over 100k POIs: pyramid vs SQL aggregation.
+
+Run from ``apps/api``: ``python -m benchmarks.clusters``
+"""
+
+from __future__ import annotations
+
+from app.repositories.poi import PointOfInterestRepository
+from app.services.spatial_index import GridIndex
+
+from ._common import measure, sqlite_sessions
+from .nearby import seed
+
+VIEWS = {
+    "island": ((79.5, 5.9, 81.9, 9.9), 7),
+    "province": ((79.8, 6.7, 80.4, 7.2), 10),
+    "town": ((79.84, 6.90, 79.88, 6.95), 15),
+}
+
+
+def main() -> None:
+    sessions = sqlite_sessions()
+    with sessions() as db:
+        seed(db)
+        index = GridIndex(0.05, clustered=True)
+        for label, repository in (
+            ("pyramid", PointOfInterestRepository(db, published_index=index)),
+            ("sql", PointOfInterestRepository(db)),
+        ):
+            repository.clusters(VIEWS["island"][0], 0)
+            for view, (bbox, zoom) in VIEWS.items():
+                clusters = repository.clusters(bbox, zoom)
+                elapsed = measure(lambda r=repository, b=bbox, z=zoom: r.clusters(b, z), repeat=20)
+                print(
+                    f"{label:>7}: {view:<8} zoom {zoom:>2}: {elapsed:8.2f} ms, "
+                    f"{len(clusters):>4} clusters, {sum(c.count for c in clusters):>6} POIs"
+                )
+        update_ms = measure(lambda: index.upsert(1, 80.0, 7.0, "beach"), repeat=200)
+        print(f"incremental upsert: {update_ms * 1000:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Time and bytes of a full catalogue page vs a revalidated 304 through the ASGI app.
+
+Run from ``apps/api``: ``python -m benchmarks.conditional_get``
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+_DATABASE = os.path.join(tempfile.mkdtemp(), "conditional.db")
+os.environ.setdefault("ENVIRONMENT", "test")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+pysqlite:///{_DATABASE}")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Base  # noqa: E402
+
+from ._common import measure  # noqa: E402
+from .catalogue_stream import seed  # noqa: E402
+
+
+def main() -> None:
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        seed(db)
+    with TestClient(app) as client:
+        for path in ("/pois/?limit=500", "/pois/?limit=500&bbox=80.0,6.0,80.5,6.5", "/pois/42"):
+            full = client.get(path)
+            headers = {"If-None-Match": full.headers["etag"]}
+            assert client.get(path, headers=headers).status_code == 304
+            full_ms = measure(lambda p=path: client.get(p), repeat=20)
+            revalidated_ms = measure(lambda p=path, h=headers: client.get(p, headers=h), repeat=20)
+            print(
+                f"{path:<42} 200: {full_ms:6.2f} ms {len(full.content) / 1024:7.1f} KiB"
+                f"   304: {revalidated_ms:6.2f} ms 0 KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
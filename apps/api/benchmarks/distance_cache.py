@@ -0,0 +1,43 @@
+"""Batched trip lookups against the distance cache, and the size of its saved matrix.
+
+Run from ``apps/api``: ``python -m benchmarks.distance_cache``
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import tempfile
+
+from app.services.distance_cache import DistanceCache, place_distances
+
+from ._common import measure
+
+CAPACITY = 1024
+
+
+def main() -> None:
+    rng = random.Random(5)
+    catalogue = [
+        ("poi", row_id, rng.uniform(79.7, 81.9), rng.uniform(5.9, 9.9)) for row_id in range(CAPACITY)
+    ]
+    path = os.path.join(tempfile.mkdtemp(), "distances.npz")
+    cache = DistanceCache(CAPACITY, path)
+    seed_ms = measure(lambda: cache.seed(catalogue), repeat=5)
+    for stops in (20, 200):
+        trip = rng.sample(catalogue, stops)
+        uncached_ms = measure(lambda t=trip: place_distances(t), repeat=50)
+        cached_ms = measure(lambda t=trip: cache.lookup(t), repeat=50)
+        print(f"{stops:>3} stops: uncached {uncached_ms:6.3f} ms, cached {cached_ms:6.3f} ms")
+    save_ms = measure(cache.save, repeat=3)
+    restored = DistanceCache(CAPACITY, path)
+    load_ms = measure(restored.load, repeat=3)
+    print(
+        f"seed {CAPACITY} points: {seed_ms:.1f} ms; save {save_ms:.1f} ms, load {load_ms:.1f} ms, "
+        f"{os.path.getsize(path) / 1024 / 1024:.1f} MiB on disk "
+        f"({CAPACITY * CAPACITY * 4 / 1024 / 1024:.1f} MiB in memory)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Latency of category facet counts over 100k published POIs: faceted grid vs GROUP BY.
+
+Run from ``apps/api``: ``python -m benchmarks.facets``
+"""
+
+from __future__ import annotations
+
+from app.repositories.poi import PointOfInterestRepository
+from app.services.spatial_index import GridIndex
+
+from ._common import measure, sqlite_sessions
+from .nearby import seed
+
+VIEWS = {
+    "catalogue": None,
+    "island": (79.5, 5.9, 81.9, 9.9),
+    "district": (79.8, 6.8, 80.2, 7.1),
+    "city": (79.84, 6.9, 79.88, 6.94),
+}
+
+
+def main() -> None:
+    sessions = sqlite_sessions()
+    with sessions() as db:
+        seed(db)
+        for label, index in (("grid", GridIndex(0.05, faceted=True)), ("sql", None)):
+            repository = PointOfInterestRepository(db, published_index=index)
+            for view, bbox in VIEWS.items():
+                elapsed = measure(lambda r=repository, b=bbox: r.facets(b), repeat=20)
+                print(f"{label:>4}: {view:>9}: {elapsed:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Latency of marking a stop as a user's trip history grows.
+
+Run from ``apps/api``: ``python -m benchmarks.mark_stop``
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import func, insert, select
+
+from app.models import Trip, TripStop, User
+from app.models.enums import TripStopKind, TripStopStatus
+from app.repositories.trip import TripRepository
+
+from ._common import measure, sqlite_sessions
+
+STOPS_PER_TRIP = 10
+
+
+def seed(db, user_id: int, trip_count: int) -> int:
+    trip_ids = db.execute(
+        insert(Trip).returning(Trip.id),
+        [{"user_id": user_id, "name": f"Trip {n}"} for n in range(trip_count)],
+    ).scalars().all()
+    db.execute(
+        insert(TripStop),
+        [
+            {"trip_id": trip_id, "kind": TripStopKind.POI, "sort": sort}
+            for trip_id in trip_ids
+            for sort in range(STOPS_PER_TRIP)
+        ],
+    )
+    db.commit()
+    return db.scalar(select(func.max(TripStop.id)))
+
+
+def scan_for_stop(repository: TripRepository, user_id: int, stop_id: int) -> None:
+    # The previous implementation: walk every trip the user owns.
+    for trip in repository.for_user(user_id):
+        stop = next((s for s in trip.stops if s.id == stop_id), None)
+        if stop:
+            repository.mark_stop_status(stop, TripStopStatus.VISITED)
+            return
+
+
+def main() -> None:
+    print(f"{'trips':>6} {'scan ms':>10} {'indexed ms':>11}")
+    for trip_count in (1, 10, 100, 500):
+        sessions = sqlite_sessions()
+        with sessions() as db:
+            user = User(firebase_uid="bench")
+            db.add(user)
+            db.commit()
+            stop_id = seed(db, user.id, trip_count)
+            repository = TripRepository(db)
+            scan = measure(
+                lambda r=repository, u=user.id, s=stop_id: scan_for_stop(r, u, s), repeat=10
+            )
+            indexed = measure(
+                lambda r=repository, u=user.id, s=stop_id: r.mark_user_stop_status(
+                    u, s, TripStopStatus.VISITED
+                )
+            )
+        print(f"{trip_count:>6} {scan:>10.2f} {indexed:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Latency of k=20 nearby queries over 100k POIs, with and without the in-memory grid.
+
+Run from ``apps/api``: ``python -m benchmarks.nearby``
+"""
+
+from __future__ import annotations
+
+import random
+
+from sqlalchemy import insert
+
+from app.models import PointOfInterest
+from app.repositories.poi import PointOfInterestRepository
+from app.services.spatial_index import GridIndex
+
+from ._common import measure, sqlite_sessions
+
+ROWS = 100_000
+CATEGORIES = ("heritage", "beach", "nature", "food")
+
+
+def seed(db) -> None:
+    rng = random.Random(7)
+    rows = []
+    for n in range(ROWS):
+        longitude, latitude = rng.uniform(79.7, 81.9), rng.uniform(5.9, 9.9)
+        rows.append(
+            {
+                "name": f"POI {n:06d}",
+                "category": CATEGORIES[n % len(CATEGORIES)],
+                "photos": [],
+                "is_published": True,
+                "latitude": latitude,
+                "longitude": longitude,
+                "geom": f"POINT({longitude} {latitude})",
+            }
+        )
+    db.execute(insert(PointOfInterest), rows)
+    db.commit()
+
+
+def main() -> None:
+    sessions = sqlite_sessions()
+    with sessions() as db:
+        seed(db)
+        queries = [(79.8612, 6.9271), (80.6337, 7.2906), (81.2, 8.5)]
+        for label, index in (("grid", GridIndex(0.05)), ("sql", None)):
+            repository = PointOfInterestRepository(db, published_index=index)
+            for radius_m in (5_000, 50_000):
+                for category in (None, "beach"):
+                    elapsed = measure(
+                        lambda r=repository, m=radius_m, c=category: [
+                            r.nearby(lon, lat, m, 20, c) for lon, lat in queries
+                        ],
+                        repeat=20,
+                    ) / len(queries)
+                    print(f"{label:>4}: radius {radius_m:>6} m, category {category!s:>8}: {elapsed:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
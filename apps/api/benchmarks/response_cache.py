@@ -0,0 +1,53 @@
+"""Latency and query count of catalogue reads with the response cache cold vs warm.
+
+Run from ``apps/api``: ``python -m benchmarks.response_cache``
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+
+_DATABASE = os.path.join(tempfile.mkdtemp(), "response_cache.db")
+os.environ.setdefault("ENVIRONMENT", "test")
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite+pysqlite:///{_DATABASE}")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.core.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.services.response_cache import response_cache  # noqa: E402
+
+from ._common import measure  # noqa: E402
+from .catalogue_stream import seed  # noqa: E402
+
+
+def main() -> None:
+    assert response_cache is not None, "RESPONSE_CACHE_BACKEND=none disables the cache"
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        seed(db)
+    statements: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    with TestClient(app) as client:
+        for path in ("/pois/?limit=500", "/pois/42"):
+
+            def cold(path: str = path) -> None:
+                response_cache.clear()
+                client.get(path)
+
+            cold_ms = measure(cold, repeat=20)
+            client.get(path)
+            statements.clear()
+            warm_ms = measure(lambda p=path: client.get(p), repeat=20)
+            print(
+                f"{path:<20} cold: {cold_ms:6.2f} ms   warm: {warm_ms:6.2f} ms"
+                f"   warm queries: {len(statements)}"
+            )
+    print(response_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Latency and route length of the day optimiser for 50-400 stops spread over Sri Lanka.
+
+Run from ``apps/api``: ``python -m benchmarks.route_optimizer``
+"""
+
+from __future__ import annotations
+
+import random
+
+from app.services.route_optimizer import (
+    _nearest_neighbour,
+    optimize_route,
+    order_stops,
+    route_length,
+)
+from app.services.spatial_index import distance_matrix
+
+from ._common import measure
+
+
+def main() -> None:
+    rng = random.Random(11)
+    for count in (50, 100, 200, 400):
+        longitudes = [rng.uniform(79.7, 81.9) for _ in range(count)]
+        latitudes = [rng.uniform(5.9, 9.9) for _ in range(count)]
+        pinned = [index == 0 for index in range(count)]
+        matrix = distance_matrix(longitudes, latitudes)
+
+        matrix_ms = measure(lambda x=longitudes, y=latitudes: distance_matrix(x, y), repeat=20)
+        total_ms = measure(
+            lambda x=longitudes, y=latitudes, p=pinned: order_stops(distance_matrix(x, y), p),
+            repeat=20,
+        )
+        as_sent = route_length(matrix, [*range(count), 0])
+        greedy = route_length(matrix, _nearest_neighbour(matrix, 0, 0).tolist())
+        optimized = route_length(matrix, [*optimize_route(matrix, 0, 0), 0])
+        print(
+            f"{count:>3} stops: matrix {matrix_ms:5.2f} ms, total {total_ms:6.2f} ms | "
+            f"as sent {as_sent / 1000:7.0f} km, nearest-neighbour {greedy / 1000:5.0f} km, "
+            f"optimised {optimized / 1000:5.0f} km"
+        )
+
+
+if __name__ == "__main__":
+    main()
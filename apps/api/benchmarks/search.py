@@ -0,0 +1,69 @@
+"""Latency of ranked text search over 100k POIs: in-process index vs a LIKE scan.
+
+Run from ``apps/api``: ``python -m benchmarks.search``
+"""
+
+from __future__ import annotations
+
+import random
+import time
+
+from sqlalchemy import insert
+
+from app.models import PointOfInterest
+from app.repositories.poi import PointOfInterestRepository
+from app.services.text_index import TextIndex
+
+from ._common import measure, sqlite_sessions
+
+ROWS = 100_000
+CATEGORIES = ("heritage", "beach", "nature", "food")
+WORDS = (
+    "temple", "lake", "fort", "beach", "rock", "falls", "garden", "market", "tea", "estate",
+    "bay", "lighthouse", "museum", "bridge", "park", "cave", "peak", "village", "river", "dagoba",
+)
+
+
+def seed(db) -> None:
+    rng = random.Random(7)
+    rows = []
+    for n in range(ROWS):
+        longitude, latitude = rng.uniform(79.7, 81.9), rng.uniform(5.9, 9.9)
+        rows.append(
+            {
+                "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {n:06d}",
+                "category": CATEGORIES[n % len(CATEGORIES)],
+                "description": " ".join(rng.choices(WORDS, k=12)),
+                "photos": [],
+                "is_published": True,
+                "latitude": latitude,
+                "longitude": longitude,
+                "geom": f"POINT({longitude} {latitude})",
+            }
+        )
+    db.execute(insert(PointOfInterest), rows)
+    db.commit()
+
+
+def main() -> None:
+    sessions = sqlite_sessions()
+    with sessions() as db:
+        seed(db)
+        index = TextIndex((3.0, 2.0, 1.0))
+        start = time.perf_counter()
+        PointOfInterestRepository(db, text_index=index).search("warm up", 1)
+        print(f"index build: {(time.perf_counter() - start) * 1000:.0f} ms for {len(index)} rows")
+        queries = ("dagoba", "temple lake", "lighthouse bay museum")
+        for label, text_index in (("index", index), ("like", None)):
+            repository = PointOfInterestRepository(db, text_index=text_index)
+            for query in queries:
+                for category in (None, "beach"):
+                    elapsed = measure(
+                        lambda r=repository, q=query, c=category: r.search(q, 20, category=c),
+                        repeat=10,
+                    )
+                    print(f"{label:>5}: {query!r:>24}, category {category!s:>8}: {elapsed:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Payload size and latency of map-pin fieldsets versus the full POI representation.
+
+Run from ``apps/api``: ``python -m benchmarks.sparse_fields``
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from app.repositories.poi import PointOfInterestRepository
+from app.schemas.base import Page
+from app.schemas.poi import POIRead
+
+from ._common import measure, sqlite_sessions
+from .catalogue_stream import seed
+
+PIN_FIELDS = ["id", "name", "category", "latitude", "longitude"]
+LIMIT = 500
+
+
+def full_page(repository: PointOfInterestRepository) -> bytes:
+    records, cursor = repository.page(limit=LIMIT)
+    items = [POIRead.model_validate(poi) for poi in records]
+    return Page[POIRead](items=items, next_cursor=cursor).model_dump_json().encode()
+
+
+def sparse_page(repository: PointOfInterestRepository) -> bytes:
+    records, cursor = repository.page(limit=LIMIT, fields=PIN_FIELDS)
+    return Page[dict[str, Any]](items=records, next_cursor=cursor).model_dump_json().encode()
+
+
+def main() -> None:
+    sessions = sqlite_sessions()
+    with sessions() as db:
+        seed(db)
+    for label, run in (("full", full_page), ("pins", sparse_page)):
+        with sessions() as db:
+            repository = PointOfInterestRepository(db)
+            size = len(run(repository))
+
+            def fresh_run(db=db, run=run, repository=repository) -> None:
+                db.expunge_all()
+                run(repository)
+
+            latency = measure(fresh_run, repeat=20)
+        print(f"{label:>5}: {size / 1024:8.1f} KiB per {LIMIT} rows, {latency:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
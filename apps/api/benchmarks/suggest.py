@@ -0,0 +1,74 @@
+"""Latency of name autocomplete over 100k published POIs: prefix index vs LIKE 'x%'.
+
+Run from ``apps/api``: ``python -m benchmarks.suggest``
+"""
+
+from __future__ import annotations
+
+import random
+import time
+
+from sqlalchemy import insert, select
+
+from app.models import PointOfInterest
+from app.repositories.poi import PointOfInterestRepository
+from app.services.text_index import PrefixIndex
+
+from ._common import measure, sqlite_sessions
+
+ROWS = 100_000
+SYLLABLES = ("ka", "ga", "la", "ma", "na", "ra", "si", "gi", "ri", "ya", "wa", "tu", "po", "de", "hu")
+KINDS = ("Temple", "Lake", "Fort", "Beach", "Falls", "Rock", "Market", "Estate")
+
+
+def seed(db) -> None:
+    rng = random.Random(7)
+    rows = []
+    for _ in range(ROWS):
+        longitude, latitude = rng.uniform(79.7, 81.9), rng.uniform(5.9, 9.9)
+        place = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))).title()
+        rows.append(
+            {
+                "name": f"{place} {rng.choice(KINDS)}",
+                "category": "heritage",
+                "photos": [],
+                "is_published": True,
+                "latitude": latitude,
+                "longitude": longitude,
+                "geom": f"POINT({longitude} {latitude})",
+            }
+        )
+    db.execute(insert(PointOfInterest), rows)
+    db.commit()
+
+
+def main() -> None:
+    sessions = sqlite_sessions()
+    with sessions() as db:
+        seed(db)
+        index = PrefixIndex()
+        repository = PointOfInterestRepository(db, suggest_index=index)
+        start = time.perf_counter()
+        repository.suggest("warm up", 10)
+        print(f"index build: {(time.perf_counter() - start) * 1000:.0f} ms for {len(index)} rows")
+        for prefix in ("k", "ka", "kala", "kalama", "temple", "lake k"):
+            start = time.perf_counter()
+            repository.suggest(prefix, 10)
+            first = (time.perf_counter() - start) * 1000
+            elapsed = measure(lambda p=prefix: repository.suggest(p, 10), repeat=200)
+            stmt = (
+                select(PointOfInterest.id, PointOfInterest.name)
+                .where(PointOfInterest.name.like(f"{prefix}%"), PointOfInterest.is_published.is_(True))
+                .order_by(PointOfInterest.name)
+                .limit(10)
+            )
+            like = measure(lambda s=stmt: db.execute(s).all(), repeat=20)
+            print(
+                f"{prefix!r:>10}: index {elapsed:6.3f} ms (first {first:6.2f} ms), like {like:7.2f} ms"
+            )
+        elapsed = measure(lambda: index.upsert(1, "Renamed Temple"), repeat=200)
+        print(f"rename: {elapsed:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,68 @@ import os
 
 os.environ.setdefault("ENVIRONMENT", "test")
 os.environ.setdefault("SQLALCHEMY_DATABASE_URI", "sqlite+pysqlite:///:memory:")
+os.environ.setdefault("DISTANCE_CACHE_PATH", "")
 
 from fastapi.testclient import TestClient
 import pytest
+from sqlalchemy import event
 
+from app.core.database import engine
 from app.main import app
+from app.services.distance_cache import distance_cache
+from app.services.index_guard import poi_guard, property_guard
+from app.services.response_cache import response_cache
+from app.services.spatial_index import (
+    poi_index,
+    property_index,
+    published_poi_index,
+    published_property_index,
+)
+from app.services.text_index import (
+    poi_suggest_index,
+    poi_text_index,
+    property_suggest_index,
+    property_text_index,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_indexes() -> None:
+    poi_index.invalidate()
+    property_index.invalidate()
+    published_poi_index.invalidate()
+    published_property_index.invalidate()
+    poi_text_index.invalidate()
+    property_text_index.invalidate()
+    poi_suggest_index.invalidate()
+    property_suggest_index.invalidate()
+    poi_guard.reset()
+    property_guard.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_caches() -> None:
+    if response_cache is not None:
+        response_cache.clear()
+    distance_cache.clear()
 
 
 @pytest.fixture
 def client() -> TestClient:
     with TestClient(app) as test_client:
         yield test_client
+
+
+@pytest.fixture
+def count_queries():
+    """Yields a callable returning the number of statements executed since the fixture started."""
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield lambda: len(statements)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
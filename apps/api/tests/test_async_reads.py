@@ -0,0 +1,150 @@
+import threading
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import dependencies
+from app.api.routes import async_reads
+from app.dependencies import get_async_current_user, get_async_db_session
+from app.models import Base, PointOfInterest, Trip, User
+from app.services.cache import TTLCache
+from app.services.firebase import firebase_verifier
+from app.services.response_cache import response_cache
+from app.services.spatial_index import poi_index
+from app.services.users import LastLoginRecorder, UserSnapshot
+
+
+@pytest_asyncio.fixture
+async def async_client():
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with sessions() as db:
+        owner, other = User(firebase_uid="owner"), User(firebase_uid="other")
+        db.add_all([owner, other])
+        for name, latitude, longitude in [
+            ("Galle Fort", 6.0267, 80.2170),
+            ("Sigiriya Rock", 7.9570, 80.7603),
+            ("Temple of the Tooth", 7.2936, 80.6413),
+        ]:
+            db.add(
+                PointOfInterest(
+                    name=name,
+                    category="heritage",
+                    latitude=latitude,
+                    longitude=longitude,
+                    geom=PointOfInterest.build_point(longitude, latitude),
+                )
+            )
+        await db.flush()
+        db.add_all([Trip(user_id=owner.id, name="South coast"), Trip(user_id=other.id, name="Hidden")])
+        await db.commit()
+        snapshot = UserSnapshot(id=owner.id, firebase_uid="owner")
+
+    async def session_override():
+        async with sessions() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(async_reads.router)
+    app.dependency_overrides[get_async_db_session] = session_override
+    app.dependency_overrides[get_async_current_user] = lambda: snapshot
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_async_poi_pages_and_bbox(async_client: httpx.AsyncClient):
+    first = (await async_client.get("/pois/", params={"limit": 2})).json()
+    assert [item["name"] for item in first["items"]] == ["Galle Fort", "Sigiriya Rock"]
+    rest = (await async_client.get("/pois/", params={"cursor": first["next_cursor"]})).json()
+    assert [item["name"] for item in rest["items"]] == ["Temple of the Tooth"]
+    assert rest["next_cursor"] is None
+
+    response = await async_client.get("/pois/", params={"bbox": "80.0,5.9,80.4,6.2"})
+    assert [item["name"] for item in response.json()["items"]] == ["Galle Fort"]
+    assert poi_index.loaded
+    # A stale index is reloaded with an awaited query, never through the sync session.
+    poi_index.invalidate()
+    response = await async_client.get("/pois/", params={"bbox": "80.0,5.9,80.4,6.2"})
+    assert [item["name"] for item in response.json()["items"]] == ["Galle Fort"]
+    assert poi_index.loaded
+
+    sparse = await async_client.get("/pois/", params={"fields": "name", "limit": 1})
+    assert sparse.json()["items"] == [{"id": 1, "name": "Galle Fort"}]
+
+    assert (await async_client.get("/pois/", params={"cursor": "garbage"})).status_code == 400
+    assert (await async_client.get("/pois/1")).json()["name"] == "Galle Fort"
+    assert (await async_client.get("/pois/999")).status_code == 404
+
+    detail = await async_client.get("/pois/1")
+    revalidated = await async_client.get("/pois/1", headers={"If-None-Match": detail.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_async_reads_call_a_blocking_cache_from_the_threadpool(
+    async_client: httpx.AsyncClient, monkeypatch
+):
+    loop_thread = threading.get_ident()
+    threads = []
+    get, set_ = response_cache.backend.get, response_cache.backend.set
+    monkeypatch.setattr(response_cache.backend, "blocking", True)
+    monkeypatch.setattr(
+        response_cache.backend, "get", lambda key: threads.append(threading.get_ident()) or get(key)
+    )
+    monkeypatch.setattr(
+        response_cache.backend,
+        "set",
+        lambda key, value, ttl: threads.append(threading.get_ident()) or set_(key, value, ttl),
+    )
+
+    first = await async_client.get("/pois/1")
+    cached = await async_client.get("/pois/1")
+    assert cached.content == first.content
+    assert (await async_client.get("/pois/", params={"limit": 1})).status_code == 200
+    assert len(threads) == 5
+    assert loop_thread not in threads
+
+
+@pytest.mark.asyncio
+async def test_async_trips_are_scoped_to_the_current_user(async_client: httpx.AsyncClient):
+    response = await async_client.get("/trips/")
+    assert response.status_code == 200
+    trips = response.json()["items"]
+    assert [trip["name"] for trip in trips] == ["South coast"]
+    revalidated = await async_client.get("/trips/", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+    assert (await async_client.get(f"/trips/{trips[0]['id']}")).status_code == 200
+    hidden_id = trips[0]["id"] + 1
+    assert (await async_client.get(f"/trips/{hidden_id}")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_async_current_user_serves_cached_tokens_on_the_event_loop(monkeypatch):
+    async def no_thread(*args):
+        raise AssertionError("a cached user must not need the threadpool")
+
+    snapshot = UserSnapshot(id=7, firebase_uid="cached-uid")
+    firebase_verifier.tokens.put("cached-token", {"uid": "cached-uid", "exp": time.time() + 60})
+    monkeypatch.setattr(dependencies, "user_cache", TTLCache(8))
+    monkeypatch.setattr(dependencies, "last_logins", LastLoginRecorder())
+    monkeypatch.setattr(dependencies, "run_in_threadpool", no_thread)
+    dependencies.user_cache.set("cached-uid", snapshot)
+
+    assert await dependencies.get_async_current_user("Bearer cached-token") is snapshot
+    with pytest.raises(HTTPException) as missing:
+        await dependencies.get_async_current_user(None)
+    assert missing.value.status_code == 401
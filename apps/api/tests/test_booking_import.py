@@ -0,0 +1,190 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import SessionLocal
+from app.repositories.trip import TripRepository
+from app.services.booking_import import (
+    BookingImporter,
+    ExportError,
+    ExportParser,
+    booking_importer,
+)
+
+
+class ExportServer:
+    """Local stand-in for the Booking.com portability download URL."""
+
+    def __init__(self) -> None:
+        self.files: dict[str, bytes] = {}
+        self.redirects: dict[str, str] = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path in server.redirects:
+                    self.send_response(302)
+                    self.send_header("Location", server.redirects[self.path])
+                    self.end_headers()
+                    return
+                body = server.files.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                for start in range(0, len(body), 1024):
+                    self.wfile.write(body[start : start + 1024])
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def serve(self, path: str, body: bytes) -> str:
+        self.files[path] = body
+        return self.base_url + path
+
+
+@pytest.fixture
+def export_server(monkeypatch):
+    # The stand-in listens on loopback over plain HTTP, which the default settings refuse.
+    monkeypatch.setattr(booking_importer, "allowed_hosts", ("127.0.0.1",))
+    monkeypatch.setattr(booking_importer, "allowed_schemes", ("http",))
+    monkeypatch.setattr(booking_importer, "private_addresses", True)
+    server = ExportServer()
+    yield server
+    server.httpd.shutdown()
+
+
+def test_parser_handles_arbitrary_chunk_boundaries():
+    records = [{"reservation_id": n, "hotel_name": f"Hotel {n}"} for n in range(50)]
+    ndjson = "\n".join([*map(json.dumps, records[:25]), "{broken", *map(json.dumps, records[25:])])
+    for text in (json.dumps(records), ndjson):
+        parser = ExportParser()
+        values = []
+        for start in range(0, len(text), 7):
+            values.extend(parser.feed(text[start : start + 7]))
+        values.extend(parser.close())
+        assert [value for value in values if isinstance(value, dict)] == records
+    assert values[25] == "{broken"
+
+    truncated = ExportParser()
+    truncated.feed(json.dumps(records)[:-10])
+    with pytest.raises(ValueError):
+        truncated.close()
+
+    # A malformed array element never completes; it fails the import instead of buffering.
+    malformed = ExportParser(max_value_chars=64)
+    malformed.feed('[{"reservation_id": 1}, {"hotel_name": "')
+    with pytest.raises(ExportError):
+        malformed.feed("x" * 64)
+
+
+def test_import_matches_stays_and_skips_duplicates(client: TestClient, export_server: ExportServer):
+    properties = {}
+    for name, latitude, longitude in [
+        ("Jetwing Lighthouse", 6.0405, 80.2029),
+        ("Amangalla", 6.0300, 80.2167),
+        ("Cinnamon Lodge Habarana", 8.0400, 80.7500),
+    ]:
+        response = client.post(
+            "/properties/", json={"name": name, "latitude": latitude, "longitude": longitude}
+        )
+        properties[name] = response.json()["id"]
+
+    reservations = [
+        {"reservation_id": "r1", "hotel_name": "Jetwing Lighthouse Galle", "latitude": 6.0407, "longitude": 80.2031, "check_in": "2024-03-01", "check_out": "2024-03-03"},
+        {"reservation_id": "r1", "hotel_name": "Jetwing Lighthouse Galle", "latitude": 6.0407, "longitude": 80.2031},
+        {"id": 3, "property_name": "Cinnamon Lodge Habarana", "check_in": "2024-03-05"},
+        {"reservation_id": "r4", "hotel_name": "Amangala", "location": {"latitude": 6.0301, "longitude": 80.2168}},
+        {"reservation_id": "r5", "hotel_name": "Random Guesthouse", "latitude": 6.0405, "longitude": 80.2029},
+        {"hotel_name": "No id"},
+        {"reservation_id": "r7", "hotel_name": "Bad date", "check_in": "March"},
+    ]
+    url = export_server.serve("/export.json", json.dumps(reservations).encode())
+
+    response = client.post(
+        "/import/booking/portability/register", json={"url": url, "scope": "reservations"}
+    )
+    assert response.status_code == 200
+    status = client.get("/import/booking/portability/status").json()
+    assert status["state"] == "completed"
+    assert {key: status[key] for key in ("reservations", "duplicates", "invalid", "matched", "imported")} == {
+        "reservations": 5,
+        "duplicates": 1,
+        "invalid": 2,
+        "matched": 3,
+        "imported": 4,
+    }
+
+    with SessionLocal() as db:
+        bookings = TripRepository(db).list_bookings(status["trip_id"])
+        stays = {booking.raw_json.get("reservation_id", booking.raw_json.get("id")): booking.stay_id for booking in bookings}
+    assert stays == {
+        "r1": properties["Jetwing Lighthouse"],
+        3: properties["Cinnamon Lodge Habarana"],
+        "r4": properties["Amangalla"],
+        "r5": None,
+    }
+
+    client.post("/import/booking/portability/register", json={"url": url, "scope": "reservations"})
+    again = client.get("/import/booking/portability/status").json()
+    assert (again["duplicates"], again["imported"], again["trip_id"]) == (5, 0, None)
+
+
+def test_failed_download_is_reported(client: TestClient, export_server: ExportServer):
+    url = export_server.base_url + "/missing.json"
+    client.post("/import/booking/portability/register", json={"url": url, "scope": "reservations"})
+    status = client.get("/import/booking/portability/status").json()
+    assert status["state"] == "failed"
+    assert status["error"] == "Could not download the export"
+
+
+def test_export_url_must_be_an_allowed_public_host(monkeypatch):
+    addresses = {"export.booking.com": "93.184.216.34", "internal.booking.com": "10.0.0.7"}
+    monkeypatch.setattr(
+        "app.services.booking_import.socket.getaddrinfo",
+        lambda host, port: [(None, None, None, "", (addresses.get(host, host), port))],
+    )
+    importer = BookingImporter(allowed_hosts=["booking.com"])
+    importer.check_url("https://export.booking.com/reservations.json")
+    for url in (
+        "http://export.booking.com/reservations.json",
+        "https://booking.com.attacker.example/x",
+        "https://169.254.169.254/latest/meta-data/",
+    ):
+        with pytest.raises(ExportError):
+            importer.check_url(url)
+    # An allowed name that resolves to a private address is refused too.
+    with pytest.raises(ExportError):
+        importer.check_url("https://internal.booking.com/export.json")
+
+    # The download connects to the vetted address, so a later DNS answer cannot redirect it.
+    with httpx.Client() as client:
+        request = importer.pinned_request(client, "https://export.booking.com:8443/reservations.json")
+    assert str(request.url) == "https://93.184.216.34:8443/reservations.json"
+    assert request.headers["Host"] == "export.booking.com:8443"
+    assert request.extensions["sni_hostname"] == "export.booking.com"
+
+
+def test_registration_and_redirects_are_checked(client: TestClient, export_server: ExportServer):
+    rejected = client.post(
+        "/import/booking/portability/register",
+        json={"url": "http://169.254.169.254/latest/meta-data/", "scope": "reservations"},
+    )
+    assert rejected.status_code == 400
+
+    export_server.redirects["/export.json"] = "http://169.254.169.254/latest/meta-data/"
+    url = export_server.base_url + "/export.json"
+    client.post("/import/booking/portability/register", json={"url": url, "scope": "reservations"})
+    status = client.get("/import/booking/portability/status").json()
+    assert (status["state"], status["error"]) == ("failed", "Export URL is not allowed")
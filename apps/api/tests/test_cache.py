@@ -0,0 +1,50 @@
+from app.services.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache(10, ttl=60, clock=clock)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.now = 61
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache: TTLCache[str, int] = TTLCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+
+
+def test_ttl_cache_honours_explicit_expiry():
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache(10, ttl=3600, clock=clock)
+    cache.set("a", 1, expires_at=5)
+    clock.now = 5
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_bounds_total_weight():
+    cache: TTLCache[str, bytes] = TTLCache(10, weigh=len, max_weight=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    cache.set("c", b"1234")
+    assert cache.get("a") is None
+    assert cache.weight == 8
+    cache.set("huge", b"x" * 11)
+    assert cache.get("huge") is None
+    assert len(cache) == 2
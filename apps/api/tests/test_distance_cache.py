@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from app.services.distance_cache import DistanceCache, place_distances
+
+COLOMBO = ("poi", 1, 79.8612, 6.9271)
+KANDY = ("poi", 2, 80.6337, 7.2906)
+GALLE = ("stay", 1, 80.2170, 6.0535)
+
+
+def test_lookup_matches_uncached_distances_and_counts_hits():
+    cache = DistanceCache(capacity=4)
+    places = [COLOMBO, None, KANDY, GALLE, COLOMBO]
+    expected = place_distances(places)
+    np.testing.assert_allclose(cache.lookup(places), expected, rtol=1e-6)
+    assert np.isnan(expected[1]).all()
+    assert expected[0, 2] == pytest.approx(94_000, rel=0.05)
+    assert (cache.hits, cache.misses) == (0, 9)
+
+    np.testing.assert_allclose(cache.lookup([GALLE, COLOMBO]), expected[np.ix_([3, 0], [3, 0])], rtol=1e-6)
+    assert cache.hits == 4
+
+
+def test_lookup_evicts_least_recently_used_and_recomputes_moved_points():
+    cache = DistanceCache(capacity=3)
+    cache.lookup([COLOMBO, KANDY])
+    cache.lookup([GALLE, COLOMBO])
+    cache.lookup([("poi", 3, 81.2, 8.5)])
+    assert cache.evictions == 1
+    assert len(cache) == 3
+
+    moved = ("poi", 1, 80.0, 7.0)
+    np.testing.assert_allclose(cache.lookup([moved, GALLE]), place_distances([moved, GALLE]), rtol=1e-6)
+    # Batches larger than the cache bypass it.
+    assert cache.lookup([COLOMBO, KANDY, GALLE, moved]).shape == (4, 4)
+
+
+def test_saved_matrix_survives_restart_and_seed_prefers_shared_points(tmp_path):
+    path = str(tmp_path / "distances.npz")
+    cache = DistanceCache(capacity=2, path=path)
+    cache.seed([COLOMBO, KANDY, GALLE])
+    cache.lookup([GALLE])
+    # The seed's first (most shared) place outlives the later ones.
+    assert cache.lookup([COLOMBO, GALLE])[0, 1] > 0
+    assert cache.evictions == 1
+    cache.save()
+
+    restored = DistanceCache(capacity=2, path=path)
+    restored.ensure_loaded()
+    restored.lookup([COLOMBO, GALLE])
+    assert (restored.hits, restored.misses) == (4, 0)
+
+
+def test_warm_prefers_the_saved_matrix_and_keeps_lookups_made_meanwhile(tmp_path):
+    path = str(tmp_path / "distances.npz")
+    cache = DistanceCache(capacity=4, path=path)
+    cache.warm(lambda limit: [COLOMBO, KANDY, GALLE][:limit])
+    assert len(cache) == 3
+    cache.save()
+
+    restored = DistanceCache(capacity=4, path=path)
+    restored.warm(lambda limit: pytest.fail("a saved matrix should not be reseeded"))
+    assert len(restored) == 3
+
+    busy = DistanceCache(capacity=4)
+    busy.lookup([GALLE])
+    busy.warm(lambda limit: [COLOMBO, KANDY])
+    assert len(busy) == 1
@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import rsa
+from google.auth import crypt, jwt
+
+from app.services import firebase
+from app.services.firebase import CertCache, FirebaseVerifier
+
+PROJECT_ID = "guidelk-test"
+
+
+class CertServer:
+    """Local stand-in for Google's x509 metadata endpoint."""
+
+    def __init__(self, max_age: int = 3600) -> None:
+        public_key, private_key = rsa.newkeys(1024)
+        self.signer = crypt.RSASigner.from_string(private_key.save_pkcs1(), key_id="key-1")
+        self.certs = {"key-1": public_key.save_pkcs1().decode()}
+        self.max_age = max_age
+        self.hits = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                server.hits += 1
+                body = json.dumps(server.certs).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={server.max_age}")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/certs"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def token(self, uid: str = "user-1", expires_in: int = 3600) -> str:
+        now = int(time.time())
+        payload = {
+            "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+            "aud": PROJECT_ID,
+            "sub": uid,
+            "iat": now,
+            "exp": now + expires_in,
+            "email": f"{uid}@example.com",
+        }
+        return jwt.encode(self.signer, payload).decode()
+
+
+@pytest.fixture
+def cert_server():
+    server = CertServer()
+    yield server
+    server.httpd.shutdown()
+
+
+def test_verify_caches_certs_and_claims(cert_server: CertServer, monkeypatch):
+    verifier = FirebaseVerifier(project_id=PROJECT_ID, certs_url=cert_server.url)
+    decode_calls = []
+    original_decode = jwt.decode
+    monkeypatch.setattr(
+        firebase.jwt, "decode", lambda *a, **kw: decode_calls.append(1) or original_decode(*a, **kw)
+    )
+
+    token = cert_server.token()
+    assert verifier.verify(token)["uid"] == "user-1"
+    assert verifier.verify(token)["email"] == "user-1@example.com"
+    assert len(decode_calls) == 1
+
+    assert verifier.verify(cert_server.token("user-2"))["uid"] == "user-2"
+    assert cert_server.hits == 1
+
+
+def test_expired_token_is_rejected(cert_server: CertServer):
+    verifier = FirebaseVerifier(project_id=PROJECT_ID, certs_url=cert_server.url)
+    with pytest.raises(ValueError):
+        verifier.verify(cert_server.token(expires_in=-60))
+    assert len(verifier.tokens) == 0
+
+
+def test_cert_cache_refreshes_in_background_before_expiry(cert_server: CertServer):
+    now = [0.0]
+    verifier = FirebaseVerifier(project_id=PROJECT_ID, certs_url=cert_server.url)
+    cache = CertCache(cert_server.url, verifier._request, refresh_margin=300, clock=lambda: now[0])
+
+    cache.get()
+    assert cert_server.hits == 1
+
+    now[0] = 3600 - 200
+    assert cache.get() == cert_server.certs
+    deadline = time.time() + 5
+    while cert_server.hits < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert cert_server.hits == 2
+
+    now[0] = 3600 + 100
+    cache.get()
+    assert cert_server.hits == 2
@@ -0,0 +1,52 @@
+import logging
+
+from fastapi.testclient import TestClient
+
+from app.core.database import engine
+from app.core.instrumentation import (
+    QueryProfile,
+    SQLProfileMiddleware,
+    instrument_engine,
+    statement_shape,
+)
+from app.main import app
+
+
+def test_statement_shape_folds_in_lists_and_whitespace():
+    assert statement_shape("SELECT *\n  FROM pois WHERE id IN (?, ?, ?)") == (
+        "SELECT * FROM pois WHERE id IN (?)"
+    )
+    assert statement_shape("SELECT 1 FROM t WHERE a IN (%s,%s) AND b = %s") == (
+        "SELECT 1 FROM t WHERE a IN (?) AND b = %s"
+    )
+
+
+def test_profile_keeps_slowest_and_flags_repeats():
+    profile = QueryProfile(keep_slowest=2)
+    for ms in (1.0, 5.0, 3.0):
+        profile.record(f"SELECT {ms}", ms)
+    for stop_id in range(4):
+        profile.record(f"SELECT * FROM pois WHERE id IN ({', '.join('?' * (stop_id + 1))})", 0.5)
+    summary = profile.summary(threshold=3)
+    assert summary["statements"] == 7
+    assert [entry["ms"] for entry in summary["slowest"]] == [5.0, 3.0]
+    assert summary["repeated"] == [
+        {"count": 4, "ms": 2.0, "statement": "SELECT * FROM pois WHERE id IN (?)"}
+    ]
+
+
+def test_middleware_reports_server_timing_and_logs(caplog):
+    instrument_engine(engine)
+    with TestClient(SQLProfileMiddleware(app, repeat_threshold=0)) as client:
+        client.post(
+            "/pois/",
+            json={"name": "Ella Rock", "category": "nature", "latitude": 6.85, "longitude": 81.04},
+        )
+        with caplog.at_level(logging.INFO, logger="app.core.instrumentation"):
+            response = client.get("/pois/", params={"limit": 5})
+    timing = response.headers["server-timing"]
+    assert timing.startswith("db;dur=") and "statements" in timing and "app;dur=" in timing
+    (record,) = (record for record in caplog.records if "GET /pois/" in record.getMessage())
+    assert record.sql_profile["statements"] >= 1
+    # Every shape repeats more than zero times, so the line is raised to a warning.
+    assert record.levelno == logging.WARNING and record.sql_profile["repeated"]
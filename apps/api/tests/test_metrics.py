@@ -0,0 +1,85 @@
+import re
+import threading
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import Registry, TimedQueuePool, db_pool_wait
+
+
+def sample(body: str, name: str, **labels: str) -> float:
+    rendered = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = "^" + re.escape(f"{name}{{{rendered}}}" if labels else name) + r" (\S+)$"
+    match = re.search(pattern, body, re.MULTILINE)
+    assert match, f"{name} {labels} not in metrics"
+    return float(match.group(1))
+
+
+def test_registry_sums_threads_and_renders_cumulative_buckets():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ("path",))
+    latency = registry.histogram("latency_seconds", 'Latency "quoted".', buckets=(0.1, 1.0))
+
+    def work() -> None:
+        for _ in range(1000):
+            requests.labels('/a"b').inc()
+        latency.observe(0.05)
+        latency.observe(2.0)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    body = registry.render()
+    assert "# TYPE latency_seconds histogram" in body
+    assert sample(body, "requests_total", path='/a\\"b') == 8000
+    assert sample(body, "latency_seconds_bucket", le="0.1") == 8
+    assert sample(body, "latency_seconds_bucket", le="1") == 8
+    assert sample(body, "latency_seconds_bucket", le="+Inf") == 16
+    assert sample(body, "latency_seconds_sum") == 16.4
+    assert sample(body, "latency_seconds_count") == 16
+
+
+def test_metrics_endpoint_reports_routes_threadpool_database_and_caches(client: TestClient):
+    poi = client.post(
+        "/pois/", json={"name": "Sigiriya", "category": "heritage", "latitude": 7.95, "longitude": 80.76}
+    ).json()
+    before = client.get("/metrics").text
+    for _ in range(3):
+        assert client.get(f"/pois/{poi['id']}").status_code == 200
+    client.get("/no/such/path")
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+
+    def delta(name: str, **labels: str) -> float:
+        try:
+            previous = sample(before, name, **labels)
+        except AssertionError:
+            previous = 0.0
+        return sample(body, name, **labels) - previous
+
+    route = {"method": "GET", "route": "/pois/{poi_id}"}
+    assert delta("http_requests_total", **route, status="200") == 3
+    assert delta("http_request_duration_seconds_count", **route) == 3
+    assert delta("http_requests_total", method="GET", route="unmatched", status="404") == 1
+    assert f"/pois/{poi['id']}" not in body
+    assert sample(body, "http_requests_in_flight") == 1
+    assert delta("db_statement_duration_seconds_count", engine="sync", operation="SELECT") > 0
+    assert sample(body, "threadpool_tokens") == 40
+    assert sample(body, "threadpool_borrowed_tokens") == 0
+    assert 0 <= sample(body, "cache_hit_ratio", cache="user") <= 1
+    assert "cache_hits_total{cache=\"distance\"}" in body
+
+
+def test_timed_pool_observes_checkouts(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=1)
+    before = db_pool_wait.labels("sync").samples("wait", {})[-1][2]
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    assert db_pool_wait.labels("sync").samples("wait", {})[-1][2] - before == 3
+    engine.dispose()
@@ -0,0 +1,33 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.repositories.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trips_values():
+    created = datetime(2024, 5, 1, 8, 30)
+    assert decode_cursor(encode_cursor(["Ella Rock", 42])) == ["Ella Rock", 42]
+    assert decode_cursor(encode_cursor([created, 7])) == [created, 7]
+
+
+@pytest.mark.parametrize(
+    "cursor", ["not-a-cursor", "eyJhIjoxfQ", "W3siYSI6MX0sMV0", "W3siZHQiOjV9LDFd", "W3siZHQiOiJ4In1d"]
+)
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize(
+    "payload", [[{"a": 1}, 1], [{"dt": 5}, 1], [[1], 2], ["Ella", "7"], [True, 1], ["Ella"]]
+)
+def test_listings_reject_crafted_cursors(client: TestClient, payload):
+    raw = json.dumps(payload).encode("utf-8")
+    cursor = base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+    for path in ("/pois/", "/properties/", "/trips/"):
+        assert client.get(path, params={"cursor": cursor}).status_code == 400
+    assert client.get("/sync", params={"since": cursor}).status_code == 400
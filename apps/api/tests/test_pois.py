@@ -1,5 +1,15 @@
+import csv
+import json
+from datetime import datetime, timezone
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.core.database import SessionLocal
+from app.models import PointOfInterest
+from app.services.index_guard import poi_guard
+from app.services.spatial_index import poi_index
 
 
 def test_create_and_list_pois(client: TestClient):
@@ -21,6 +31,345 @@ def test_create_and_list_pois(client: TestClient):
 
     list_response = client.get("/pois/")
     assert list_response.status_code == 200
-    items = list_response.json()
+    items = list_response.json()["items"]
     assert len(items) == 1
     assert items[0]["id"] == created["id"]
+
+
+def test_list_pois_by_bbox(client: TestClient, monkeypatch):
+    # Every read checks the table stamp; this process's own writes must not force reloads.
+    monkeypatch.setattr(poi_guard, "interval", 0.0)
+    loads = []
+    load = poi_index.load
+
+    def counting_load(rows):
+        loads.append(1)
+        load(rows)
+
+    monkeypatch.setattr(poi_index, "load", counting_load)
+    for name, latitude, longitude in [
+        ("Galle Fort", 6.0267, 80.2170),
+        ("Temple of the Tooth", 7.2936, 80.6413),
+    ]:
+        response = client.post(
+            "/pois/",
+            json={"name": name, "category": "heritage", "latitude": latitude, "longitude": longitude},
+        )
+        assert response.status_code == 201
+
+    response = client.get("/pois/", params={"bbox": "80.0,5.9,80.4,6.2"})
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()["items"]] == ["Galle Fort"]
+
+    moved = client.get("/pois/", params={"bbox": "80.5,7.2,80.7,7.4"}).json()["items"]
+    client.patch(f"/pois/{moved[0]['id']}", json={"latitude": 6.03, "longitude": 80.22})
+    response = client.get("/pois/", params={"bbox": "80.0,5.9,80.4,6.2"})
+    assert [item["name"] for item in response.json()["items"]] == ["Galle Fort", "Temple of the Tooth"]
+    assert len(loads) == 1
+
+
+@pytest.mark.parametrize("bbox", ["80,5.9,80.4", "nan,5.9,80.4,6.2", "80,5.9,inf,6.2", "80.4,5.9,80.0,6.2"])
+@pytest.mark.parametrize("path", ["/pois/", "/pois/clusters", "/pois/facets", "/search"])
+def test_invalid_bbox_is_rejected(client: TestClient, path: str, bbox: str):
+    response = client.get(path, params={"bbox": bbox, "zoom": 5, "q": "fort"})
+    assert response.status_code == 400
+
+
+def test_list_pois_pages_with_cursor(client: TestClient):
+    for name in ["Adam's Peak", "Ella Rock", "Ella Rock", "Horton Plains", "Yala"]:
+        client.post(
+            "/pois/",
+            json={"name": name, "category": "nature", "latitude": 6.8, "longitude": 80.5},
+        )
+
+    seen = []
+    params = {"limit": 2}
+    while True:
+        page = client.get("/pois/", params=params).json()
+        seen.extend(item["name"] for item in page["items"])
+        if not page["next_cursor"]:
+            break
+        params["cursor"] = page["next_cursor"]
+    assert seen == ["Adam's Peak", "Ella Rock", "Ella Rock", "Horton Plains", "Yala"]
+
+    assert client.get("/pois/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_list_pois_streams_full_catalogue(client: TestClient):
+    for index in range(3):
+        client.post(
+            "/pois/",
+            json={"name": f"Beach {index}", "category": "beach", "latitude": 6.0, "longitude": 80.2},
+        )
+
+    response = client.get("/pois/", headers={"Accept": "application/x-ndjson"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["name"] for line in lines] == ["Beach 0", "Beach 1", "Beach 2"]
+
+    response = client.get("/pois/", params={"stream": 1})
+    assert [item["name"] for item in response.json()] == ["Beach 0", "Beach 1", "Beach 2"]
+
+
+def test_list_pois_with_sparse_fields(client: TestClient):
+    client.post(
+        "/pois/",
+        json={
+            "name": "Mirissa",
+            "category": "beach",
+            "description": "Whale watching",
+            "latitude": 5.9483,
+            "longitude": 80.4716,
+        },
+    )
+
+    response = client.get("/pois/", params={"fields": "name,latitude,longitude"})
+    assert response.status_code == 200
+    [item] = response.json()["items"]
+    assert set(item) == {"id", "name", "latitude", "longitude"}
+
+    response = client.get("/pois/", params={"fields": "name,geom"})
+    assert response.status_code == 400
+
+
+def test_bulk_csv_upload_reports_rejected_lines(client: TestClient):
+    # Loads the spatial index first so the bulk insert has to invalidate it.
+    assert client.get("/pois/", params={"bbox": "80.0,5.9,80.4,6.2"}).json()["items"] == []
+    body = (
+        "name,category,latitude,longitude,photos,is_published\n"
+        "Galle Fort,heritage,6.0267,80.2170,https://example.com/a.jpg|https://example.com/b.jpg,true\n"
+        "Nowhere,heritage,95,80.0,,\n"
+        '"Unawatuna, Beach",beach,6.0096,80.2497,,\n'
+        "Broken,heritage,not-a-number,80.0,,\n"
+    )
+    response = client.post("/pois/bulk", content=body, headers={"content-type": "text/csv"})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted"] == 2
+    assert [rejection["line"] for rejection in result["rejected"]] == [3, 5]
+    assert result["rejected"][0]["error"].startswith("latitude:")
+
+    items = client.get("/pois/", params={"bbox": "80.0,5.9,80.4,6.2"}).json()["items"]
+    assert [item["name"] for item in items] == ["Galle Fort", "Unawatuna, Beach"]
+    assert items[0]["photos"] == ["https://example.com/a.jpg", "https://example.com/b.jpg"]
+    assert items[0]["is_published"] is True
+
+
+def test_bulk_csv_upload_continues_past_a_malformed_line(client: TestClient):
+    oversized = "x" * (csv.field_size_limit() + 1)
+    body = (
+        "name,category,latitude,longitude\n"
+        "Yala,nature,6.37,81.52\n"
+        f"{oversized},nature,6.0,80.0\n"
+        "Mirissa,beach,5.94,80.46\n"
+    )
+    response = client.post("/pois/bulk", content=body, headers={"content-type": "text/csv"})
+    result = response.json()
+    assert result["inserted"] == 2
+    assert [rejection["line"] for rejection in result["rejected"]] == [3]
+    assert result["rejected"][0]["error"].startswith("Invalid CSV:")
+    assert {item["name"] for item in client.get("/pois/").json()["items"]} == {"Yala", "Mirissa"}
+
+
+def test_bulk_upload_rejects_bad_encoding_and_headers(client: TestClient):
+    for body in (
+        b"name,category,latitude,longitude\n\xff\xfe,nature,6.0,80.0\n",
+        b"name,name,latitude,longitude\nYala,Yala,6.37,81.52\n",
+        b"name,,latitude,longitude\nYala,nature,6.37,81.52\n",
+    ):
+        response = client.post("/pois/bulk", content=body, headers={"content-type": "text/csv"})
+        assert response.status_code == 400
+    assert client.get("/pois/").json()["items"] == []
+
+
+def test_bulk_ndjson_upload_for_properties(client: TestClient):
+    lines = [
+        json.dumps({"name": "Cinnamon Lodge", "latitude": 7.86, "longitude": 80.65}),
+        "not json",
+        json.dumps({"name": "Jetwing Lighthouse", "latitude": 6.04, "longitude": 80.20, "photos": ["x.jpg"]}),
+        "",
+        json.dumps(["array"]),
+    ]
+    response = client.post(
+        "/properties/bulk",
+        content="\n".join(lines),
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.json() == {
+        "inserted": 2,
+        "rejected": [
+            {"line": 2, "error": "Invalid JSON"},
+            {"line": 5, "error": "Expected a JSON object"},
+        ],
+    }
+    names = [item["name"] for item in client.get("/properties/").json()["items"]]
+    assert names == ["Cinnamon Lodge", "Jetwing Lighthouse"]
+
+    unsupported = client.post("/properties/bulk", json=[{"name": "x"}])
+    assert unsupported.status_code == 415
+
+
+@pytest.mark.parametrize("use_index", [True, False])
+def test_nearby_pois_and_properties(client: TestClient, monkeypatch, use_index: bool):
+    monkeypatch.setattr("app.dependencies.settings.spatial_index_enabled", use_index)
+    for name, category, latitude, longitude, published in [
+        ("Galle Fort", "heritage", 6.0267, 80.2170, True),
+        ("Galle Lighthouse", "heritage", 6.0247, 80.2195, True),
+        ("Galle Draft", "heritage", 6.0266, 80.2171, False),
+        ("Unawatuna Beach", "beach", 6.0096, 80.2497, True),
+        ("Temple of the Tooth", "heritage", 7.2936, 80.6413, True),
+    ]:
+        client.post(
+            "/pois/",
+            json={
+                "name": name,
+                "category": category,
+                "latitude": latitude,
+                "longitude": longitude,
+                "is_published": published,
+            },
+        )
+    for name, published in [("Amangalla", True), ("Closed Villa", False)]:
+        client.post(
+            "/properties/",
+            json={"name": name, "latitude": 6.0300, "longitude": 80.2167, "is_published": published},
+        )
+
+    params = {"lat": 6.0267, "lon": 80.2170, "radius_m": 10_000}
+    results = client.get("/pois/nearby", params={**params, "k": 2}).json()
+    assert [poi["name"] for poi in results] == ["Galle Fort", "Galle Lighthouse"]
+    assert results[0]["distance_m"] == 0.0
+    assert 300 < results[1]["distance_m"] < 400
+
+    beaches = client.get("/pois/nearby", params={**params, "category": "beach"}).json()
+    assert [poi["name"] for poi in beaches] == ["Unawatuna Beach"]
+
+    # Like suggestions and facets, nearby only shows published rows.
+    stays = client.get("/properties/nearby", params=params).json()
+    assert [stay["name"] for stay in stays] == ["Amangalla"]
+    assert client.get("/pois/nearby", params={"lat": 6.0, "lon": 80.2, "radius_m": 10}).json() == []
+
+
+@pytest.mark.parametrize("use_index", [True, False])
+def test_clusters_aggregate_by_zoom(client: TestClient, monkeypatch, use_index: bool):
+    monkeypatch.setattr("app.dependencies.settings.spatial_index_enabled", use_index)
+    created = [
+        client.post(
+            "/pois/",
+            json={
+                "name": name,
+                "category": category,
+                "latitude": latitude,
+                "longitude": longitude,
+                "is_published": published,
+            },
+        ).json()
+        for name, category, latitude, longitude, published in [
+            ("Galle Fort", "heritage", 6.0267, 80.2170, True),
+            ("Unawatuna Beach", "beach", 6.0096, 80.2497, True),
+            ("Temple of the Tooth", "heritage", 7.2936, 80.6413, True),
+            ("Kandy Draft", "heritage", 7.2937, 80.6414, False),
+        ]
+    ]
+    island = {"bbox": "79.5,5.9,81.9,9.9"}
+
+    (whole,) = client.get("/pois/clusters", params={**island, "zoom": 3}).json()
+    assert whole["count"] == 3
+    assert whole["categories"] == {"heritage": 2, "beach": 1}
+    regions = client.get("/pois/clusters", params={**island, "zoom": 8}).json()
+    assert sorted((cluster["count"], cluster["categories"]) for cluster in regions) == [
+        (1, {"heritage": 1}),
+        (2, {"beach": 1, "heritage": 1}),
+    ]
+
+    client.delete(f"/pois/{created[1]['id']}")
+    regions = client.get("/pois/clusters", params={**island, "zoom": 8}).json()
+    assert sorted(cluster["count"] for cluster in regions) == [1, 1]
+    assert client.get("/pois/clusters", params={"bbox": "79.5,5.9,81.9,9.9"}).status_code == 422
+
+
+@pytest.mark.parametrize("use_index", [True, False])
+def test_facets_count_published_pois(client: TestClient, monkeypatch, use_index: bool):
+    monkeypatch.setattr("app.dependencies.settings.spatial_index_enabled", use_index)
+    created = [
+        client.post(
+            "/pois/",
+            json={
+                "name": name,
+                "category": category,
+                "latitude": latitude,
+                "longitude": longitude,
+                "is_published": published,
+            },
+        ).json()
+        for name, category, latitude, longitude, published in [
+            ("Galle Fort", "heritage", 6.0267, 80.2170, True),
+            ("Unawatuna Beach", "beach", 6.0096, 80.2497, True),
+            ("Temple of the Tooth", "heritage", 7.2936, 80.6413, True),
+            ("Draft", "beach", 6.02, 80.22, False),
+        ]
+    ]
+
+    facets = client.get("/pois/facets").json()
+    assert facets == {"total": 3, "categories": {"heritage": 2, "beach": 1}}
+    south = client.get("/pois/facets", params={"bbox": "80.0,5.9,80.5,6.5"}).json()
+    assert south["categories"] == {"beach": 1, "heritage": 1}
+
+    client.patch(f"/pois/{created[3]['id']}", json={"is_published": True})
+    client.patch(f"/pois/{created[0]['id']}", json={"category": "fort"})
+    client.delete(f"/pois/{created[2]['id']}")
+    facets = client.get("/pois/facets").json()
+    assert facets == {"total": 3, "categories": {"beach": 2, "fort": 1}}
+
+
+def test_conditional_get_on_list_and_detail(client: TestClient):
+    created = client.post(
+        "/pois/", json={"name": "Galle Fort", "category": "heritage", "latitude": 6.03, "longitude": 80.22}
+    ).json()
+    # Backdate the row so the PATCH below lands in a later second.
+    with SessionLocal() as db:
+        db.execute(update(PointOfInterest).values(updated_at=datetime(2024, 1, 1, tzinfo=timezone.utc)))
+        db.commit()
+
+    listing = client.get("/pois/")
+    etag = listing.headers["etag"]
+    assert listing.headers["last-modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert client.get("/pois/", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/pois/", params={"limit": 5}, headers={"If-None-Match": etag}).status_code == 200
+    since = {"If-Modified-Since": listing.headers["last-modified"]}
+    assert client.get("/pois/", headers=since).status_code == 304
+
+    detail = client.get(f"/pois/{created['id']}")
+    not_modified = client.get(f"/pois/{created['id']}", headers={"If-None-Match": detail.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == detail.headers["etag"]
+
+    client.patch(f"/pois/{created['id']}", json={"name": "Galle Dutch Fort"})
+    assert client.get("/pois/", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/pois/", headers=since).status_code == 200
+    changed = client.get(f"/pois/{created['id']}", headers={"If-None-Match": detail.headers["etag"]})
+    assert changed.json()["name"] == "Galle Dutch Fort"
+    assert client.get("/pois/999").status_code == 404
+
+
+def test_edits_within_one_second_change_validators(client: TestClient):
+    created = client.post(
+        "/pois/", json={"name": "Ruwanwelisaya", "category": "heritage", "latitude": 8.35, "longitude": 80.4}
+    ).json()
+    second = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def pin_updated_at() -> None:
+        with SessionLocal() as db:
+            db.execute(update(PointOfInterest).values(updated_at=second))
+            db.commit()
+
+    pin_updated_at()
+    detail, listing = client.get(f"/pois/{created['id']}"), client.get("/pois/")
+    client.patch(f"/pois/{created['id']}", json={"description": "Great stupa"})
+    # Same updated_at as before the edit, as for two writes within one second.
+    pin_updated_at()
+    revalidated = client.get(f"/pois/{created['id']}", headers={"If-None-Match": detail.headers["etag"]})
+    assert revalidated.status_code == 200
+    assert revalidated.json()["description"] == "Great stupa"
+    assert client.get("/pois/", headers={"If-None-Match": listing.headers["etag"]}).status_code == 200
@@ -0,0 +1,113 @@
+from fastapi.testclient import TestClient
+
+from app.services.response_cache import MemoryBackend, RedisBackend, ResponseCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRedis:
+    """The subset of redis-py the shared backend uses, with expiry driven by a fake clock."""
+
+    def __init__(self, clock: FakeClock) -> None:
+        self.clock = clock
+        self.values: dict[str, tuple[bytes, float | None]] = {}
+        self.down = False
+
+    def get(self, key: str) -> bytes | None:
+        self._check()
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= self.clock():
+            del self.values[key]
+            return None
+        return value
+
+    def set(self, key: str, value: bytes, px: int | None = None) -> None:
+        self._check()
+        self.values[key] = (value, self.clock() + px / 1000 if px else None)
+
+    def delete(self, key: str) -> None:
+        self._check()
+        self.values.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        self._check()
+        count = int(self.values.get(key, (b"0", None))[0]) + 1
+        self.values[key] = (str(count).encode(), None)
+        return count
+
+    def _check(self) -> None:
+        if self.down:
+            raise ConnectionError("redis unavailable")
+
+
+def test_memory_backend_invalidates_details_and_list_generations():
+    clock = FakeClock()
+    cache = ResponseCache(MemoryBackend(16, 1024, clock=clock), ttl=60)
+    detail, listing = cache.key("pois", "1"), cache.key("pois", "limit=5", listing=True)
+    cache.set(detail, b"one")
+    cache.set(listing, b"page")
+    cache.set(cache.key("pois", "2"), b"two")
+
+    # A body read before the invalidation but stored after it lands under the old generation.
+    stale = cache.key("pois", "1")
+    cache.invalidate("pois", 1)
+    cache.set(stale, b"stale")
+    assert cache.get(cache.key("pois", "1")) is None
+    assert cache.get(cache.key("pois", "limit=5", listing=True)) is None
+    # Other rows' details survive the write.
+    assert cache.get(cache.key("pois", "2")) == b"two"
+    clock.now = 61
+    assert cache.get(cache.key("pois", "2")) is None
+    assert cache.stats() == {
+        "backend": "memory", "hits": 1, "misses": 3, "evictions": 0, "entries": 2, "bytes": 9
+    }
+
+
+def test_redis_backend_shares_entries_and_degrades_to_misses():
+    clock = FakeClock()
+    client = FakeRedis(clock)
+    writer, reader = ResponseCache(RedisBackend(client), ttl=60), ResponseCache(RedisBackend(client), ttl=60)
+    writer.set(writer.key("properties", "7"), b"stay")
+    assert reader.get(reader.key("properties", "7")) == b"stay"
+
+    listing = reader.key("properties", "", listing=True)
+    reader.set(listing, b"page")
+    writer.invalidate("properties", 7)
+    assert reader.get(reader.key("properties", "7")) is None
+    assert reader.get(reader.key("properties", "", listing=True)) is None
+
+    client.down = True
+    assert reader.get(listing) is None
+    reader.set(listing, b"page")
+    assert reader.stats() == {"backend": "redis", "hits": 1, "misses": 3, "evictions": 0, "errors": 2}
+
+
+def test_catalogue_reads_are_served_from_cache_until_written(client: TestClient, count_queries):
+    created = client.post(
+        "/properties/",
+        json={"name": "Amangalla", "property_type": "hotel", "latitude": 6.03, "longitude": 80.22},
+    ).json()
+    path = f"/properties/{created['id']}"
+    first = client.get(path)
+    listing = client.get("/properties/")
+
+    queries = count_queries()
+    cached = client.get(path)
+    assert client.get("/properties/").content == listing.content
+    assert count_queries() == queries
+    assert cached.content == first.content
+    assert cached.headers["etag"] == first.headers["etag"]
+    assert client.get(path, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+
+    client.patch(path, json={"name": "Amangalla Galle"})
+    assert client.get(path).json()["name"] == "Amangalla Galle"
+    assert client.get("/properties/").json()["items"][0]["name"] == "Amangalla Galle"
+    stats = client.get("/health/cache").json()
+    assert stats["backend"] == "memory"
+    assert stats["hits"] >= 3
@@ -0,0 +1,56 @@
+import itertools
+import random
+
+import pytest
+
+from app.services.distance_cache import place_distances
+from app.services.route_optimizer import optimize_route, order_stops, route_length
+from app.services.spatial_index import distance_matrix
+
+
+def brute_force(matrix, start, end) -> float:
+    nodes = range(len(matrix))
+    best = float("inf")
+    for order in itertools.permutations(nodes):
+        if start is not None and order[0] != start:
+            continue
+        if end is not None and end != start and order[-1] != end:
+            continue
+        closing = [order[0]] if start is not None and start == end else []
+        best = min(best, route_length(matrix, [*order, *closing]))
+    return best
+
+
+@pytest.mark.parametrize("start,end", [(None, None), (0, 0), (0, 5), (2, None)])
+def test_optimize_route_is_near_optimal_on_small_days(start, end):
+    rng = random.Random(3)
+    for _ in range(20):
+        longitudes = [rng.uniform(79.7, 81.9) for _ in range(7)]
+        latitudes = [rng.uniform(5.9, 9.9) for _ in range(7)]
+        matrix = distance_matrix(longitudes, latitudes)
+        route = optimize_route(matrix, start, end)
+        assert sorted(route) == list(range(7))
+        if start is not None:
+            assert route[0] == start
+        if end is not None and end != start:
+            assert route[-1] == end
+        closing = [route[0]] if start is not None and start == end else []
+        assert route_length(matrix, [*route, *closing]) <= 1.05 * brute_force(matrix, start, end)
+
+
+def test_order_stops_pins_stays_and_keeps_unlocated_stops_last():
+    # Stays at index 1 (morning) and 4 (evening); POIs sit on a line between them.
+    places = [
+        ("poi", 1, 80.3, 7.0),
+        ("stay", 1, 80.0, 7.0),
+        None,
+        ("poi", 2, 80.1, 7.0),
+        ("stay", 2, 80.4, 7.0),
+        ("poi", 3, 80.2, 7.0),
+    ]
+    pinned = [False, True, False, False, True, False]
+    assert order_stops(place_distances(places), pinned) == [1, 3, 5, 0, 4, 2]
+    assert order_stops(place_distances([("poi", 1, 80.0, 7.0), None]), [False, False]) == [0, 1]
+    # Short days still start at the stay.
+    short = place_distances([("poi", 1, 80.1, 7.0), ("stay", 1, 80.0, 7.0)])
+    assert order_stops(short, [False, True]) == [1, 0]
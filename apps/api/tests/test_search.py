@@ -0,0 +1,169 @@
+from fastapi.testclient import TestClient
+
+from app.core.database import SessionLocal
+from app.repositories.poi import PointOfInterestRepository
+from app.schemas.poi import POICreate
+from app.services.index_guard import poi_guard
+from app.services.text_index import PrefixIndex, TextIndex, fold
+
+
+def build_index() -> TextIndex:
+    index = TextIndex((3.0, 2.0, 1.0))
+    index.load(
+        [
+            (1, ("Galle Fort", "heritage", "Dutch ramparts by the sea"), "heritage"),
+            (2, ("Unawatuna", "beach", "Bay east of Galle"), "beach"),
+            (3, ("Sigiriya", "heritage", "Rock fortress"), "heritage"),
+        ]
+    )
+    return index
+
+
+def test_fold_ignores_case_and_latin_accents_only():
+    assert fold("Café GALLE") == "cafe galle"
+    assert fold("ශ්‍රී") == "ශ්‍රී"
+
+
+def test_search_ranks_name_matches_above_description_matches():
+    index = build_index()
+    assert [row_id for row_id, _ in index.search("galle", 10)] == [1, 2]
+    assert index.search("galle", 10, tag="beach")[0][0] == 2
+    assert [row_id for row_id, _ in index.search("galle", 10, allowed={2, 3})] == [2]
+    assert index.search("kandy", 10) == []
+
+
+def test_writes_before_load_are_replayed():
+    index = TextIndex((1.0,))
+    index.upsert(1, ("Kandy Lake",))
+    index.remove(2)
+    index.load([(2, ("Kandy market",), None), (3, ("Ella",), None)])
+    assert [row_id for row_id, _ in index.search("kandy", 10)] == [1]
+    index.upsert(3, ("Nine Arches, Ella",))
+    assert index.search("arches", 10)[0][0] == 3
+
+
+def test_prefix_index_matches_word_starts_ranked_by_popularity():
+    index = PrefixIndex()
+    index.load([(1, "Temple of the Tooth", 5), (2, "Tangalle Beach", 9), (3, "Café Tamarind", 0)])
+    assert [row_id for row_id, _, _ in index.suggest("T", 10)] == [2, 1, 3]
+    assert index.suggest("tooth", 10) == [(1, "Temple of the Tooth", 5)]
+    assert index.suggest("cafe t", 10) == [(3, "Café Tamarind", 0)]
+    index.upsert(1, "Sri Dalada Maligawa")
+    assert index.suggest("tooth", 10) == []
+    assert index.suggest("mali", 10) == [(1, "Sri Dalada Maligawa", 5)]
+    index.remove(2)
+    assert [row_id for row_id, _, _ in index.suggest("t", 10)] == [3]
+
+def test_search_endpoint_covers_pois_and_properties(client: TestClient):
+    temple = client.post(
+        "/pois/",
+        json={
+            "name": "Temple of the Tooth",
+            "category": "heritage",
+            "description": "Kandy's lakeside temple",
+            "latitude": 7.2936,
+            "longitude": 80.6413,
+            "is_published": True,
+        },
+    ).json()
+    client.post(
+        "/pois/",
+        json={
+            "name": "Kandy Lake",
+            "category": "nature",
+            "latitude": 7.291,
+            "longitude": 80.64,
+            "is_published": True,
+        },
+    )
+    draft = client.post(
+        "/pois/",
+        json={"name": "Kandy Temple Draft", "category": "heritage", "latitude": 7.29, "longitude": 80.64},
+    ).json()
+    client.post(
+        "/properties/",
+        json={
+            "name": "Kandy Hills Hotel",
+            "address": "Temple Road",
+            "latitude": 7.3,
+            "longitude": 80.63,
+            "is_published": True,
+        },
+    )
+
+    hits = client.get("/search", params={"q": "kandy temple"}).json()
+    assert {hit["kind"] for hit in hits} == {"poi", "property"}
+    # Unpublished rows stay out of search, as they do out of suggestions and facets.
+    assert draft["id"] not in {hit["poi"]["id"] for hit in hits if hit["kind"] == "poi"}
+    assert hits[0]["poi"]["id"] == temple["id"]
+    assert [hit["score"] for hit in hits] == sorted((hit["score"] for hit in hits), reverse=True)
+    # Each source's best hit scores 1.0 whatever the size of its corpus.
+    assert {hit["kind"] for hit in hits if hit["score"] == 1.0} == {"poi", "property"}
+
+    heritage = client.get("/search", params={"q": "kandy", "category": "heritage"}).json()
+    assert [hit["poi"]["id"] for hit in heritage] == [temple["id"]]
+    away = client.get("/search", params={"q": "kandy", "bbox": "79.8,6.0,80.0,7.0"}).json()
+    assert away == []
+
+    client.patch(f"/pois/{temple['id']}", json={"name": "Sri Dalada Maligawa"})
+    assert client.get("/search", params={"q": "maligawa"}).json()[0]["poi"]["id"] == temple["id"]
+    client.delete(f"/pois/{temple['id']}")
+    assert client.get("/search", params={"q": "maligawa"}).json() == []
+
+    with SessionLocal() as db:
+        # Without the in-process index SQLite falls back to a LIKE scan.
+        matches = PointOfInterestRepository(db).search("lake", 10)
+        assert [poi.name for poi, _ in matches] == ["Kandy Lake"]
+        # Scored by the terms each column matched, not one per row.
+        matches = PointOfInterestRepository(db).search("kandy lake nature", 10)
+        assert [(poi.name, score) for poi, score in matches] == [("Kandy Lake", 3.0)]
+
+
+def test_search_sees_rows_written_by_another_worker(client: TestClient, monkeypatch):
+    monkeypatch.setattr(poi_guard, "interval", 0.0)
+    client.post(
+        "/pois/",
+        json={
+            "name": "Kandy Lake",
+            "category": "nature",
+            "latitude": 7.291,
+            "longitude": 80.64,
+            "is_published": True,
+        },
+    )
+    assert len(client.get("/search", params={"q": "kandy"}).json()) == 1
+    assert len(client.get("/pois/suggest", params={"prefix": "kan"}).json()) == 1
+
+    with SessionLocal() as db:
+        # Bypasses this process's indexes, like a write served by another worker.
+        PointOfInterestRepository(db).create(
+            POICreate(
+                name="Kandy Museum",
+                category="heritage",
+                latitude=7.29,
+                longitude=80.64,
+                is_published=True,
+            )
+        )
+    assert len(client.get("/search", params={"q": "kandy"}).json()) == 2
+    assert len(client.get("/pois/suggest", params={"prefix": "kan"}).json()) == 2
+
+
+def test_suggest_endpoint_lists_published_names(client: TestClient):
+    def create(path: str, name: str, published: bool) -> int:
+        payload = {"name": name, "latitude": 7.29, "longitude": 80.64, "is_published": published}
+        if path == "/pois/":
+            payload["category"] = "heritage"
+        return client.post(path, json=payload).json()["id"]
+
+    fort = create("/pois/", "Galle Fort", True)
+    create("/pois/", "Galle draft", False)
+    hotel = create("/properties/", "Gallery Hotel", True)
+    client.post("/trips/", json={"name": "South", "stops": [{"kind": "stay", "stay_id": hotel}]})
+
+    suggestions = client.get("/pois/suggest", params={"prefix": "GALL"}).json()
+    assert [(row["kind"], row["id"]) for row in suggestions] == [("property", hotel), ("poi", fort)]
+    assert suggestions[0]["popularity"] == 1
+
+    client.patch(f"/pois/{fort}", json={"is_published": False})
+    assert [row["id"] for row in client.get("/pois/suggest", params={"prefix": "gall"}).json()] == [hotel]
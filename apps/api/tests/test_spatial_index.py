@@ -0,0 +1,201 @@
+import threading
+
+import pytest
+
+from app.services.index_guard import IndexGuard
+from app.services.spatial_index import GridIndex, cluster_points
+
+COLOMBO = (79.8612, 6.9271)
+KANDY = (80.6337, 7.2906)
+GALLE = (80.2170, 6.0535)
+
+
+def build_index() -> GridIndex:
+    index = GridIndex(cell_size=0.1)
+    index.load(
+        [
+            (1, *COLOMBO),
+            (2, *KANDY),
+            (3, *GALLE),
+        ]
+    )
+    return index
+
+
+def test_query_returns_rows_inside_bbox():
+    index = build_index()
+    assert sorted(index.query((79.5, 6.5, 80.7, 7.5))) == [1, 2]
+    assert index.query((81.0, 8.0, 81.5, 8.5)) == []
+
+
+def test_query_covering_whole_island_walks_occupied_cells():
+    index = build_index()
+    assert sorted(index.query((-180.0, -90.0, 180.0, 90.0))) == [1, 2, 3]
+
+
+def test_upsert_moves_row_between_cells():
+    index = build_index()
+    index.upsert(3, *KANDY)
+    assert index.query((80.1, 6.0, 80.3, 6.1)) == []
+    assert sorted(index.query((80.6, 7.2, 80.7, 7.3))) == [2, 3]
+
+
+def test_remove_drops_row():
+    index = build_index()
+    index.remove(1)
+    assert len(index) == 2
+    assert index.query((79.8, 6.9, 79.9, 7.0)) == []
+
+
+def test_writes_racing_the_first_load_are_replayed():
+    index = GridIndex()
+    index.upsert(3, *GALLE)
+    index.remove(2)
+    assert not index.loaded
+    # The snapshot was read before the writes above were committed.
+    index.ensure_loaded(lambda: [(1, *COLOMBO), (2, *KANDY)])
+    assert sorted(index.query((-180.0, -90.0, 180.0, 90.0))) == [1, 3]
+
+
+def test_invalidation_racing_a_load_forces_a_reread():
+    index = GridIndex()
+    snapshots = [[(1, *COLOMBO)], [(1, *COLOMBO), (2, *KANDY)]]
+
+    def loader():
+        rows = snapshots.pop(0)
+        if snapshots:
+            # Another worker's write was noticed while this snapshot was being read.
+            index.invalidate()
+        return rows
+
+    index.ensure_loaded(loader)
+    assert sorted(index.query((-180.0, -90.0, 180.0, 90.0))) == [1, 2]
+
+
+def test_stale_index_keeps_serving_until_reloaded():
+    index = build_index()
+    index.invalidate()
+    index.upsert(4, 81.0, 8.0)
+    # A reader that passed ensure_loaded() just before the invalidation still gets rows.
+    assert sorted(index.query((-180.0, -90.0, 180.0, 90.0))) == [1, 2, 3, 4]
+    index.ensure_loaded(lambda: [(1, *COLOMBO)])
+    assert sorted(index.query((-180.0, -90.0, 180.0, 90.0))) == [1, 4]
+
+
+def test_guard_reloads_when_the_table_stamp_moves():
+    now = [0.0]
+    index = build_index()
+    guard = IndexGuard([index], interval=5.0, clock=lambda: now[0])
+    reads = []
+
+    def stamp():
+        reads.append(now[0])
+        return (3, 3, 3)
+
+    guard.check(stamp)
+    assert not index.loaded
+    index.load([(1, *COLOMBO)])
+    guard.check(stamp)
+    assert reads == [0.0]
+    now[0] = 5.0
+    guard.check(stamp)
+    assert index.loaded
+    guard.observe((3, 3, 4))
+    assert not index.loaded
+
+
+def test_guard_ignores_local_writes_it_recorded():
+    index = build_index()
+    guard = IndexGuard([index])
+    guard.observe((3, 3, 3))
+    index.load([(1, *COLOMBO), (2, *KANDY), (3, *GALLE)])
+    guard.record(rows=1, revisions=1, created=4)
+    guard.record(revisions=1)
+    guard.observe((4, 4, 5))
+    assert index.loaded
+    # Deleting the newest row leaves the next newest id unknown: one reload.
+    guard.record(rows=-1, revisions=-1, removed=4)
+    guard.observe((3, 3, 4))
+    assert not index.loaded
+
+
+def test_only_one_reader_reloads_a_stale_index():
+    index = build_index()
+    index.invalidate()
+    started, release = threading.Event(), threading.Event()
+    loads = []
+
+    def slow_loader():
+        loads.append(1)
+        started.set()
+        release.wait(5)
+        return [(1, *COLOMBO)]
+
+    reloader = threading.Thread(target=index.ensure_loaded, args=(slow_loader,))
+    reloader.start()
+    started.wait(5)
+    # Another reader returns at once and is served the stale snapshot.
+    index.ensure_loaded(slow_loader)
+    assert sorted(index.query((-180.0, -90.0, 180.0, 90.0))) == [1, 2, 3]
+    release.set()
+    reloader.join(5)
+    assert loads == [1]
+    assert index.query((-180.0, -90.0, 180.0, 90.0)) == [1]
+
+
+def test_nearest_ranks_by_great_circle_distance():
+    index = build_index()
+    index.upsert(4, 79.87, 6.93, "beach")
+    ranked = index.nearest(*COLOMBO, radius_m=200_000, k=3)
+    assert [row_id for row_id, _ in ranked] == [1, 4, 2]
+    assert ranked[0][1] == 0.0
+    assert ranked[1][1] == pytest.approx(1023, rel=0.01)
+
+    assert [row_id for row_id, _ in index.nearest(*COLOMBO, radius_m=200_000, k=5, tag="beach")] == [4]
+    assert [row_id for row_id, _ in index.nearest(*COLOMBO, radius_m=500, k=5)] == [1]
+
+
+def summarize(clusters) -> list[tuple[int, dict[str, int]]]:
+    return sorted(((cluster.count, cluster.tags) for cluster in clusters), key=repr)
+
+
+def test_cluster_pyramid_tracks_writes_incrementally():
+    index = GridIndex(cell_size=0.1, clustered=True)
+    index.load([(1, *COLOMBO, "city"), (2, *KANDY, "heritage"), (3, *GALLE, "heritage")])
+    island = (79.5, 5.9, 81.9, 9.9)
+
+    (whole,) = index.clusters(island, 2)
+    assert (whole.count, whole.tags) == (3, {"city": 1, "heritage": 2})
+    assert whole.longitude == pytest.approx((COLOMBO[0] + KANDY[0] + GALLE[0]) / 3)
+    assert summarize(index.clusters(island, 9)) == [
+        (1, {"city": 1}), (1, {"heritage": 1}), (1, {"heritage": 1})
+    ]
+
+    index.upsert(3, KANDY[0] + 0.001, KANDY[1], "beach")
+    index.remove(1)
+    assert summarize(index.clusters(island, 9)) == [(2, {"beach": 1, "heritage": 1})]
+    assert summarize(index.clusters(island, 18)) == [(1, {"beach": 1}), (1, {"heritage": 1})]
+    assert index.clusters((81.0, 8.0, 81.5, 8.5), 9) == []
+
+
+def test_facets_sum_interior_cells_and_filter_edge_cells():
+    index = GridIndex(cell_size=0.1, faceted=True)
+    index.load([(1, *COLOMBO, "city"), (2, *KANDY, "heritage"), (3, *GALLE, "heritage")])
+    assert index.facets() == {"city": 1, "heritage": 2}
+    assert index.facets((79.0, 5.0, 82.0, 10.0)) == {"city": 1, "heritage": 2}
+    assert index.facets((79.86, 6.92, 80.64, 7.3)) == {"city": 1, "heritage": 1}
+    assert index.facets((79.8, 6.9, 79.86, 6.92)) == {}
+
+    index.upsert(1, *COLOMBO, "beach")
+    index.remove(2)
+    assert index.facets() == {"beach": 1, "heritage": 1}
+    with pytest.raises(ValueError):
+        GridIndex().facets()
+
+def test_cluster_points_matches_pyramid_level():
+    points = [(*COLOMBO, "city"), (*KANDY, "heritage"), (*GALLE, "heritage")]
+    index = GridIndex(clustered=True)
+    index.load([(row_id, *point) for row_id, point in enumerate(points)])
+    for zoom in (0, 7, 12):
+        bbox = (79.0, 5.0, 82.0, 10.0)
+        assert summarize(cluster_points(points, bbox, zoom)) == summarize(index.clusters(bbox, zoom))
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.core.database import SessionLocal
+from app.models import PartnerProperty, PointOfInterest, Tombstone, Trip, TripStop
+
+
+def create_poi(client: TestClient, name: str) -> int:
+    payload = {"name": name, "category": "heritage", "latitude": 7.29, "longitude": 80.64}
+    return client.post("/pois/", json=payload).json()["id"]
+
+
+def backdate_everything() -> None:
+    past = datetime.now() - timedelta(hours=1)
+    with SessionLocal() as db:
+        for model in (PointOfInterest, PartnerProperty, Trip, TripStop):
+            db.execute(update(model).values(updated_at=past))
+        db.execute(update(Tombstone).values(deleted_at=past))
+        db.commit()
+
+
+def test_sync_returns_changes_and_deletions_since_token(client: TestClient):
+    kept, dropped = create_poi(client, "Sigiriya"), create_poi(client, "Dambulla")
+    trip = client.post(
+        "/trips/",
+        json={
+            "name": "Cultural triangle",
+            "stops": [{"kind": "poi", "poi_id": kept}, {"kind": "poi", "poi_id": dropped, "sort": 1}],
+        },
+    ).json()
+
+    full = client.get("/sync").json()
+    assert {kept, dropped} <= {poi["id"] for poi in full["pois"]}
+    assert trip["id"] in {row["id"] for row in full["trips"]}
+    assert {stop["id"] for stop in trip["stops"]} <= {stop["id"] for stop in full["trip_stops"]}
+    assert full["deleted"] == []
+
+    backdate_everything()
+    unchanged = client.get("/sync", params={"since": full["token"]}).json()
+    assert not any(unchanged[key] for key in ("pois", "properties", "trips", "trip_stops", "deleted"))
+
+    client.patch(f"/pois/{kept}", json={"description": "Lion rock"})
+    dropped_stop = trip["stops"][1]["id"]
+    assert client.delete(f"/trips/{trip['id']}/stops/{dropped_stop}").status_code == 204
+    assert client.delete(f"/pois/{dropped}").status_code == 204
+
+    delta = client.get("/sync", params={"since": full["token"]}).json()
+    assert [poi["id"] for poi in delta["pois"]] == [kept]
+    assert delta["trips"] == [] and delta["trip_stops"] == []
+    assert {(row["entity"], row["id"]) for row in delta["deleted"]} == {
+        ("trip_stops", dropped_stop),
+        ("pois", dropped),
+    }
+
+    assert client.delete(f"/trips/{trip['id']}").status_code == 204
+    deletions = client.get("/sync", params={"since": delta["token"]}).json()["deleted"]
+    assert ("trips", trip["id"]) in {(row["entity"], row["id"]) for row in deletions}
+    assert ("trip_stops", trip["stops"][0]["id"]) in {(row["entity"], row["id"]) for row in deletions}
+
+    assert client.get("/sync", params={"since": "not-a-token"}).status_code == 400
+
+
+
+def test_sync_token_lags_for_transactions_still_open(client: TestClient):
+    poi_id = create_poi(client, "Polonnaruwa")
+    backdate_everything()
+    token = client.get("/sync").json()["token"]
+
+    # Stamped two minutes before that sync but committed only now, as a long import would be.
+    with SessionLocal() as db:
+        stamped = datetime.now() - timedelta(minutes=2)
+        db.execute(update(PointOfInterest).where(PointOfInterest.id == poi_id).values(updated_at=stamped))
+        db.commit()
+    assert [poi["id"] for poi in client.get("/sync", params={"since": token}).json()["pois"]] == [poi_id]
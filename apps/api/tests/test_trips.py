@@ -1,4 +1,10 @@
+from datetime import datetime, timezone
+
 from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+
+from app.core.database import SessionLocal, engine
+from app.models import PartnerProperty, PointOfInterest, Trip, TripStop
 
 
 def create_poi(client: TestClient) -> int:
@@ -44,4 +50,191 @@ def test_trip_lifecycle(client: TestClient):
 
     list_response = client.get("/trips/")
     assert list_response.status_code == 200
-    assert list_response.json()[0]["id"] == trip["id"]
+    assert list_response.json()["items"][0]["id"] == trip["id"]
+
+
+def create_trip_with_stops(client: TestClient, stop_count: int) -> int:
+    stops = []
+    for index in range(stop_count):
+        poi = client.post(
+            "/pois/",
+            json={
+                "name": f"Stop {index}",
+                "category": "heritage",
+                "latitude": 7.0 + index / 100,
+                "longitude": 80.0 + index / 100,
+            },
+        ).json()
+        stay = client.post(
+            "/properties/",
+            json={"name": f"Stay {index}", "latitude": 7.0, "longitude": 80.0},
+        ).json()
+        stops.append({"kind": "poi", "poi_id": poi["id"], "day_index": index, "sort": index})
+        stops.append({"kind": "stay", "stay_id": stay["id"], "day_index": index, "sort": index})
+    response = client.post("/trips/", json={"name": f"{stop_count} days", "stops": stops})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_trip_reads_issue_constant_query_count(client: TestClient, count_queries):
+    counts = {}
+    for stop_count in (1, 15):
+        trip_id = create_trip_with_stops(client, stop_count)
+
+        start = count_queries()
+        assert len(client.get(f"/trips/{trip_id}").json()["stops"]) == stop_count * 2
+        detail_queries = count_queries() - start
+
+        start = count_queries()
+        client.get("/trips/")
+        list_queries = count_queries() - start
+
+        counts[stop_count] = (detail_queries, list_queries)
+    assert counts[1] == counts[15]
+
+
+def test_mark_unknown_stop_returns_404(client: TestClient):
+    response = client.post("/trips/stops/999999/mark", json={"status": "visited"})
+    assert response.status_code == 404
+
+
+def test_list_trips_pages_newest_first(client: TestClient):
+    ids = [client.post("/trips/", json={"name": f"Trip {n}"}).json()["id"] for n in range(3)]
+
+    first = client.get("/trips/", params={"limit": 2}).json()
+    second = client.get("/trips/", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [trip["id"] for trip in first["items"] + second["items"]] == ids[::-1]
+    assert second["next_cursor"] is None
+
+
+def test_trip_etags_follow_stops_and_embedded_pois(client: TestClient):
+    trip_id = create_trip_with_stops(client, 1)
+    with SessionLocal() as db:
+        for model in (Trip, TripStop, PointOfInterest, PartnerProperty):
+            db.execute(update(model).values(updated_at=datetime(2024, 1, 1, tzinfo=timezone.utc)))
+        db.commit()
+
+    detail = client.get(f"/trips/{trip_id}")
+    listing = client.get("/trips/")
+    assert detail.headers["cache-control"] == "private, no-cache"
+    revalidate = {"If-None-Match": detail.headers["etag"]}
+    assert client.get(f"/trips/{trip_id}", headers=revalidate).status_code == 304
+
+    poi_id = detail.json()["stops"][0]["poi_id"]
+    client.patch(f"/pois/{poi_id}", json={"description": "Updated"})
+    assert client.get(f"/trips/{trip_id}", headers=revalidate).status_code == 200
+    assert client.get("/trips/", headers={"If-None-Match": listing.headers["etag"]}).status_code == 200
+
+    assert client.get("/trips/999", headers=revalidate).status_code == 404
+
+
+def test_optimize_orders_each_day_between_its_stays(client: TestClient):
+    def poi(longitude: float) -> int:
+        payload = {"name": f"POI {longitude}", "category": "nature", "latitude": 7.0, "longitude": longitude}
+        return client.post("/pois/", json=payload).json()["id"]
+
+    hotel = client.post("/properties/", json={"name": "Hotel", "latitude": 7.0, "longitude": 80.0}).json()
+    far, near, middle = poi(80.3), poi(80.1), poi(80.2)
+    stops = [
+        {"kind": "poi", "poi_id": far, "day_index": 0},
+        {"kind": "stay", "stay_id": hotel["id"], "day_index": 0},
+        {"kind": "poi", "poi_id": near, "day_index": 0},
+        {"kind": "poi", "poi_id": middle, "day_index": 0},
+        {"kind": "poi", "poi_id": far, "day_index": 1},
+        {"kind": "poi", "poi_id": near, "day_index": 1},
+    ]
+    trip = client.post("/trips/", json={"name": "Loop", "stops": stops}).json()
+
+    optimized = client.post(f"/trips/{trip['id']}/optimize")
+    assert optimized.status_code == 200
+    ordered = [(stop["day_index"], stop["poi_id"] or stop["stay_id"]) for stop in optimized.json()["stops"]]
+    assert ordered[0] == (0, hotel["id"])
+    assert [stop for _, stop in ordered[1:4]] in ([near, middle, far], [far, middle, near])
+    assert [day for day, _ in ordered] == [0, 0, 0, 0, 1, 1]
+    assert client.post("/trips/999999/optimize").status_code == 404
+
+    distances = client.get(f"/trips/{trip['id']}/distances").json()
+    assert distances["stop_ids"] == [stop["id"] for stop in optimized.json()["stops"]]
+    assert len(distances["matrix_m"]) == 6
+    # 0.1 degrees of longitude at 7N is about 11 km; the day boundary has no leg.
+    assert [round(leg / 1000) if leg else leg for leg in distances["legs_m"]] == [11, 11, 11, None, 22]
+    assert distances["total_m"] == sum(leg for leg in distances["legs_m"] if leg)
+
+
+def test_update_writes_only_changed_stops(client: TestClient):
+    trip = client.get(f"/trips/{create_trip_with_stops(client, 50)}").json()
+    stops = [
+        {key: stop[key] for key in ("id", "kind", "poi_id", "stay_id", "day_index", "sort", "status")}
+        for stop in trip["stops"]
+    ]
+    writes: list[tuple[str, int]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.split(None, 1)[0].upper()
+        if verb in ("INSERT", "UPDATE", "DELETE") and "trip_stops" in statement:
+            writes.append((verb, len(parameters) if executemany else 1))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        stops[10]["status"] = "visited"
+        updated = client.patch(f"/trips/{trip['id']}", json={"stops": stops})
+        assert writes == [("UPDATE", 1)]
+
+        # Dropping ids still matches rows by place; one removal and one new stop follow.
+        writes.clear()
+        without_ids = [{key: value for key, value in stop.items() if key != "id"} for stop in stops]
+        replacement = {**without_ids[20], "kind": "poi", "poi_id": stops[0]["poi_id"], "stay_id": None}
+        edited = client.patch(
+            f"/trips/{trip['id']}", json={"stops": [*without_ids[:20], replacement, *without_ids[21:]]}
+        )
+        assert sorted(verb for verb, _ in writes) == ["DELETE", "INSERT"]
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    before = {stop["id"]: stop for stop in trip["stops"]}
+    after = updated.json()["stops"]
+    assert [stop["id"] for stop in after] == [stop["id"] for stop in trip["stops"]]
+    assert after[10]["status"] == "visited"
+    assert all(stop["created_at"] == before[stop["id"]]["created_at"] for stop in after)
+    kept = {stop["id"] for stop in edited.json()["stops"]} & before.keys()
+    assert len(kept) == len(stops) - 1
+    assert client.patch(
+        f"/trips/{trip['id']}", json={"stops": [{**stops[0], "id": 999999}]}
+    ).status_code == 400
+
+
+def test_stop_batch_applies_changes_in_one_update(client: TestClient):
+    trip = client.get(f"/trips/{create_trip_with_stops(client, 20)}").json()
+    stops = trip["stops"]
+    other_id = create_trip_with_stops(client, 1)
+    other = client.get(f"/trips/{other_id}").json()["stops"][0]
+    operations = [{"stop_id": stop["id"], "status": "visited"} for stop in stops[:10]] + [
+        {"stop_id": stops[0]["id"], "status": "skipped", "sort": 7},
+        {"stop_id": other["id"], "status": "visited"},
+        {"stop_id": stops[1]["id"], "poi_id": 999999},
+    ]
+    writes: list[tuple[str, int]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.split(None, 1)[0].upper()
+        if verb in ("INSERT", "UPDATE", "DELETE") and "trip_stops" in statement:
+            writes.append((verb, len(parameters) if executemany else 1))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.post(f"/trips/{trip['id']}/stops/batch", json={"operations": operations})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    assert writes == [("UPDATE", 10)]
+    results = response.json()["results"]
+    assert [result["ok"] for result in results] == [True] * 11 + [False, False]
+    assert [result["detail"] for result in results[-2:]] == ["Stop not found", "POI not found"]
+    assert results[10]["stop"]["status"] == "skipped" and results[10]["stop"]["sort"] == 7
+    assert results[0]["stop"] == results[10]["stop"]
+
+    reloaded = {stop["id"]: stop for stop in client.get(f"/trips/{trip['id']}").json()["stops"]}
+    assert reloaded[stops[0]["id"]]["status"] == "skipped"
+    assert reloaded[stops[1]["id"]]["poi_id"] == stops[1]["poi_id"]
+    assert client.get(f"/trips/{other_id}").json()["stops"][0]["status"] == other["status"]
+    assert client.post("/trips/999999/stops/batch", json={"operations": operations}).status_code == 404
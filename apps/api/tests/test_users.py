@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import User
+from app.services.cache import TTLCache
+from app.services.users import LastLoginRecorder, UserService, UserSnapshot
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    User.__table__.create(engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def test_current_user_is_served_from_cache(session_factory):
+    cache: TTLCache[str, UserSnapshot] = TTLCache(10, ttl=60)
+    with session_factory() as db:
+        first = UserService(db, cache).current("uid-1", email="a@example.com")
+    with session_factory() as db:
+        db.execute(User.__table__.delete())
+        db.commit()
+        assert UserService(db, cache).current("uid-1") == first
+    assert cache.hits == 1
+
+
+def test_concurrent_first_login_reuses_existing_row(session_factory, monkeypatch):
+    with session_factory() as other:
+        other.add(User(firebase_uid="uid-1"))
+        other.commit()
+
+    with session_factory() as db:
+        service = UserService(db)
+        original_find = service._find
+        lookups: list[str] = []
+
+        def racing_find(firebase_uid: str) -> User | None:
+            # The first lookup misses the row the other login created, as if it ran just before.
+            lookups.append(firebase_uid)
+            return None if len(lookups) == 1 else original_find(firebase_uid)
+
+        monkeypatch.setattr(service, "_find", racing_find)
+        user = service.get_or_create("uid-1")
+        assert user.firebase_uid == "uid-1"
+        assert len(db.scalars(select(User)).all()) == 1
+
+
+def test_last_login_updates_are_batched(session_factory):
+    now = [1_000.0]
+    logins = LastLoginRecorder(min_interval=300, flush_interval=30, clock=lambda: now[0])
+    with session_factory() as db:
+        ids = [UserService(db).get_or_create(f"uid-{n}").id for n in range(3)]
+        for user_id in ids + ids:
+            logins.touch(user_id)
+        assert not logins.due()
+        now[0] += 30
+        assert logins.due()
+        assert logins.flush(db) == 3
+        stamps = db.scalars(select(User.last_login_at)).all()
+        assert all(isinstance(stamp, datetime) for stamp in stamps)
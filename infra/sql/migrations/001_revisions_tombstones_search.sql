@@ -0,0 +1,36 @@
+-- Schema changes for conditional GETs, delta sync and catalogue search (MySQL 8).
+-- Base.metadata.create_all only creates missing tables, so existing databases need this
+-- script once before the API is upgraded. Run it outside peak hours: the ALTERs on the
+-- catalogue tables rebuild their indexes.
+
+-- Per-row revision used in ETags; every UPDATE bumps it (TimestampMixin.revision).
+ALTER TABLE users ADD COLUMN revision INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE bookings ADD COLUMN revision INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE trips ADD COLUMN revision INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE trip_stops ADD COLUMN revision INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE pois ADD COLUMN revision INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE properties ADD COLUMN revision INTEGER NOT NULL DEFAULT 1;
+
+-- Deleted rows, kept so offline clients learn about deletes on their next sync.
+CREATE TABLE IF NOT EXISTS tombstones (
+    id INTEGER NOT NULL AUTO_INCREMENT,
+    entity VARCHAR(32) NOT NULL,
+    entity_id INTEGER NOT NULL,
+    user_id INTEGER,
+    deleted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    INDEX ix_tombstones_deleted_at (deleted_at)
+);
+
+-- Keyset pagination and "changed since" queries.
+CREATE INDEX ix_pois_updated_at ON pois (updated_at);
+CREATE INDEX ix_properties_updated_at ON properties (updated_at);
+CREATE INDEX ix_trips_user_created ON trips (user_id, created_at, id);
+CREATE INDEX ix_trips_user_updated ON trips (user_id, updated_at);
+CREATE INDEX ix_trip_stops_trip_updated ON trip_stops (trip_id, updated_at);
+
+-- Name prefix suggestions and full-text search.
+CREATE INDEX ix_pois_name ON pois (name);
+CREATE INDEX ix_properties_name ON properties (name);
+CREATE FULLTEXT INDEX ft_pois_search ON pois (name, category, description);
+CREATE FULLTEXT INDEX ft_properties_search ON properties (name, address);